@@ -0,0 +1,72 @@
+from collections import namedtuple, deque
+from engine import EventType
+
+# 成就规则：计数器counter达到threshold时解锁，可同时解锁一款皮肤
+Rule = namedtuple('Rule', ['id', 'name', 'desc', 'counter', 'threshold', 'skin'])
+Rule.__new__.__defaults__ = (None,)
+
+# 计数器：
+#   best_score / best_level  历史最高分数、等级（取最大值）
+#   foods / food_<类型>       累计吃到的食物数量
+#   games                    累计完成的局数
+ACHIEVEMENTS = [
+    Rule("level_5", "初出茅庐", "达到5级", "best_level", 5, skin="黄色"),
+    Rule("level_10", "蛇王", "达到10级", "best_level", 10, skin="紫色"),
+    Rule("score_500", "高分达人", "获得500分", "best_score", 500),
+    Rule("score_1000", "贪食之王", "获得1000分", "best_score", 1000),
+    Rule("foods_100", "百食不厌", "累计吃到100个食物", "foods", 100),
+    Rule("wall_pass_10", "穿墙高手", "累计吃到10个穿墙食物", "food_wall_pass", 10),
+    Rule("games_50", "常客", "完成50局游戏", "games", 50),
+]
+
+# 增量成就判定：每个计数器只关联依赖它的规则，并按阈值排好序，
+# 计数器变化时只检查队首尚未解锁的规则，开销与受影响的规则数成正比，与规则总数无关
+class AchievementTracker:
+    def __init__(self, rules=ACHIEVEMENTS, unlocked=(), counters=None, on_unlock=None):
+        self.rules = rules
+        self.unlocked = set(unlocked)
+        self.counters = counters if counters is not None else {}
+        self.on_unlock = on_unlock  # on_unlock(规则)，每条规则只调用一次
+        self.pending = {}  # 计数器 -> 按阈值排序的未解锁规则
+        for rule in sorted(rules, key=lambda rule: rule.threshold):
+            if rule.id not in self.unlocked:
+                self.pending.setdefault(rule.counter, deque()).append(rule)
+        # 已有的计数值可能已满足新加入的规则
+        for counter in list(self.pending):
+            self.check(counter)
+
+    def is_unlocked(self, rule):
+        return rule.id in self.unlocked
+
+    def add(self, counter, amount=1):
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+        self.check(counter)
+
+    def set_max(self, counter, value):
+        if value > self.counters.get(counter, 0):
+            self.counters[counter] = value
+            self.check(counter)
+
+    def check(self, counter):
+        rules = self.pending.get(counter)
+        if not rules:
+            return
+        value = self.counters.get(counter, 0)
+        while rules and rules[0].threshold <= value:
+            rule = rules.popleft()
+            self.unlocked.add(rule.id)
+            if self.on_unlock is not None:
+                self.on_unlock(rule)
+
+    # 处理Engine.step返回的事件
+    def handle(self, events, engine):
+        for event in events:
+            if event.type == EventType.FOOD_EATEN:
+                self.add("foods")
+                self.add(f"food_{event.data.name.lower()}")
+                self.set_max("best_score", engine.snake.score)
+            elif event.type == EventType.LEVEL_UP:
+                self.set_max("best_level", event.data)
+            elif event.type == EventType.GAME_OVER:
+                self.add("games")
+                self.set_max("best_score", event.data)
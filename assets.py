@@ -0,0 +1,99 @@
+import os
+import time
+import threading
+import pygame
+
+# 资源管理：导入时没有任何副作用，音频设备和音效在后台线程中延迟加载
+
+# 启动耗时统计：以本模块导入时刻为起点，记录各阶段完成的时间
+class StartupTimer:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = []  # (阶段名, 距起点毫秒数, 线程名)
+        self.lock = threading.Lock()
+        self.reported = False
+
+    def mark(self, name):
+        elapsed = (time.perf_counter() - self.start) * 1000
+        with self.lock:
+            self.marks.append((name, elapsed, threading.current_thread().name))
+        return elapsed
+
+    def report(self):
+        with self.lock:
+            marks = sorted(self.marks, key=lambda mark: mark[1])
+        lines = ["启动耗时 (ms):"]
+        last = {}
+        for name, elapsed, thread in marks:
+            delta = elapsed - last.get(thread, 0.0)
+            last[thread] = elapsed
+            lines.append(f"  {elapsed:8.1f}  +{delta:7.1f}  {name} [{thread}]")
+        return "\n".join(lines)
+
+    # 设置环境变量SNAKE_STARTUP_REPORT=1时打印一次报告
+    def report_once(self):
+        if self.reported or not os.environ.get("SNAKE_STARTUP_REPORT"):
+            return
+        self.reported = True
+        print(self.report())
+
+startup = StartupTimer()
+
+# 只初始化显示和字体模块，避免pygame.init()同步打开音频设备
+def init_pygame():
+    if not pygame.display.get_init():
+        pygame.display.init()
+        startup.mark("pygame.display.init")
+    if not pygame.font.get_init():
+        pygame.font.init()
+        startup.mark("pygame.font.init")
+
+class AssetManager:
+    def __init__(self, sound_paths):
+        self.sound_paths = sound_paths
+        self.sounds = {}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.audio_available = True
+        self.done = False  # 后台加载已结束（无论成功与否）
+
+    # 在后台线程中初始化音频并解码所有音效，不阻塞菜单绘制
+    def preload(self):
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self.load_sounds, name="asset-loader", daemon=True)
+        self.thread.start()
+
+    def load_sounds(self):
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()  # 初始化音效系统
+                startup.mark("pygame.mixer.init")
+            for name, path in self.sound_paths.items():
+                sound = pygame.mixer.Sound(path)
+                with self.lock:
+                    self.sounds[name] = sound
+                startup.mark(f"加载音效 {path}")
+        except (pygame.error, OSError) as e:
+            self.audio_available = False
+            print(f"加载音效失败: {e}")
+        finally:
+            self.done = True
+
+    # 播放音效；尚未加载完成时直接跳过，不等待
+    def play(self, name):
+        sound = self.sounds.get(name)
+        if sound is not None:
+            sound.play()
+        elif self.thread is None:
+            self.preload()
+
+    def wait(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+assets = AssetManager({
+    "eat": "eat.wav",
+    "gameover": "gameover.wav",
+})
@@ -0,0 +1,194 @@
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from engine import Engine, GRID_WIDTH, GRID_HEIGHT, difficulty_settings
+from controllers import BotController, RandomController, play
+
+# 批量无界面对局：把大量带种子的对局分块交给进程池，结果逐局写入JSONL文件
+# 每组参数只在内存中保留直方图，用于汇总分数、等级、存活tick和死因的分布
+
+# 控制器名称 -> 构造函数(种子)
+CONTROLLERS = {
+    "bot": lambda seed: BotController(),
+    "random": lambda seed: RandomController(seed),
+}
+
+TICK_BUCKET = 100  # 存活tick按100取整后计入直方图
+
+# 在工作进程中运行：用同一组参数跑完seeds中的每一局
+def run_games(config, seeds, width, height, max_ticks):
+    results = []
+    for seed in seeds:
+        engine = Engine(speed=config["speed"], seed=seed, width=width, height=height)
+        engine.obstacle_frequency = config["obstacle_frequency"]
+        engine.special_food_chance = config["special_food_chance"]
+        play(engine, CONTROLLERS[config["controller"]](seed), max_ticks)
+        results.append(dict(
+            config,
+            seed=seed,
+            score=engine.snake.score,
+            level=engine.level,
+            ticks=engine.ticks,
+            length=len(engine.snake.body),
+            obstacles=len(engine.obstacles),
+            death_cause=engine.death_cause.name if engine.death_cause else "TIMEOUT",
+        ))
+    return results
+
+# 用计数直方图表示的分布，内存只与不同取值的个数有关
+class Distribution:
+    def __init__(self, bucket=1):
+        self.bucket = bucket
+        self.counts = Counter()
+        self.count = 0
+        self.total = 0
+
+    def add(self, value):
+        self.counts[value // self.bucket * self.bucket] += 1
+        self.count += 1
+        self.total += value
+
+    def percentile(self, p):
+        target = self.count * p / 100
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            if seen >= target:
+                return value
+        return 0
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": self.total / self.count,
+            "p10": self.percentile(10),
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "max": max(self.counts),
+        }
+
+# 一组参数的汇总统计
+class ConfigStats:
+    def __init__(self, config):
+        self.config = config
+        self.score = Distribution()
+        self.level = Distribution()
+        self.ticks = Distribution(TICK_BUCKET)
+        self.death_causes = Counter()
+
+    def add(self, result):
+        self.score.add(result["score"])
+        self.level.add(result["level"])
+        self.ticks.add(result["ticks"])
+        self.death_causes[result["death_cause"]] += 1
+
+    def summary(self):
+        return {
+            "config": self.config,
+            "score": self.score.summary(),
+            "level": self.level.summary(),
+            "ticks": self.ticks.summary(),
+            "death_causes": dict(self.death_causes.most_common()),
+        }
+
+def config_key(config):
+    return (config["speed"], config["obstacle_frequency"], config["special_food_chance"],
+            config["controller"])
+
+def parse_list(text, convert):
+    return [convert(item) for item in text.split(",") if item.strip()]
+
+# 参数组合：速度 x 障碍物频率 x 特殊食物概率 x 控制器；频率和概率不指定时使用该速度的默认难度
+def build_configs(args):
+    configs = []
+    for speed in parse_list(args.speeds, int):
+        default_frequency, default_chance = difficulty_settings(speed)
+        frequencies = parse_list(args.obstacle_frequencies, int) or [default_frequency]
+        chances = parse_list(args.special_food_chances, float) or [default_chance]
+        for frequency, chance, controller in itertools.product(
+                frequencies, chances, parse_list(args.controllers, str)):
+            configs.append({"speed": speed, "obstacle_frequency": frequency,
+                            "special_food_chance": chance, "controller": controller})
+    return configs
+
+# 每组参数使用相同的种子序列，便于成对比较
+def build_tasks(configs, games, seed, chunk_size):
+    for config in configs:
+        for start in range(0, games, chunk_size):
+            yield config, range(seed + start, seed + min(games, start + chunk_size))
+
+def print_summary(stats):
+    print(f"{'速度':>4}{'障碍频率':>8}{'特殊食物':>8}{'控制器':>8}{'局数':>7}"
+          f"{'平均分':>9}{'中位分':>8}{'P90分':>8}{'中位等级':>8}{'中位tick':>9}  死因")
+    for key in sorted(stats):
+        s = stats[key]
+        causes = ", ".join(f"{name} {count / s.score.count:.0%}"
+                           for name, count in s.death_causes.most_common())
+        print(f"{key[0]:>6}{key[1]:>12}{key[2]:>12.2f}{key[3]:>11}{s.score.count:>9}"
+              f"{s.score.total / s.score.count:>12.1f}{s.score.percentile(50):>11}"
+              f"{s.score.percentile(90):>10}{s.level.percentile(50):>12}"
+              f"{s.ticks.percentile(50):>11}  {causes}")
+
+def main():
+    parser = argparse.ArgumentParser(description="贪食蛇批量无界面对局与难度调参")
+    parser.add_argument("--games", type=int, default=1000, help="每组参数的局数")
+    parser.add_argument("--speeds", default="5,8,12")
+    parser.add_argument("--obstacle-frequencies", default="", help="逗号分隔，默认按速度取难度设置")
+    parser.add_argument("--special-food-chances", default="", help="逗号分隔，默认按速度取难度设置")
+    parser.add_argument("--controllers", default="bot", help=f"逗号分隔: {', '.join(CONTROLLERS)}")
+    parser.add_argument("--width", type=int, default=GRID_WIDTH)
+    parser.add_argument("--height", type=int, default=GRID_HEIGHT)
+    parser.add_argument("--max-ticks", type=int, default=100000, help="单局最多tick数，超过记为TIMEOUT")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=20, help="每个任务包含的局数")
+    parser.add_argument("--output", default="batch_results.jsonl", help="逐局结果（JSONL）")
+    parser.add_argument("--summary", help="把汇总分布写入JSON文件")
+    args = parser.parse_args()
+
+    configs = build_configs(args)
+    for config in configs:
+        if config["controller"] not in CONTROLLERS:
+            parser.error(f"未知的控制器: {config['controller']}")
+    stats = {config_key(config): ConfigStats(config) for config in configs}
+    tasks = build_tasks(configs, args.games, args.seed, args.chunk_size)
+    total = len(configs) * args.games
+    done = 0
+    start = time.perf_counter()
+
+    # 同时在途的任务数有上限，结果到达后立即写盘，不在内存中堆积
+    with open(args.output, "w", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=args.workers) as pool:
+        pending = set()
+        while True:
+            for config, seeds in itertools.islice(tasks, args.workers * 2 - len(pending)):
+                pending.add(pool.submit(run_games, config, seeds,
+                                        args.width, args.height, args.max_ticks))
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                for result in future.result():
+                    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    stats[config_key(result)].add(result)
+                    done += 1
+            out.flush()
+            elapsed = time.perf_counter() - start
+            print(f"\r已完成 {done}/{total} 局, {done / elapsed:.1f} 局/秒", end="", flush=True)
+    print()
+
+    print_summary(stats)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump([s.summary() for s in stats.values()], f, ensure_ascii=False, indent=4)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,373 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import importlib.util
+import platform
+
+# 无界面运行：在导入pygame之前选择dummy视频和音频驱动
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+from engine import Engine, Snake, Food
+from free_cells import FreeCellIndex
+from obstacles import ObstacleLayer
+from controllers import BotController
+import snapshot
+
+# 性能基准：覆盖模拟和渲染的热点路径，结果输出为JSON，可与保存的基线比较
+# 名称 -> (构造函数, 参数, 每轮调用次数)；构造函数返回run(number)，只在被选中时才构造
+BENCHMARKS = {}
+SEED = 1234
+
+# 运行repeat轮，每轮调用number次，取最快一轮的平均单次耗时（微秒）
+def measure(func, number, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(number)
+        elapsed = (time.perf_counter() - start) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e6
+
+# 覆盖整个棋盘的哈密顿回路（高度需为偶数）：第0列向上返回，其余列蛇形往返
+def hamiltonian_cycle(width, height):
+    cells = []
+    for y in range(height):
+        xs = range(1, width) if y % 2 == 0 else range(width - 1, 0, -1)
+        cells.extend((x, y) for x in xs)
+    cells.extend((0, y) for y in range(height - 1, -1, -1))
+    return cells
+
+# 构造一条沿回路排列、长度为length的蛇，返回(蛇, 回路上每一步的方向)
+def snake_on_cycle(length, width=400, height=300):
+    cycle = hamiltonian_cycle(width, height)
+    snake = Snake(random.Random(SEED), width, height, free=FreeCellIndex(width * height))
+    snake.body.clear()
+    for x, y in cycle[:length]:
+        snake.body.push_head(snake.body.pack(x, y))
+    snake.length = length
+    directions = []
+    for i in range(len(cycle)):
+        (x0, y0), (x1, y1) = cycle[i], cycle[(i + 1) % len(cycle)]
+        directions.append((x1 - x0, y1 - y0))
+    return snake, directions
+
+def bench_snake_update(length):
+    def run(number):
+        snake, directions = state
+        step = run.step
+        for _ in range(number):
+            snake.direction = directions[step]
+            if not snake.update():
+                raise RuntimeError("基准中的蛇发生了碰撞")
+            step = (step + 1) % len(directions)
+        run.step = step
+    state = snake_on_cycle(length)
+    run.step = length - 1
+    return run
+
+for _length in (1, 100, 10000, 100000):
+    BENCHMARKS[f"snake_update/len={_length}"] = (bench_snake_update, (_length,), 20000)
+
+def bench_food_randomize(fill):
+    width, height = 400, 300
+    rng = random.Random(SEED)
+    food = Food(rng, width, height)
+    cells = list(range(width * height))
+    rng.shuffle(cells)
+    for cell in cells[:int(len(cells) * fill)]:
+        food.free.discard(cell)
+
+    def run(number):
+        for _ in range(number):
+            food.randomize_position()
+            # 放回食物占用的格子，保持填充率不变
+            x, y = food.position
+            food.free.add(y * width + x)
+    return run
+
+for _fill in (0.0, 0.5, 0.9, 0.99):
+    BENCHMARKS[f"food_randomize/fill={_fill:.0%}"] = (bench_food_randomize, (_fill,), 20000)
+
+# 在已有count个障碍物的大棋盘上继续放置障碍物（含连通性检查）
+def bench_obstacle_place(count):
+    width, height = 2000, 2000
+    layer = ObstacleLayer(width, height, free=FreeCellIndex(width * height))
+    rng = random.Random(SEED)
+    layer.generate(rng, count)
+
+    def run(number):
+        layer.generate(rng, number)
+    return run
+
+for _count in (0, 5000):
+    BENCHMARKS[f"obstacle_place/count={_count}"] = (bench_obstacle_place, (_count,), 2000)
+
+# 每个tick都把食物放到蛇头前方，保证每步都吃到食物并频繁升级
+def feed(engine):
+    snake = engine.snake
+    x, y = snake.get_head_position()
+    dx, dy = snake.direction
+    target = ((x + dx) % engine.width, (y + dy) % engine.height)
+    cell = target[1] * engine.width + target[0]
+    if cell in engine.free:
+        old = engine.food.position
+        engine.free.add(old[1] * engine.width + old[0])
+        engine.free.discard(cell)
+        engine.food.position = target
+
+def bench_engine_step():
+    def run(number):
+        for _ in range(number):
+            if run.engine is None or run.engine.game_over:
+                run.engine = Engine(speed=12, seed=SEED, width=400, height=300)
+                run.engine.snake.wall_pass = True
+            feed(run.engine)
+            run.engine.step()
+    run.engine = None
+    return run
+
+BENCHMARKS["engine_step/eating"] = (bench_engine_step, (), 20000)
+
+# 自动驾驶每个tick的决策加上模拟，局结束后换新种子继续
+def bench_bot_play():
+    def run(number):
+        for _ in range(number):
+            if run.engine is None or run.engine.game_over:
+                run.seed += 1
+                run.engine = Engine(speed=12, seed=run.seed)
+                bot.reset()
+            run.engine.step(bot.next_action(run.engine))
+    bot = BotController()
+    run.engine = None
+    run.seed = SEED
+    return run
+
+BENCHMARKS["bot_play/step"] = (bench_bot_play, (), 20000)
+
+# 存档与复制：蛇沿回路排列在400x300棋盘上
+def bench_snapshot(op, length):
+    engine = Engine(seed=SEED, width=400, height=300)
+    snake, _ = snake_on_cycle(length)
+    engine.snake.body.clear()
+    for cell in snake.body.iter_cells():
+        engine.snake.body.push_head(cell)
+    engine.snake.length = length
+    data = snapshot.dumps(engine)
+
+    def run(number):
+        if op == "dumps":
+            for _ in range(number):
+                snapshot.dumps(engine)
+        elif op == "loads":
+            for _ in range(number):
+                snapshot.loads(data)
+        else:
+            for _ in range(number):
+                snapshot.clone(engine)
+    return run
+
+for _op in ("dumps", "loads", "clone"):
+    for _length in (10, 1000):
+        BENCHMARKS[f"snapshot_{_op}/len={_length}"] = (bench_snapshot, (_op, _length), 200)
+
+# 向量化环境一次step推进1024局，需要NumPy
+def bench_vec_step(num_envs):
+    from vec_env import VecEngine
+    env = VecEngine(num_envs, speed=12, seed=SEED)
+    actions = env.rng.integers(-1, 4, (64, num_envs))
+
+    def run(number):
+        for i in range(number):
+            env.step(actions[i % len(actions)])
+    return run
+
+if importlib.util.find_spec("numpy") is not None:
+    BENCHMARKS["vec_step/envs=1024"] = (bench_vec_step, (1024,), 500)
+
+def new_game():
+    from main import Game
+    game = Game(speed=12, seed=SEED)
+    game.record_replays = False
+    game.snake.wall_pass = True
+    return game
+
+def bench_game_tick():
+    def run(number):
+        for _ in range(number):
+            if run.game is None or run.game.engine.game_over or run.game.snake.length > 1500:
+                run.game = new_game()
+            feed(run.game.engine)
+            run.game.tick()
+            run.game.dirty_cells.clear()
+    run.game = None
+    return run
+
+BENCHMARKS["game_tick/eating"] = (bench_game_tick, (), 5000)
+
+def bench_game_draw(length):
+    def run(number):
+        game = run.game
+        for _ in range(number):
+            if len(game.snake.positions) < length:
+                feed(game.engine)
+            game.tick()
+            game.alpha = 0.5
+            game.draw(game.screen)
+            if game.engine.game_over:
+                run.game = game = new_game()
+    run.game = new_game()
+    return run
+
+BENCHMARKS["game_draw/dirty"] = (bench_game_draw, (200,), 2000)
+
+def bench_game_draw_full():
+    def run(number):
+        for _ in range(number):
+            game.full_redraw = True
+            game.draw(game.screen)
+    game = new_game()
+    for _ in range(300):
+        feed(game.engine)
+        game.tick()
+    return run
+
+BENCHMARKS["game_draw/full"] = (bench_game_draw_full, (), 200)
+
+# 400x300棋盘、4像素格子时整个棋盘都在视口内，蛇沿回路排满length格
+def bench_game_draw_long(length, use_numpy):
+    from main import Game
+    def run(number):
+        for _ in range(number):
+            game.full_redraw = True
+            game.draw(game.screen)
+    game = Game(speed=12, seed=SEED, board_width=400, board_height=300, cell_size=4)
+    game.sprites.use_numpy = use_numpy
+    body = game.snake.body
+    body.clear()
+    for x, y in hamiltonian_cycle(400, 300)[:length]:
+        body.push_head(body.pack(x, y))
+    game.snake.length = length
+    return run
+
+for _length in (1000, 30000):
+    BENCHMARKS[f"game_draw_long/blits/len={_length}"] = (bench_game_draw_long, (_length, False), 20)
+    if importlib.util.find_spec("numpy") is not None:
+        BENCHMARKS[f"game_draw_long/bitmap/len={_length}"] = (bench_game_draw_long, (_length, True), 20)
+
+# 录制一帧在游戏线程上的开销：拷贝进缓冲池，由后台线程交给不写出的输出
+def bench_capture_frame():
+    from capture import FrameCapture, NullSink
+    def run(number):
+        for _ in range(number):
+            # 等待后台线程归还缓冲区，确保每次都走拷贝路径而不是丢帧
+            while capture.free.empty():
+                time.sleep(0)
+            capture.frame(game.screen)
+    game = new_game()
+    game.draw(game.screen)
+    capture = FrameCapture(command="null", fps=1e9)
+    capture.start(game.screen, NullSink())
+    return run
+
+BENCHMARKS["capture_frame"] = (bench_capture_frame, (), 200)
+
+def bench_draw_grid():
+    def run(number):
+        for _ in range(number):
+            game.draw_grid(surface)
+    game = new_game()
+    surface = pygame.Surface(game.screen.get_size())
+    return run
+
+BENCHMARKS["game_draw_grid"] = (bench_draw_grid, (), 20)
+
+# 菜单空闲时的一帧（画面已缓存）与整屏重新合成
+def bench_menu_draw(state, compose):
+    def run(number):
+        for _ in range(number):
+            if compose:
+                menu.render_screen()
+            else:
+                menu.draw(screen)
+    from menu import Menu
+    from main import WINDOW_WIDTH, WINDOW_HEIGHT
+    new_game()  # 确保窗口已创建
+    screen = pygame.display.get_surface()
+    # 玩家数据写到临时目录，不读写当前目录下真实的存档
+    data_path = os.path.join(tempfile.mkdtemp(prefix="snake-bench-"), "player_data.json")
+    menu = Menu(WINDOW_WIDTH, WINDOW_HEIGHT, data_path=data_path)
+    menu.state = state
+    return run
+
+def register_menu_benchmarks():
+    from menu import MenuState
+    for state in MenuState:
+        BENCHMARKS[f"menu_draw/{state.name.lower()}"] = (bench_menu_draw, (state, False), 200)
+        BENCHMARKS[f"menu_compose/{state.name.lower()}"] = (bench_menu_draw, (state, True), 200)
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+# 与基线比较，返回超过阈值的回退项 [(名称, 基线, 当前, 比例)]
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        ratio = result["per_op_us"] / base["per_op_us"]
+        if ratio > 1 + threshold:
+            regressions.append((name, base["per_op_us"], result["per_op_us"], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="贪食蛇性能基准")
+    parser.add_argument("--filter", default="", help="只运行名称包含该字符串的基准")
+    parser.add_argument("--output", help="把结果写入JSON文件")
+    parser.add_argument("--baseline", help="与该基线JSON比较")
+    parser.add_argument("--save-baseline", help="把本次结果保存为基线")
+    parser.add_argument("--threshold", type=float, default=0.25, help="允许的回退比例，默认25%%")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="调整每轮调用次数")
+    args = parser.parse_args()
+
+    register_menu_benchmarks()
+    results = {}
+    for name, (factory, factory_args, number) in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        number = max(1, int(number * args.scale))
+        per_op = measure(factory(*factory_args), number, args.repeat)
+        results[name] = {"per_op_us": per_op, "number": number, "repeat": args.repeat}
+        print(f"{name:<32}{per_op:12.2f} us/op")
+
+    report = {"environment": environment(), "seed": SEED, "results": results}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, base, current, ratio in regressions:
+            print(f"性能回退: {name} {base:.2f} -> {current:.2f} us/op ({ratio - 1:+.0%})")
+        if regressions:
+            return 1
+        print("未发现超过阈值的性能回退")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
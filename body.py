@@ -0,0 +1,128 @@
+from array import array
+
+# 环形缓冲区的初始容量，蛇身占满时翻倍，最多到棋盘格子数
+INITIAL_CAPACITY = 16
+
+# 蛇身存储：环形缓冲区（存放打包后的格子索引）+ 棋盘占用位图
+# 头部插入（均摊）、尾部弹出和碰撞检测都是O(1)；缓冲区大小与蛇长成正比，位图每格1位
+class SnakeBody:
+    def __init__(self, width, height, capacity=None, free=None):
+        self.width = width
+        self.height = height
+        self.max_capacity = width * height
+        self.capacity = capacity or min(INITIAL_CAPACITY, self.max_capacity)
+        self.cells = array('i', [0]) * self.capacity  # 环形缓冲区
+        self.occupied = bytearray((width * height + 7) // 8)  # 占用位图，每格1位
+        self.head_slot = 0  # 蛇头在缓冲区中的下标
+        self.size = 0
+        self.free = free  # 可选的空闲格子索引，随蛇身增减同步更新
+
+    # 坐标与格子索引互相转换
+    def pack(self, x, y):
+        return y * self.width + x
+
+    def unpack(self, cell):
+        return cell % self.width, cell // self.width
+
+    def is_occupied(self, cell):
+        return self.occupied[cell >> 3] & (1 << (cell & 7)) != 0
+
+    def __contains__(self, position):
+        return self.is_occupied(self.pack(*position))
+
+    def __len__(self):
+        return self.size
+
+    def head(self):
+        return self.cells[self.head_slot]
+
+    def tail(self):
+        return self.cells[(self.head_slot + self.size - 1) % self.capacity]
+
+    def push_head(self, cell):
+        if self.size == self.capacity:
+            self.grow()
+        self.head_slot = (self.head_slot - 1) % self.capacity
+        self.cells[self.head_slot] = cell
+        self.occupied[cell >> 3] |= 1 << (cell & 7)
+        self.size += 1
+        if self.free is not None:
+            self.free.discard(cell)
+
+    # 容量翻倍，蛇身按从头到尾的顺序搬到新缓冲区的开头
+    def grow(self):
+        if self.capacity >= self.max_capacity:
+            raise OverflowError("蛇身已占满缓冲区")
+        capacity = min(self.capacity * 2, self.max_capacity)
+        cells = self.cell_array()
+        cells.extend(array('i', [0]) * (capacity - self.size))
+        self.cells = cells
+        self.capacity = capacity
+        self.head_slot = 0
+
+    def pop_tail(self):
+        cell = self.tail()
+        self.occupied[cell >> 3] &= ~(1 << (cell & 7)) & 0xFF
+        self.size -= 1
+        if self.free is not None:
+            self.free.add(cell)
+        return cell
+
+    # 按从头到尾的顺序取第i节的格子索引
+    def cell_at(self, i):
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError("蛇身下标越界")
+        return self.cells[(self.head_slot + i) % self.capacity]
+
+    # 从头到尾的格子索引，直接切片环形缓冲区
+    def cell_array(self):
+        start = self.head_slot
+        end = start + self.size
+        if end <= self.capacity:
+            return self.cells[start:end]
+        return self.cells[start:] + self.cells[:end - self.capacity]
+
+    def iter_cells(self):
+        cells = self.cells
+        start = self.head_slot
+        end = start + self.size
+        if end <= self.capacity:
+            yield from cells[start:end]
+        else:
+            yield from cells[start:]
+            yield from cells[:end - self.capacity]
+
+    def clear(self):
+        # 只清掉蛇身占用的位，避免大棋盘上整块重置
+        for cell in self.iter_cells():
+            self.occupied[cell >> 3] = 0
+            if self.free is not None:
+                self.free.add(cell)
+        self.head_slot = 0
+        self.size = 0
+
+# positions的惰性视图：按需把格子索引还原成(x, y)，不复制整条蛇
+class PositionsView:
+    def __init__(self, body):
+        self.body = body
+
+    def __len__(self):
+        return self.body.size
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.body.size))]
+        return self.body.unpack(self.body.cell_at(i))
+
+    def __iter__(self):
+        width = self.body.width
+        for cell in self.body.iter_cells():
+            yield cell % width, cell // width
+
+    def __contains__(self, position):
+        return position in self.body
+
+    def __repr__(self):
+        return repr(list(self))
@@ -0,0 +1,174 @@
+import os
+import sys
+import time
+import queue
+import shlex
+import atexit
+import threading
+import subprocess
+import pygame
+
+# 游戏画面录制：游戏线程只把画面拷贝进预先分配的缓冲区，编码和写盘由后台线程完成
+# 缓冲区用完（写入跟不上）时直接丢弃这一帧并计数，游戏线程从不等待磁盘或编码器
+# 关闭时frame()只做一次属性判断
+
+# 输出为PNG序列：目录/frame_000000.png
+class PngSequence:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, index, surface):
+        pygame.image.save(surface, os.path.join(self.directory, f"frame_{index:06d}.png"))
+
+    def close(self):
+        pass
+
+# 输出到外部编码器的标准输入（原始像素流），命令中可使用
+# {width} {height} {fps} {pix_fmt} 占位符，例如：
+#   ffmpeg -y -f rawvideo -pix_fmt {pix_fmt} -s {width}x{height} -r {fps} -i - clip.mp4
+class EncoderPipe:
+    def __init__(self, command, surface, fps):
+        width, height = surface.get_size()
+        self.pix_fmt = raw_pixel_format(surface)
+        args = shlex.split(command.format(width=width, height=height, fps=fps,
+                                          pix_fmt=self.pix_fmt or "rgb24"))
+        self.process = subprocess.Popen(args, stdin=subprocess.PIPE)
+
+    def write(self, index, surface):
+        if self.pix_fmt is None:
+            self.process.stdin.write(pygame.image.tobytes(surface, "RGB"))
+        else:
+            self.process.stdin.write(surface.get_view("0"))
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+# 不写出任何内容，用于测量录制本身的开销
+class NullSink:
+    def write(self, index, surface):
+        pass
+
+    def close(self):
+        pass
+
+# 32位无填充的像素内存可以直接交给编码器，返回对应的ffmpeg像素格式名；否则返回None
+def raw_pixel_format(surface):
+    if surface.get_bytesize() != 4 or surface.get_pitch() != surface.get_width() * 4 \
+            or sys.byteorder != 'little':
+        return None
+    r, g, b, a = surface.get_masks()
+    if (r, g, b) == (0xFF0000, 0xFF00, 0xFF):
+        return "bgra" if a else "bgr0"
+    if (r, g, b) == (0xFF, 0xFF00, 0xFF0000):
+        return "rgba" if a else "rgb0"
+    return None
+
+class FrameCapture:
+    def __init__(self, directory=None, command=None, fps=30, pool_size=8):
+        self.directory = directory
+        self.command = command
+        self.enabled = bool(directory or command)
+        self.fps = fps
+        self.pool_size = pool_size
+        self.sink = None
+        self.free = queue.Queue()  # 空闲缓冲区
+        self.frames = queue.Queue()  # 待写出的 (序号, 缓冲区)，数量不超过缓冲区总数
+        self.thread = None
+        self.next_time = 0.0
+        self.captured = 0
+        self.dropped = 0
+        self.written = 0
+        self.copy_time = 0.0
+        self.failed = False
+
+    # 第一帧时按窗口大小和像素格式分配缓冲区并启动输出
+    def start(self, screen, sink=None):
+        try:
+            if sink is None:
+                sink = EncoderPipe(self.command, screen, self.fps) if self.command \
+                    else PngSequence(self.directory)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"启动录制失败: {e}")
+            self.enabled = False
+            return False
+        self.sink = sink
+        for _ in range(self.pool_size):
+            self.free.put(pygame.Surface(screen.get_size(), 0, screen))
+        self.thread = threading.Thread(target=self.run, name="frame-capture", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+        self.next_time = time.perf_counter()
+        return True
+
+    # 在Game.draw之后调用，按fps限制录制频率
+    def frame(self, screen):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.sink is None and not self.start(screen):
+            return
+        if now < self.next_time:
+            return
+        # 落后超过一帧时不补帧
+        self.next_time = max(self.next_time + 1.0 / self.fps, now)
+        if self.failed:
+            self.dropped += 1
+            return
+        try:
+            buffer = self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return
+        buffer.blit(screen, (0, 0))
+        self.frames.put((self.captured, buffer))
+        self.captured += 1
+        self.copy_time += time.perf_counter() - now
+
+    def run(self):
+        while True:
+            item = self.frames.get()
+            if item is None:
+                return
+            index, buffer = item
+            if not self.failed:
+                try:
+                    self.sink.write(index, buffer)
+                    self.written += 1
+                except (OSError, pygame.error) as e:
+                    print(f"写入录制帧失败: {e}")
+                    self.failed = True
+            self.free.put(buffer)
+
+    # 写完已拷贝的帧后关闭输出
+    def close(self):
+        if self.thread is None:
+            return
+        self.frames.put(None)
+        self.thread.join()
+        self.thread = None
+        self.enabled = False
+        try:
+            self.sink.close()
+        except OSError as e:
+            print(f"关闭录制输出失败: {e}")
+        print(self.report())
+
+    def report(self):
+        average = self.copy_time / self.captured * 1000 if self.captured else 0.0
+        return (f"录制 {self.captured} 帧, 写出 {self.written} 帧, 丢弃 {self.dropped} 帧, "
+                f"平均拷贝 {average:.3f} ms/帧")
+
+# 通过环境变量开启：SNAKE_CAPTURE=目录（PNG序列）或 SNAKE_CAPTURE_PIPE=编码器命令，
+# SNAKE_CAPTURE_FPS=录制帧率（默认30）
+def capture_from_env():
+    try:
+        fps = max(1, int(os.environ.get("SNAKE_CAPTURE_FPS", "30")))
+    except ValueError as e:
+        print(f"录制帧率无效: {e}")
+        fps = 30
+    return FrameCapture(directory=os.environ.get("SNAKE_CAPTURE"),
+                        command=os.environ.get("SNAKE_CAPTURE_PIPE"), fps=fps)
+
+capture = capture_from_env()
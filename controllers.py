@@ -0,0 +1,423 @@
+import sys
+import time
+import heapq
+import random
+import argparse
+from collections import deque
+from engine import Engine, DIRECTIONS, is_reverse
+from input_queue import InputQueue, LatencyStats
+
+# 自动驾驶每次决策最多展开的格子数（所有搜索合计），使单次决策在1ms以内
+SEARCH_BUDGET = 300
+
+# 控制器：每个tick调用一次next_action(engine)，返回要应用的方向或None（保持方向）
+# 键盘、自动驾驶等都通过同一接口接入Game.tick和无界面的play()
+
+# 键盘控制：Game.handle_keys把方向键放入队列，每个tick取出一个
+class KeyboardController:
+    def __init__(self, input_queue=None):
+        self.input_queue = input_queue if input_queue is not None else InputQueue()
+
+    def next_action(self, engine):
+        snake = engine.snake
+        return self.input_queue.pop(snake.direction, snake.speed)
+
+    def reset(self):
+        self.input_queue.clear()
+
+# 脚本控制：每个tick以turn_chance的概率随机转向，只避开下一步就会撞上的方向
+# 作为不吃食物也能存活一段时间的基线，用于批量测试和难度调参
+class RandomController:
+    def __init__(self, seed=None, turn_chance=0.2):
+        self.rng = random.Random(seed)
+        self.turn_chance = turn_chance
+
+    def reset(self):
+        pass
+
+    def next_action(self, engine):
+        snake = engine.snake
+        safe = [d for d in DIRECTIONS
+                if not is_reverse(d, snake.direction) and self.safe(engine, d)]
+        if not safe:
+            return None
+        if snake.direction in safe and self.rng.random() >= self.turn_chance:
+            return None
+        return self.rng.choice(safe)
+
+    def safe(self, engine, direction):
+        snake = engine.snake
+        x, y = snake.get_head_position()
+        x, y = x + direction[0], y + direction[1]
+        if not (0 <= x < engine.width and 0 <= y < engine.height):
+            if not snake.wall_pass:
+                return False
+            x %= engine.width
+            y %= engine.height
+        cell = y * engine.width + x
+        if engine.obstacles.is_blocked(cell):
+            return False
+        return not snake.body.is_occupied(cell) or cell == snake.body.tail()
+
+# 自动驾驶：A*找到食物的最短路径，并确认吃到后还能追上自己的尾巴
+# 路径在tick之间缓存，只在食物变化或路径被障碍物截断时重新规划或局部修补
+# 没有安全路径时沿着尾巴绕圈拖延，隔一段时间再尝试规划，连续失败时间隔逐次加倍
+# 每次决策最多展开search_budget个格子，用完时沿用缓存的追尾路径，保证决策耗时有上界
+class BotController:
+    def __init__(self, replan_interval=4, max_replan_interval=32, search_budget=SEARCH_BUDGET):
+        self.replan_interval = replan_interval
+        self.max_replan_interval = max_replan_interval
+        self.stall_limit = replan_interval
+        self.food = None  # 当前食物位置及其出现的tick，用于判断是否饿得太久
+        self.food_since = 0
+        self.path = deque()  # 接下来要走的格子索引（不含蛇头）
+        self.target = None  # 路径终点对应的食物位置，拖延时为None
+        self.trail = None  # 追尾路径终点在蛇身中的 (下标, tick)，用于逐tick延长路径
+        self.obstacle_count = 0
+        self.stall_ticks = 0
+        self.search_budget = search_budget
+        self.budget = search_budget  # 本次决策剩余可展开的格子数
+        self.exhausted = False  # 本次决策是否有搜索因预算用完而中止
+        self.closest = None  # 上一次A*预算用完时，到离目标最近的已展开格子的路径
+        self.decisions = LatencyStats()
+        self.replans = 0
+        self.repairs = 0
+        self.budget_stops = 0
+
+    def reset(self):
+        self.path.clear()
+        self.target = None
+        self.trail = None
+        self.obstacle_count = 0
+        self.stall_ticks = 0
+        self.stall_limit = self.replan_interval
+        self.food = None
+
+    def next_action(self, engine):
+        start = time.perf_counter()
+        direction = self.decide(engine)
+        self.decisions.add(time.perf_counter() - start)
+        return direction
+
+    def decide(self, engine):
+        self.budget = self.search_budget
+        self.exhausted = False
+        snake = engine.snake
+        body = snake.body
+        head = body.head()
+        if engine.food.position != self.food:
+            self.food = engine.food.position
+            self.food_since = engine.ticks
+        if len(engine.obstacles) != self.obstacle_count:
+            self.obstacle_count = len(engine.obstacles)
+            self.repair(engine, head)
+        # 刚吃到目标食物：路径剩下的部分就是规划时确认过的追尾路径
+        if self.target is not None and self.target != engine.food.position:
+            if self.trail is not None and head == self.target[1] * engine.width + self.target[0]:
+                self.target = None
+                self.stall_ticks = 0
+            else:
+                self.path.clear()
+        # 缓存的路径失效：不再与蛇头相邻、或下一步会撞上
+        if self.path and (self.path[0] not in self.neighbors(engine, head)
+                          or not self.enterable(engine, self.path[0])):
+            self.path.clear()
+        if self.target is None:
+            self.follow_tail(engine)
+        if not self.path or (self.target is None and self.stall_ticks >= self.stall_limit):
+            self.plan(engine, head)
+        if not self.path:
+            return self.escape(engine, head)
+        if self.target is None:
+            self.stall_ticks += 1
+        return self.direction_to(engine, head, self.path.popleft())
+
+    # 追尾路径的终点是蛇身上的格子，顺着蛇身往蛇头方向补上后面的格子：
+    # 这些格子会在走到之前按顺序让出来。终点在蛇身中的下标每个tick加1，只需记住规划时的下标
+    def follow_tail(self, engine):
+        if not self.path or self.trail is None:
+            return
+        body = engine.snake.body
+        index, tick = self.trail
+        index += engine.ticks - tick
+        while len(self.path) < self.max_replan_interval and 0 < index < len(body):
+            index -= 1
+            self.path.append(body.cell_at(index))
+        self.trail = (index, engine.ticks)
+
+    # 规划到食物的路径；不安全时改为追尾巴
+    # 绕圈太久（超过棋盘格子数个tick）仍等不到安全路径时冒险去吃，保证每局都能结束
+    # 预算用完无法确认安全时同样按不安全处理，继续沿用缓存的追尾路径
+    def plan(self, engine, head):
+        self.replans += 1
+        self.stall_ticks = 0
+        cached = self.path if self.target is None else None
+        food = engine.food.position
+        if food is not None:
+            # 留出一部分预算，找不到安全的食物路径时还能规划追尾路径
+            reserve = self.budget // 3
+            self.budget -= reserve
+            goal = food[1] * engine.width + food[0]
+            path = self.search(engine, head, (goal,), guide=goal)
+            self.budget += reserve
+            # 食物太远、预算内找不到时，只要安全就先朝食物走一段，走完这段再重新规划，
+            # 期间仍按追尾路径处理，后面接上安全检查找到的追尾路径
+            closest = self.closest
+            after = self.safe_after(engine, closest) if path is None and closest else None
+            if after is not None:
+                self.path = deque(closest)
+                self.path.extend(after)
+                self.trail = (len(engine.snake.body) - 1 - len(closest), engine.ticks)
+                self.target = None
+                self.stall_limit = len(closest)
+                return
+            starving = engine.ticks - self.food_since > engine.width * engine.height
+            after = self.safe_after(engine, path) if path else None
+            if path and (starving or after is not None):
+                # 吃到之后接着走安全检查找到的追尾路径
+                self.path = deque(path)
+                self.trail = None
+                if after:
+                    self.path.extend(after)
+                    self.trail = (len(engine.snake.body) - 1 - len(path), engine.ticks)
+                self.target = food
+                self.stall_limit = self.replan_interval
+                return
+            # 蛇身把食物围住时，一直追尾巴只会原地绕圈，改为离开当前的圈
+            if starving and path is None and not self.exhausted:
+                self.target = None
+                self.trail = None
+                self.path.clear()
+                return
+        if self.target is None:
+            self.stall_limit = min(self.stall_limit * 2, self.max_replan_interval)
+        self.target = None
+        if cached:
+            self.path = cached
+            return
+        body = engine.snake.body
+        path = self.search(engine, head, (body.tail(),), guide=body.tail())
+        self.path = deque(path or ())
+        self.trail = (len(body) - 1, engine.ticks) if path else None
+        self.follow_tail(engine)
+
+    # 新障碍物落在缓存路径上时，从蛇头重新连到障碍物之后的路径
+    def repair(self, engine, head):
+        path = list(self.path)
+        broken = [i for i, cell in enumerate(path) if engine.obstacles.is_blocked(cell)]
+        if not broken:
+            return
+        self.repairs += 1
+        rest = path[broken[-1] + 1:]
+        index = {cell: i for i, cell in enumerate(rest)}
+        prefix = self.search(engine, head, index)
+        if prefix is None:
+            self.path.clear()
+            return
+        self.path = deque(prefix + rest[index[prefix[-1]] + 1:])
+
+    # 广度优先搜索，返回从start出发（不含start）到goals中任一格子的路径
+    # 目标格子本身可以被占据（例如蛇尾，走到时已经让出）
+    # added/vacated用于假设的蛇身：在当前蛇身基础上额外占据/让出的格子
+    # 给出guide时改为以到guide的曼哈顿距离为启发的A*，大棋盘上只展开路径附近的格子
+    # 预算用完时返回None，A*另外把到已展开格子中离guide最近的一个的路径记在closest
+    def search(self, engine, start, goals, added=(), vacated=(), guide=None):
+        width, height = engine.width, engine.height
+        wrap = engine.snake.wall_pass
+        # 内联位图检查，避免每个格子两次方法调用
+        snake_bits = engine.snake.body.occupied
+        obstacle_bits = engine.obstacles.blocked
+        if guide is not None:
+            gx, gy = guide % width, guide // width
+            half_width, half_height = width // 2, height // 2
+        parents = {start: None}
+        self.closest = None
+        closest, closest_distance = None, None
+        queue = deque() if guide is None else []
+        frontier = self.neighbors(engine, start, skip_reverse=start == engine.snake.body.head())
+        cell = start
+        cost = 1  # 从cell走到相邻格子的路径长度
+        budget = self.budget
+        while True:
+            if budget <= 0:
+                self.budget = 0
+                self.exhausted = True
+                self.budget_stops += 1
+                if closest is not None:
+                    self.closest = self.trace(parents, start, closest)
+                return None
+            budget -= 1
+            for neighbor in frontier:
+                if neighbor in parents:
+                    continue
+                if neighbor in goals:
+                    self.budget = budget
+                    parents[neighbor] = cell
+                    return self.trace(parents, start, neighbor)
+                byte, bit = neighbor >> 3, 1 << (neighbor & 7)
+                if obstacle_bits[byte] & bit or neighbor in added or \
+                        (snake_bits[byte] & bit and neighbor not in vacated):
+                    continue
+                parents[neighbor] = cell
+                if guide is None:
+                    queue.append(neighbor)
+                    continue
+                dx = abs(neighbor % width - gx)
+                dy = abs(neighbor // width - gy)
+                if wrap:
+                    if dx > half_width:
+                        dx = width - dx
+                    if dy > half_height:
+                        dy = height - dy
+                # 估值相同时优先展开走得更远的格子
+                heapq.heappush(queue, (cost + dx + dy, -cost, neighbor))
+            if not queue:
+                self.budget = budget
+                return None
+            if guide is None:
+                cell = queue.popleft()
+            else:
+                estimate, cost, cell = heapq.heappop(queue)
+                if closest_distance is None or estimate + cost < closest_distance:
+                    closest, closest_distance = cell, estimate + cost
+                cost = 1 - cost
+            y, x = divmod(cell, width)
+            frontier = []
+            if y > 0:
+                frontier.append(cell - width)
+            elif wrap:
+                frontier.append(cell + (height - 1) * width)
+            if y < height - 1:
+                frontier.append(cell + width)
+            elif wrap:
+                frontier.append(x)
+            if x > 0:
+                frontier.append(cell - 1)
+            elif wrap:
+                frontier.append(cell + width - 1)
+            if x < width - 1:
+                frontier.append(cell + 1)
+            elif wrap:
+                frontier.append(cell - width + 1)
+
+    # 沿parents从cell回溯到start，返回不含start的路径
+    def trace(self, parents, start, cell):
+        path = []
+        while cell != start:
+            path.append(cell)
+            cell = parents[cell]
+        path.reverse()
+        return path
+
+    # 沿path吃到食物后，从新的蛇头能否到达新的蛇尾，能到达时返回这条追尾路径，否则返回None
+    # 假设的蛇身只记录与当前蛇身不同的部分，开销与路径长度成正比，与蛇长无关
+    def safe_after(self, engine, path):
+        body = engine.snake.body
+        length = len(body)
+        if length < 2:
+            return []
+        # 走完path后：path倒序成为新蛇身的前段，原蛇身只保留前length-len(path)节
+        kept = max(0, length - len(path))
+        added = path[-length:]
+        vacated = {body.cell_at(i) for i in range(kept, length)}
+        tail = body.cell_at(kept - 1) if kept else added[0]
+        return self.search(engine, path[-1], (tail,), added=set(added), vacated=vacated,
+                           guide=tail)
+
+    # 无路可走时选一个空邻居，优先周围空格最多的
+    def escape(self, engine, head):
+        tail = engine.snake.body.tail()
+        best = None
+        for neighbor in self.neighbors(engine, head, skip_reverse=True):
+            if neighbor != tail and self.blocked(engine, neighbor):
+                continue
+            space = sum(1 for cell in self.neighbors(engine, neighbor)
+                        if not self.blocked(engine, cell))
+            if best is None or space > best[0]:
+                best = (space, neighbor)
+        if best is None:
+            return None
+        return self.direction_to(engine, head, best[1])
+
+    def blocked(self, engine, cell):
+        return engine.obstacles.is_blocked(cell) or engine.snake.body.is_occupied(cell)
+
+    # 下一步能否走进cell：不增长时蛇尾会在这一步让出
+    def enterable(self, engine, cell):
+        snake = engine.snake
+        if not self.blocked(engine, cell):
+            return True
+        return cell == snake.body.tail() and len(snake.body) >= snake.length and \
+            not engine.obstacles.is_blocked(cell)
+
+    # 四个方向的相邻格子；穿墙状态下棋盘首尾相连
+    def neighbors(self, engine, cell, skip_reverse=False):
+        width, height = engine.width, engine.height
+        x, y = cell % width, cell // width
+        snake = engine.snake
+        result = []
+        for dx, dy in DIRECTIONS:
+            if skip_reverse and is_reverse((dx, dy), snake.direction):
+                continue
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < width and 0 <= ny < height):
+                if not snake.wall_pass:
+                    continue
+                nx %= width
+                ny %= height
+            result.append(ny * width + nx)
+        return result
+
+    def direction_to(self, engine, head, cell):
+        width, height = engine.width, engine.height
+        dx = cell % width - head % width
+        dy = cell // width - head // width
+        # 穿墙时坐标差会跨越整个棋盘
+        if abs(dx) > 1:
+            dx = -1 if dx > 0 else 1
+        if abs(dy) > 1:
+            dy = -1 if dy > 0 else 1
+        return (dx, dy)
+
+    def report(self):
+        return dict(self.decisions.summary(), replans=self.replans, repairs=self.repairs,
+                    budget_stops=self.budget_stops)
+
+# 无界面地用控制器跑完一局，返回引擎
+def play(engine, controller, max_ticks=None):
+    while not engine.game_over and (max_ticks is None or engine.ticks < max_ticks):
+        engine.step(controller.next_action(engine))
+    return engine
+
+# 自动驾驶浸泡测试：连续跑多局并汇总分数和决策耗时
+def main():
+    parser = argparse.ArgumentParser(description="贪食蛇自动驾驶浸泡测试")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--speed", type=int, default=5)
+    parser.add_argument("--width", type=int, default=50)
+    parser.add_argument("--height", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0, help="第i局使用种子seed+i")
+    parser.add_argument("--max-ticks", type=int, default=None)
+    args = parser.parse_args()
+
+    bot = BotController()
+    scores = []
+    start = time.perf_counter()
+    for i in range(args.games):
+        engine = Engine(speed=args.speed, seed=args.seed + i, width=args.width, height=args.height)
+        bot.reset()
+        play(engine, bot, args.max_ticks)
+        scores.append(engine.snake.score)
+        print(f"第{i + 1}局: 分数 {engine.snake.score}, 等级 {engine.level}, "
+              f"长度 {len(engine.snake.body)}, tick {engine.ticks}")
+    elapsed = time.perf_counter() - start
+    report = bot.report()
+    print(f"{args.games}局用时 {elapsed:.1f}s, 平均分 {sum(scores) / len(scores):.1f}, "
+          f"最高分 {max(scores)}")
+    print(f"决策耗时: 平均 {report['mean_ms']:.3f}ms, p95 {report['p95_ms']:.3f}ms, "
+          f"最大 {report['max_ms']:.3f}ms, 规划 {report['replans']}次, 修补 {report['repairs']}次, "
+          f"预算用完 {report['budget_stops']}次")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,250 @@
+import random
+from collections import namedtuple
+from enum import Enum
+from body import SnakeBody, PositionsView
+from free_cells import FreeCellIndex
+from obstacles import ObstacleLayer
+
+# 纯Python游戏规则引擎，不依赖pygame，可无界面高速运行
+
+# 棋盘尺寸（格子数）
+GRID_WIDTH = 50
+GRID_HEIGHT = 40
+
+# 方向定义
+UP = (0, -1)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+DIRECTIONS = [DOWN, UP, RIGHT, LEFT]
+
+# 食物类型枚举
+class FoodType(Enum):
+    NORMAL = 1
+    SPEED_UP = 2
+    SPEED_DOWN = 3
+    WALL_PASS = 4
+
+SPECIAL_FOOD_TYPES = [FoodType.SPEED_UP, FoodType.SPEED_DOWN, FoodType.WALL_PASS]
+
+# 引擎事件类型枚举
+class EventType(Enum):
+    FOOD_EATEN = 1      # data: 被吃掉的食物类型
+    LEVEL_UP = 2        # data: 新等级
+    OBSTACLE_ADDED = 3  # data: 障碍物位置
+    GAME_OVER = 4       # data: 最终分数
+    BOARD_FULL = 5      # data: 最终分数，棋盘已无空格可放食物
+
+Event = namedtuple('Event', ['type', 'data'])
+
+# 游戏结束原因
+class DeathCause(Enum):
+    WALL = 1
+    SELF = 2
+    OBSTACLE = 3
+    BOARD_FULL = 4
+
+# 根据速度返回难度参数: (障碍物频率, 特殊食物概率)
+def difficulty_settings(speed):
+    if speed <= 5:  # 简单难度
+        return 7, 0.3  # 每7级添加一个障碍物，特殊食物出现概率30%
+    elif speed <= 8:  # 中等难度
+        return 5, 0.5  # 每5级添加一个障碍物，特殊食物出现概率50%
+    else:  # 困难难度
+        return 3, 0.7  # 每3级添加一个障碍物，特殊食物出现概率70%
+
+# 判断两个方向是否相反
+def is_reverse(a, b):
+    return a[0] == -b[0] and a[1] == -b[1]
+
+# 蛇类
+class Snake:
+    def __init__(self, rng=None, width=GRID_WIDTH, height=GRID_HEIGHT, free=None, obstacles=None):
+        self.rng = rng or random.Random()
+        self.width = width
+        self.height = height
+        self.body = SnakeBody(width, height, free=free)
+        self.obstacles = obstacles  # 可选的障碍物层，撞上即死亡
+        self.positions = PositionsView(self.body)
+        self.reset()
+
+    def get_head_position(self):
+        return self.body.unpack(self.body.head())
+
+    def turn(self, direction):
+        # 不允许直接掉头
+        if direction is None or is_reverse(direction, self.direction):
+            return False
+        self.direction = direction
+        return True
+
+    # 前进一格，撞到时返回False，原因记录在collision中
+    def update(self):
+        body = self.body
+        head = body.head()
+        x, y = head % self.width + self.direction[0], head // self.width + self.direction[1]
+        # 越界时只有穿墙状态才能从另一侧出现
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            if not self.wall_pass:
+                self.collision = DeathCause.WALL
+                return False
+            x %= self.width
+            y %= self.height
+        new = y * self.width + x
+        if self.obstacles is not None and self.obstacles.is_blocked(new):
+            self.collision = DeathCause.OBSTACLE
+            return False
+        # 不增长时尾巴会让出位置，追着尾巴走不算撞到自己
+        growing = len(body) < self.length
+        if body.is_occupied(new) and (growing or new != body.tail()):
+            self.collision = DeathCause.SELF
+            return False
+        if not growing:
+            body.pop_tail()
+        body.push_head(new)
+        return True
+
+    def reset(self):
+        self.length = 1
+        self.body.clear()
+        self.body.push_head(self.body.pack(self.width // 2, self.height // 2))
+        self.direction = self.rng.choice(DIRECTIONS)
+        self.score = 0
+        self.speed = 5  # 将重置后的速度也改为5
+        self.wall_pass = False
+        self.growth_points = 0
+        self.collision = None
+
+# 食物类
+class Food:
+    def __init__(self, rng=None, width=GRID_WIDTH, height=GRID_HEIGHT, free=None):
+        self.rng = rng or random.Random()
+        self.width = width
+        self.height = height
+        self.free = free if free is not None else FreeCellIndex(width * height)
+        self.position = (0, 0)
+        self.type = FoodType.NORMAL
+        self.randomize_position()
+
+    # 从空闲格子中均匀抽取新位置，旧位置通常已被蛇头占据，由调用方负责
+    # 棋盘已满时返回False
+    def randomize_position(self, special_food_chance=0.5):
+        cell = self.free.sample(self.rng)
+        if cell is None:
+            self.position = None
+            return False
+        self.free.discard(cell)
+        self.position = (cell % self.width, cell // self.width)
+
+        # 根据难度决定是否生成特殊食物
+        if self.rng.random() < special_food_chance:
+            self.type = self.rng.choice(SPECIAL_FOOD_TYPES)
+        else:
+            self.type = FoodType.NORMAL
+        return True
+
+# 游戏引擎：持有全部规则状态，每次step推进一个tick并返回事件列表
+class Engine:
+    def __init__(self, speed=5, seed=None, width=GRID_WIDTH, height=GRID_HEIGHT):
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.width = width
+        self.height = height
+        self.free = FreeCellIndex(width * height)
+        self.obstacles = ObstacleLayer(width, height, free=self.free)
+        self.snake = Snake(self.rng, width, height, free=self.free, obstacles=self.obstacles)
+        self.snake.speed = speed  # 设置蛇的初始速度
+        self.difficulty_speed = speed  # 选择的难度对应的初始速度
+        self.food = Food(self.rng, width, height, free=self.free)
+        self.level = 1
+        self.ticks = 0
+        self.game_over = False
+        self.obstacle_frequency, self.special_food_chance = difficulty_settings(speed)
+        self.recorder = None  # 可选的录像记录器，记录每次生效的转向
+        self.foods_eaten = {food_type: 0 for food_type in FoodType}
+        self.death_cause = None
+
+    # action为方向元组或None（保持当前方向）
+    def step(self, action=None):
+        events = []
+        if self.game_over:
+            return events
+        snake = self.snake
+        if snake.turn(action) and self.recorder is not None:
+            self.recorder.record(self.ticks, action)
+        self.ticks += 1
+
+        if not snake.update():
+            self.game_over = True
+            self.death_cause = snake.collision
+            events.append(Event(EventType.GAME_OVER, snake.score))
+            return events
+
+        # 检查食物碰撞
+        if snake.get_head_position() == self.food.position:
+            food_type = self.food.type
+            snake.length += 1
+            snake.score += 10
+            if food_type == FoodType.SPEED_UP:
+                snake.speed += 2
+            elif food_type == FoodType.SPEED_DOWN:
+                snake.speed = max(5, snake.speed - 2)
+            elif food_type == FoodType.WALL_PASS:
+                snake.wall_pass = True
+            placed = self.food.randomize_position(self.special_food_chance)
+            snake.growth_points += 1
+            self.foods_eaten[food_type] += 1
+            events.append(Event(EventType.FOOD_EATEN, food_type))
+
+            # 棋盘填满，本局结束
+            if not placed:
+                self.game_over = True
+                self.death_cause = DeathCause.BOARD_FULL
+                events.append(Event(EventType.BOARD_FULL, snake.score))
+                events.append(Event(EventType.GAME_OVER, snake.score))
+                return events
+
+            # 升级检查
+            if snake.growth_points >= 5:
+                self.level += 1
+                snake.growth_points = 0
+                events.append(Event(EventType.LEVEL_UP, self.level))
+                # 根据难度添加新的障碍物
+                # 不放在蛇头正前方，也不会把棋盘封闭出无法到达的区域
+                if self.level % self.obstacle_frequency == 0:
+                    obstacle = self.obstacles.place_random(self.rng, avoid=(self.next_head_cell(),))
+                    if obstacle is not None:
+                        events.append(Event(EventType.OBSTACLE_ADDED, obstacle))
+
+        return events
+
+    # 蛇头按当前方向前进一格后的格子索引（穿墙时取模）
+    def next_head_cell(self):
+        x, y = self.snake.get_head_position()
+        x = (x + self.snake.direction[0]) % self.width
+        y = (y + self.snake.direction[1]) % self.height
+        return y * self.width + x
+
+    # 原地开始新的一局，不重新分配棋盘大小的数组
+    # speed不传时沿用当前难度；seed不传时随机选取。重置后的对局与同参数新建的引擎逐tick一致
+    def reset(self, speed=None, seed=None):
+        if speed is not None:
+            self.difficulty_speed = speed
+            self.obstacle_frequency, self.special_food_chance = difficulty_settings(speed)
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.rng.seed(seed)
+        self.free.reset()
+        self.obstacles.clear()
+        self.snake.reset()
+        self.snake.speed = self.difficulty_speed
+        # 与构造时一样，第一个食物按默认概率生成
+        self.food.randomize_position()
+        self.level = 1
+        self.ticks = 0
+        self.game_over = False
+        self.foods_eaten = {food_type: 0 for food_type in FoodType}
+        self.death_cause = None
@@ -0,0 +1,69 @@
+import pygame
+from collections import OrderedDict
+
+# 中文字体路径，找不到时回退到pygame默认字体
+FONT_PATH = "C:\\Windows\\Fonts\\simhei.ttf"
+
+# 进程级字体注册表：每个(路径, 字号)只加载一次，回退结果也只解析一次
+class FontRegistry:
+    def __init__(self):
+        self.fonts = {}
+        self.missing_paths = set()  # 已确认无法加载的字体路径
+
+    def get(self, size, path=FONT_PATH):
+        key = (path, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.load(size, path)
+            self.fonts[key] = font
+        return font
+
+    def load(self, size, path):
+        if path is not None and path not in self.missing_paths:
+            try:
+                return pygame.font.Font(path, size)  # 使用中文字体
+            except (OSError, pygame.error):
+                self.missing_paths.add(path)
+        return pygame.font.Font(None, size)  # 如果找不到中文字体，使用默认字体
+
+    def clear(self):
+        self.fonts.clear()
+
+# 渲染文字缓存：按(文字, 字号, 颜色)缓存渲染好的Surface，LRU淘汰
+# 返回的Surface是共享的，调用方不要在上面绘制
+class TextCache:
+    def __init__(self, registry, maxsize=256):
+        self.registry = registry
+        self.maxsize = maxsize
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, size, color, path=FONT_PATH):
+        key = (text, size, tuple(color), path)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = self.registry.get(size, path).render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.maxsize:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.surfaces)}
+
+    def clear(self):
+        self.surfaces.clear()
+
+font_registry = FontRegistry()
+text_cache = TextCache(font_registry)
+
+def get_font(size, path=FONT_PATH):
+    return font_registry.get(size, path)
+
+def render_text(text, size, color, path=FONT_PATH):
+    return text_cache.render(text, size, color, path)
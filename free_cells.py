@@ -0,0 +1,148 @@
+from array import array
+
+# 各尺寸的0..size-1模板数组，新建和重置的索引直接共享模板，不逐个元素构造
+RANGES = {}
+
+# fork时改动记录超过这个数量就先复制出自己的数组，让fork只复制很小的改动记录
+FORK_CHANGES_LIMIT = 4096
+
+def index_range(size):
+    template = RANGES.get(size)
+    if template is None:
+        template = RANGES[size] = array('i', range(size))
+    return template
+
+# 空闲格子索引：cells前count项是所有空格子（交换删除），slots记录每个格子在cells中的下标
+# 添加、删除、均匀随机抽取都是O(1)，与棋盘填充率无关
+# cells/slots写时复制：新建、重置和fork时与模板或其他索引共享数组，期间的改动记在
+# changed_cells/changed_slots里，改动累积到棋盘格子数的1/16才复制出自己的数组（均摊O(1)），
+# 因此这三个操作都与棋盘大小无关
+class FreeCellIndex:
+    def __init__(self, size):
+        self.size = size
+        self.limit = max(16, size >> 4)
+        self.reset()
+
+    # 恢复为全部空闲
+    def reset(self):
+        template = index_range(self.size)
+        self.cells = template
+        self.slots = template  # -1表示该格子已被占用
+        self.count = self.size
+        self.changed_cells = {}  # 共享期间：下标 -> 格子
+        self.changed_slots = {}  # 共享期间：格子 -> 下标；持有自己的数组时两者都为None
+
+    # 复制一份独立的索引，双方共享数组，只复制改动记录
+    def fork(self):
+        if self.changed_slots is not None and len(self.changed_slots) > FORK_CHANGES_LIMIT:
+            self.unshare()
+        if self.changed_slots is None:
+            self.changed_cells, self.changed_slots = {}, {}
+        new = object.__new__(FreeCellIndex)
+        new.size = self.size
+        new.limit = self.limit
+        new.cells = self.cells
+        new.slots = self.slots
+        new.count = self.count
+        new.changed_cells = dict(self.changed_cells)
+        new.changed_slots = dict(self.changed_slots)
+        return new
+
+    # 复制出自己的数组并写入记下的改动
+    def unshare(self):
+        cells = self.cells[:]
+        slots = self.slots[:]
+        for slot, cell in self.changed_cells.items():
+            cells[slot] = cell
+        for cell, slot in self.changed_slots.items():
+            slots[cell] = slot
+        self.cells = cells
+        self.slots = slots
+        self.changed_cells = self.changed_slots = None
+
+    def slot_of(self, cell):
+        if self.changed_slots is not None:
+            slot = self.changed_slots.get(cell)
+            if slot is not None:
+                return slot
+        return self.slots[cell]
+
+    def cell_at(self, slot):
+        if self.changed_cells is not None:
+            cell = self.changed_cells.get(slot)
+            if cell is not None:
+                return cell
+        return self.cells[slot]
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, cell):
+        if self.changed_slots is None:
+            return self.slots[cell] >= 0
+        return self.slot_of(cell) >= 0
+
+    def discard(self, cell):
+        if self.changed_slots is not None:
+            self.discard_shared(cell)
+            return
+        slot = self.slots[cell]
+        if slot < 0:
+            return
+        # 用最后一个空格子填补被删除的位置
+        self.count -= 1
+        last = self.cells[self.count]
+        self.cells[slot] = last
+        self.slots[last] = slot
+        self.slots[cell] = -1
+
+    def add(self, cell):
+        if self.changed_slots is not None:
+            self.add_shared(cell)
+            return
+        if self.slots[cell] >= 0:
+            return
+        self.cells[self.count] = cell
+        self.slots[cell] = self.count
+        self.count += 1
+
+    # 共享数组时的discard/add，与上面的步骤相同，只是读写改动记录（热路径，内联查找）
+    def discard_shared(self, cell):
+        changed_cells, changed_slots = self.changed_cells, self.changed_slots
+        slot = changed_slots.get(cell)
+        if slot is None:
+            slot = self.slots[cell]
+        if slot < 0:
+            return
+        count = self.count = self.count - 1
+        last = changed_cells.get(count)
+        if last is None:
+            last = self.cells[count]
+        changed_cells[slot] = last
+        changed_slots[last] = slot
+        changed_slots[cell] = -1
+        if len(changed_slots) > self.limit:
+            self.unshare()
+
+    def add_shared(self, cell):
+        changed_slots = self.changed_slots
+        slot = changed_slots.get(cell)
+        if slot is None:
+            slot = self.slots[cell]
+        if slot >= 0:
+            return
+        count = self.count
+        self.changed_cells[count] = cell
+        changed_slots[cell] = count
+        self.count = count + 1
+        if len(changed_slots) > self.limit:
+            self.unshare()
+
+    # 均匀抽取一个空格子，棋盘已满时返回None
+    def sample(self, rng):
+        if self.count == 0:
+            return None
+        slot = rng.randrange(self.count)
+        if self.changed_cells is None:
+            return self.cells[slot]
+        return self.cell_at(slot)
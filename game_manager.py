@@ -1,10 +1,13 @@
+import os
 import pygame
-import sys
-from menu import Menu
-from main import Game, WINDOW_WIDTH, WINDOW_HEIGHT
-
-# 初始化Pygame
-pygame.init()
+import snapshot
+from assets import assets, init_pygame, startup
+from menu import Menu, MENU_IDLE_TIMEOUT
+from profiler import profiler
+from capture import capture
+from history import ScoreHistory
+from engine import GRID_WIDTH, GRID_HEIGHT
+from main import Game, WINDOW_WIDTH, WINDOW_HEIGHT, GRID_SIZE, RENDER_FPS, board_config
 
 # 游戏状态枚举
 class GameState:
@@ -14,44 +17,124 @@ class GameState:
 # 游戏管理器类
 class GameManager:
     def __init__(self):
+        startup.mark("模块导入完成")
+        init_pygame()
         self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
         pygame.display.set_caption('贪食蛇游戏')
+        startup.mark("创建窗口")
+        # 菜单绘制期间在后台初始化音频、加载音效
+        assets.preload()
         self.clock = pygame.time.Clock()
         self.state = GameState.MENU
         self.menu = Menu(WINDOW_WIDTH, WINDOW_HEIGHT)
+        startup.mark("创建菜单")
         self.game = None
+        # 每局的详细记录，首次启动时导入已有的最高纪录
+        self.history = ScoreHistory()
+        self.history.migrate_player_data(self.menu.player_data)
+        startup.mark("打开历史记录")
+        self.first_frame = True
         
+    # 上次关闭窗口时未结束的对局：读取后删除存档，恢复为暂停状态
+    def resume_game(self, path=snapshot.SAVE_PATH):
+        if not os.path.exists(path):
+            return None
+        try:
+            engine, paused = snapshot.load(path)
+        except Exception as e:
+            print(f"读取存档失败: {e}")
+            engine = None
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"删除存档失败: {e}")
+        if engine is None:
+            return None
+        game = Game(engine=engine, cell_size=board_config().get("cell_size", GRID_SIZE),
+                    screen=self.screen)
+        game.snake_color = self.menu.get_selected_skin_color()
+        game.sprites.tiles.preload(button["color"] for button in self.menu.skin_buttons)
+        game.paused = paused
+        game.achievements = self.menu.achievements
+        game.save_progress = self.menu.save_player_data
+        return game
+
+    # 新的一局：棋盘设置不变时原地重置上一局的Game，复用窗口、贴图和背景缓存
+    def new_game(self):
+        speed = self.menu.selected_speed
+        skin = self.menu.get_selected_skin_color()
+        config = {"board_width": GRID_WIDTH, "board_height": GRID_HEIGHT, "cell_size": GRID_SIZE}
+        config.update(board_config())
+        game = self.game
+        if game is not None and (game.engine.width, game.engine.height, game.cell_size) == \
+                (config["board_width"], config["board_height"], config["cell_size"]):
+            game.reset(speed, skin)
+            return game
+        game = Game(speed=speed, screen=self.screen, **config)
+        game.achievements = self.menu.achievements
+        game.save_progress = self.menu.save_player_data
+        game.snake_color = skin
+        game.sprites.tiles.preload(button["color"] for button in self.menu.skin_buttons)
+        return game
+
     def run(self):
+        dt = 0.0
         while True:
+            profiler.begin_frame()
             if self.state == GameState.MENU:
                 # 处理菜单
-                action = self.menu.handle_events()
+                # 菜单在没有输入时阻塞等待；显示性能统计时按帧率刷新
+                action = self.menu.handle_events(timeout=0 if profiler.overlay else MENU_IDLE_TIMEOUT)
+                profiler.mark("events")
                 if action == "start_game":
-                    # 从菜单切换到游戏
-                    self.game = Game(speed=self.menu.selected_speed)
-                    # 设置蛇的颜色为选择的皮肤颜色
-                    self.game.snake.color = self.menu.get_selected_skin_color()
+                    # 从菜单切换到游戏：有存档时从存档继续，否则开始新的一局
+                    self.game = self.resume_game() or self.new_game()
                     self.state = GameState.PLAYING
-                self.menu.draw(self.screen)
+                    # 重新计时，菜单里阻塞等待和加载对局的时间不计入第一帧的dt
+                    self.clock.tick()
+                if self.state == GameState.MENU:
+                    # 菜单只提交变化的区域
+                    rects = self.menu.draw(self.screen)
+                    if profiler.overlay:
+                        rects.append(self.menu.draw_profiler_overlay(self.screen))
+                    profiler.mark("draw")
+                    pygame.display.update(rects)
             
             elif self.state == GameState.PLAYING:
                 # 处理游戏
-                game_over = self.game.update()
+                game_over = self.game.update(dt)
                 if game_over == True:
                     # 游戏结束，更新玩家数据并返回菜单
                     self.menu.update_player_data(self.game.snake.score, self.game.level)
+                    self.history.record_run(skin=self.menu.player_data["current_skin"],
+                                            **self.game.run_summary())
                     self.state = GameState.MENU
+                    self.menu.full_redraw = True
                 elif game_over == "exit_to_menu":
-                    # 玩家按ESC键返回菜单
+                    # 玩家按ESC键返回菜单，保存这局中途更新的成就计数
+                    self.menu.save_player_data()
                     self.state = GameState.MENU
+                    self.menu.full_redraw = True
                 else:
-                    self.game.draw(self.screen)
-            
-            pygame.display.update()
-            if self.state == GameState.PLAYING:
-                self.clock.tick(self.game.snake.speed)
-            else:
-                self.clock.tick(60)
+                    # 游戏画面只提交变化的区域
+                    rects = self.game.draw(self.screen)
+                    capture.frame(self.screen)  # 录制不包含性能统计覆盖层
+                    if profiler.overlay:
+                        rects.append(self.game.draw_profiler_overlay(self.screen))
+                    profiler.mark("draw")
+                    pygame.display.update(rects)
+
+            profiler.mark("display")
+            if self.first_frame:
+                self.first_frame = False
+                startup.mark("第一帧")
+            elif not startup.reported and assets.done:
+                # 第一帧已画出且音效加载完毕后再输出启动报告
+                startup.report_once()
+            # 输入和渲染始终以固定帧率运行，蛇的移动由Game按自身速度累积推进
+            dt = self.clock.tick(RENDER_FPS) / 1000.0
+            profiler.mark("sleep")
+            profiler.end_frame()
 
 if __name__ == "__main__":
     manager = GameManager()
@@ -0,0 +1,146 @@
+import os
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+
+# 每局游戏的历史记录，存放在SQLite（WAL模式）中
+# 写入由后台线程批量提交，查询在调用线程使用独立的只读连接
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    played_at REAL NOT NULL,
+    day TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    speed INTEGER,
+    skin TEXT,
+    duration REAL,
+    ticks INTEGER,
+    seed INTEGER,
+    food_normal INTEGER NOT NULL DEFAULT 0,
+    food_speed_up INTEGER NOT NULL DEFAULT 0,
+    food_speed_down INTEGER NOT NULL DEFAULT 0,
+    food_wall_pass INTEGER NOT NULL DEFAULT 0,
+    source TEXT NOT NULL DEFAULT 'game'
+);
+CREATE INDEX IF NOT EXISTS runs_score ON runs (score DESC);
+CREATE INDEX IF NOT EXISTS runs_speed_score ON runs (speed, score DESC);
+CREATE INDEX IF NOT EXISTS runs_day_score ON runs (day, score DESC);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+COLUMNS = ("played_at", "day", "score", "level", "speed", "skin", "duration", "ticks", "seed",
+           "food_normal", "food_speed_up", "food_speed_down", "food_wall_pass", "source")
+
+INSERT_SQL = f"INSERT INTO runs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+def connect(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+class ScoreHistory:
+    def __init__(self, path="score_history.db", batch_size=64, batch_delay=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        with connect(path) as conn:
+            conn.executescript(SCHEMA)
+        conn.close()
+        self.reader = connect(path)
+        self.queue = queue.Queue()
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name="score-history", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    # 记录一局游戏，foods_eaten为 FoodType名称 -> 数量
+    def record_run(self, score, level, speed=None, skin=None, duration=None, ticks=None,
+                   seed=None, foods_eaten=None, played_at=None, source="game"):
+        played_at = played_at if played_at is not None else time.time()
+        foods = foods_eaten or {}
+        self.queue.put((
+            played_at, time.strftime("%Y-%m-%d", time.localtime(played_at)),
+            score, level, speed, skin, duration, ticks, seed,
+            foods.get("NORMAL", 0), foods.get("SPEED_UP", 0),
+            foods.get("SPEED_DOWN", 0), foods.get("WALL_PASS", 0), source,
+        ))
+
+    # 首次启动时把player_data.json中的最高纪录导入历史
+    def migrate_player_data(self, player_data, json_path="player_data.json"):
+        row = self.reader.execute("SELECT value FROM meta WHERE key = 'migrated_json'").fetchone()
+        if row is not None:
+            return False
+        played_at = os.path.getmtime(json_path) if os.path.exists(json_path) else time.time()
+        if player_data.get("highest_score", 0) > 0 or player_data.get("highest_level", 1) > 1:
+            self.record_run(player_data.get("highest_score", 0), player_data.get("highest_level", 1),
+                            skin=player_data.get("current_skin"), played_at=played_at,
+                            source="player_data.json")
+        self.queue.put(("meta", "migrated_json", "1"))
+        return True
+
+    def top_scores(self, speed=None, k=10):
+        if speed is None:
+            sql = "SELECT * FROM runs ORDER BY score DESC LIMIT ?"
+            args = (k,)
+        else:
+            sql = "SELECT * FROM runs WHERE speed = ? ORDER BY score DESC LIMIT ?"
+            args = (speed, k)
+        return self.query(sql, args)
+
+    def top_scores_for_day(self, day=None, k=10):
+        day = day or time.strftime("%Y-%m-%d")
+        return self.query("SELECT * FROM runs WHERE day = ? ORDER BY score DESC LIMIT ?", (day, k))
+
+    def count(self):
+        return self.reader.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def query(self, sql, args=()):
+        cursor = self.reader.execute(sql, args)
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    # 等待已提交的记录全部写入
+    def flush(self):
+        self.queue.join()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+        self.reader.close()
+
+    def run(self):
+        conn = connect(self.path)
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            # 攒一小批再提交，减少事务次数
+            deadline = time.monotonic() + self.batch_delay
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                stopping = True
+            runs = [item for item in batch if item is not None and item[0] != "meta"]
+            metas = [item[1:] for item in batch if item is not None and item[0] == "meta"]
+            try:
+                with conn:
+                    conn.executemany(INSERT_SQL, runs)
+                    conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", metas)
+            except sqlite3.Error as e:
+                print(f"保存游戏记录失败: {e}")
+            for _ in batch:
+                self.queue.task_done()
+        conn.close()
@@ -0,0 +1,76 @@
+import time
+from collections import deque
+from engine import is_reverse
+
+# 按键到生效的延迟统计（秒），保留最近的样本用于计算分位数
+class LatencyStats:
+    def __init__(self, window=512):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=window)
+
+    def add(self, latency):
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+        self.samples.append(latency)
+
+    def percentile(self, p):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p95_ms": self.percentile(95) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+# 有界的转向输入队列：每个模拟tick只应用一次转向
+# 入队时与队尾（即将生效的方向）比较，过滤掉重复和掉头的按键
+class InputQueue:
+    def __init__(self, maxlen=3, clock=time.perf_counter):
+        self.maxlen = maxlen
+        self.clock = clock
+        self.turns = deque()  # (方向, 按下时间)
+        self.dropped = 0
+        self.latency = {}  # 速度 -> LatencyStats
+
+    def __len__(self):
+        return len(self.turns)
+
+    def push(self, direction, current_direction, timestamp=None):
+        pending = self.turns[-1][0] if self.turns else current_direction
+        if direction == pending or is_reverse(direction, pending):
+            return False
+        if len(self.turns) >= self.maxlen:
+            self.dropped += 1
+            return False
+        if timestamp is None:
+            timestamp = self.clock()
+        self.turns.append((direction, timestamp))
+        return True
+
+    # 取出本tick要应用的转向，没有则返回None；speed用于按难度分别统计延迟
+    def pop(self, current_direction, speed=None):
+        while self.turns:
+            direction, timestamp = self.turns.popleft()
+            if direction != current_direction and not is_reverse(direction, current_direction):
+                stats = self.latency.get(speed)
+                if stats is None:
+                    stats = self.latency[speed] = LatencyStats()
+                stats.add(self.clock() - timestamp)
+                return direction
+        return None
+
+    def clear(self):
+        self.turns.clear()
+
+    def latency_report(self):
+        return {speed: stats.summary() for speed, stats in sorted(self.latency.items())}
@@ -1,22 +1,46 @@
+import os
 import pygame
 import sys
-import random
-from enum import Enum
-
-# 初始化Pygame
-pygame.init()
-pygame.mixer.init()  # 初始化音效系统
-
-# 加载音效
-eat_sound = pygame.mixer.Sound('eat.wav')
-gameover_sound = pygame.mixer.Sound('gameover.wav')
+import time
+from assets import assets, init_pygame
+from fonts import render_text
+from profiler import profiler
+from capture import capture
+from input_queue import InputQueue
+from controllers import KeyboardController, BotController
+from replay import ReplayRecorder, replay_writer
+import snapshot
+from viewport import Camera, ChunkCache
+from sprites import SpriteRenderer
+from engine import (Engine, EventType, FoodType, GRID_WIDTH, GRID_HEIGHT,
+                    UP, DOWN, LEFT, RIGHT)
 
 # 游戏常量
 WINDOW_WIDTH = 1000
 WINDOW_HEIGHT = 800
-GRID_SIZE = 20
-GRID_WIDTH = WINDOW_WIDTH // GRID_SIZE
-GRID_HEIGHT = WINDOW_HEIGHT // GRID_SIZE
+GRID_SIZE = WINDOW_WIDTH // GRID_WIDTH  # 默认格子像素大小
+CHUNK_CELLS = 32  # 背景分块的边长（格子数）
+MAX_BOARD_SIZE = 2000
+
+# 通过环境变量设置棋盘：SNAKE_BOARD=宽x高（格子数），SNAKE_CELL_SIZE=格子像素大小
+def board_config():
+    config = {}
+    try:
+        board = os.environ.get("SNAKE_BOARD")
+        if board:
+            width, height = (int(v) for v in board.lower().split("x"))
+            config["board_width"] = max(2, min(MAX_BOARD_SIZE, width))
+            config["board_height"] = max(2, min(MAX_BOARD_SIZE, height))
+        cell_size = os.environ.get("SNAKE_CELL_SIZE")
+        if cell_size:
+            config["cell_size"] = max(2, int(cell_size))
+    except ValueError as e:
+        print(f"棋盘设置无效: {e}")
+    return config
+
+# 帧循环
+RENDER_FPS = 60  # 输入和渲染的帧率，与蛇的移动速度无关
+MAX_STEPS_PER_FRAME = 5  # 渲染落后时每帧最多追赶的模拟步数
 
 # 颜色定义
 COLORS = {
@@ -32,226 +56,510 @@ COLORS = {
     'LIGHT_BLUE': (150, 175, 200)  # 淡蓝色网格备选
 }
 
-# 食物类型枚举
-class FoodType(Enum):
-    NORMAL = 1
-    SPEED_UP = 2
-    SPEED_DOWN = 3
-    WALL_PASS = 4
-
-# 蛇类
-class Snake:
-    def __init__(self):
-        self.length = 1
-        self.positions = [(GRID_WIDTH // 2, GRID_HEIGHT // 2)]
-        self.direction = random.choice([(0, 1), (0, -1), (1, 0), (-1, 0)])
-        self.color = COLORS['GREEN']
-        self.score = 0
-        self.speed = 5  
-        self.wall_pass = False
-        self.growth_points = 0
-
-    def get_head_position(self):
-        return self.positions[0]
-
-    def update(self):
-        cur = self.get_head_position()
-        x, y = self.direction
-        new = ((cur[0] + x) % GRID_WIDTH, (cur[1] + y) % GRID_HEIGHT)
-        if not self.wall_pass and \
-           (new[0] < 0 or new[0] >= GRID_WIDTH or \
-            new[1] < 0 or new[1] >= GRID_HEIGHT):
-            return False
-        if new in self.positions[2:]:
-            return False
-        self.positions.insert(0, new)
-        if len(self.positions) > self.length:
-            self.positions.pop()
-        return True
-
-    def reset(self):
-        self.length = 1
-        self.positions = [(GRID_WIDTH // 2, GRID_HEIGHT // 2)]
-        self.direction = random.choice([(0, 1), (0, -1), (1, 0), (-1, 0)])
-        self.score = 0
-        self.speed = 5  # 将重置后的速度也改为5
-        self.wall_pass = False
-
-# 食物类
-class Food:
-    def __init__(self):
-        self.position = (0, 0)
-        self.color = COLORS['RED']
-        self.type = FoodType.NORMAL
-        self.randomize_position()
-
-    def randomize_position(self, special_food_chance=0.5):
-        self.position = (random.randint(0, GRID_WIDTH-1),
-                        random.randint(0, GRID_HEIGHT-1))
-        
-        # 根据难度决定是否生成特殊食物
-        if random.random() < special_food_chance:
-            self.type = random.choice([FoodType.SPEED_UP, FoodType.SPEED_DOWN, FoodType.WALL_PASS])
-        else:
-            self.type = FoodType.NORMAL
-            
-        if self.type == FoodType.NORMAL:
-            self.color = COLORS['RED']
-        elif self.type == FoodType.SPEED_UP:
-            self.color = COLORS['YELLOW']
-        elif self.type == FoodType.SPEED_DOWN:
-            self.color = COLORS['BLUE']
-        elif self.type == FoodType.WALL_PASS:
-            self.color = COLORS['WHITE']
-
-# 游戏主类
+# 食物颜色
+FOOD_COLORS = {
+    FoodType.NORMAL: COLORS['RED'],
+    FoodType.SPEED_UP: COLORS['YELLOW'],
+    FoodType.SPEED_DOWN: COLORS['BLUE'],
+    FoodType.WALL_PASS: COLORS['WHITE']
+}
+
+# 方向键映射
+KEY_DIRECTIONS = {
+    pygame.K_UP: UP,
+    pygame.K_DOWN: DOWN,
+    pygame.K_LEFT: LEFT,
+    pygame.K_RIGHT: RIGHT
+}
+
+# 游戏主类：负责输入和渲染，规则由Engine处理
+# 棋盘大小和格子像素大小可按局设置，棋盘大于窗口时摄像机跟随蛇头滚动
 class Game:
-    def __init__(self, speed=5):
-        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-        pygame.display.set_caption('贪食蛇游戏')
-        self.clock = pygame.time.Clock()
-        self.snake = Snake()
-        self.snake.speed = speed  # 设置蛇的初始速度
-        self.food = Food()
-        self.level = 1
-        self.obstacles = []
+    def __init__(self, speed=5, seed=None, board_width=GRID_WIDTH, board_height=GRID_HEIGHT,
+                 cell_size=GRID_SIZE, controller=None, engine=None, screen=None):
+        # 由GameManager注入窗口时复用它，不再创建窗口和时钟；单独运行时自己创建
+        if screen is None:
+            init_pygame()
+            assets.preload()  # 音效在后台加载
+            screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+            pygame.display.set_caption('贪食蛇游戏')
+            self.clock = pygame.time.Clock()
+        else:
+            self.clock = None
+        self.screen = screen
+        if engine is None:
+            engine = Engine(speed=speed, seed=seed, width=board_width, height=board_height)
+            self.recorder = ReplayRecorder(engine)
+            engine.recorder = self.recorder
+            self.record_replays = True  # 游戏结束时把录像保存到replays目录
+        else:
+            # 从存档恢复的对局没有开局以来的完整操作记录，不保存录像
+            board_width, board_height = engine.width, engine.height
+            self.recorder = None
+            self.record_replays = False
+        self.engine = engine
+        self.start_time = time.monotonic()
+        self.snake_color = COLORS['GREEN']
         self.paused = False  # 添加暂停状态变量
-        
-        # 根据速度设置难度相关参数
-        if speed <= 5:  # 简单难度
-            self.obstacle_frequency = 7  # 每7个食物添加一个障碍物
-            self.special_food_chance = 0.3  # 特殊食物出现概率30%
-        elif speed <= 8:  # 中等难度
-            self.obstacle_frequency = 5  # 每5个食物添加一个障碍物
-            self.special_food_chance = 0.5  # 特殊食物出现概率50%
-        else:  # 困难难度
-            self.obstacle_frequency = 3  # 每3个食物添加一个障碍物
-            self.special_food_chance = 0.7  # 特殊食物出现概率70%
+        self.input_queue = InputQueue()  # 待应用的转向，每个tick取一个
+        self.keyboard = KeyboardController(self.input_queue)
+        profiler.input_latency = self.input_queue.latency_report  # 按键延迟一并导出和显示
+        self.default_controller = controller or self.keyboard  # 新的一局恢复为这个控制器
+        self.controller = self.default_controller  # 每个tick提供转向，见controllers.py
+        self.achievements = None  # 可选的成就判定，见achievements.py
+        self.save_progress = None  # 可选：关闭窗口时保存成就计数的函数
+        self.accumulator = 0.0  # 尚未模拟的时间（秒）
+        self.alpha = 0.0  # 当前帧处于两个tick之间的比例，用于插值
+        self.interpolate = True
+
+        # 渲染缓存：背景和网格按块渲染并缓存，障碍物生成时合成进对应的块
+        self.cell_size = cell_size
+        # 蛇、食物和障碍物用预渲染的格子贴图批量绘制
+        self.sprites = SpriteRenderer(cell_size)
+        self.sprites.tiles.preload([self.snake_color, COLORS['WHITE'], *FOOD_COLORS.values()])
+        view_width = -(-WINDOW_WIDTH // cell_size)
+        view_height = -(-WINDOW_HEIGHT // cell_size)
+        self.camera = Camera(board_width, board_height, view_width, view_height)
+        self.camera.follow(self.snake.get_head_position())
+        visible = (view_width // CHUNK_CELLS + 2) * (view_height // CHUNK_CELLS + 2)
+        self.chunks = ChunkCache(self.render_chunk, CHUNK_CELLS, max_chunks=visible * 2)
+        self.dirty_cells = set()  # 本帧需要重绘的格子
+        self.full_redraw = True
+        self.hud_values = None
+        self.hud_rect = pygame.Rect(0, 0, 0, 0)
+        self.interp_cells = []  # 上一帧插值绘制过的格子
+        self.overlay_rect = None  # 上一帧性能统计覆盖的区域
+
+    # 原地开始新的一局：重置引擎和渲染状态，复用窗口、贴图和不含障碍物的背景块
+    def reset(self, speed=5, skin=None, seed=None):
+        # 旧障碍物所在的背景块需要重新渲染
+        for pos in self.obstacles:
+            self.chunks.discard(pos)
+        self.engine.reset(speed=speed, seed=seed)
+        if self.recorder is None:
+            self.recorder = ReplayRecorder(self.engine)
+            self.engine.recorder = self.recorder
+        else:
+            self.recorder.reset(self.engine)
+        self.record_replays = True
+        self.start_time = time.monotonic()
+        if skin is not None:
+            self.snake_color = skin
+        self.paused = False
+        self.input_queue.clear()
+        # F2切换的自动驾驶只在当前这局有效
+        self.controller = self.default_controller
+        self.controller.reset()
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        self.camera.follow(self.snake.get_head_position())
+        self.dirty_cells.clear()
+        self.full_redraw = True
+        self.hud_values = None
+        self.interp_cells = []
+        self.overlay_rect = None
+
+    @property
+    def snake(self):
+        return self.engine.snake
+
+    @property
+    def food(self):
+        return self.engine.food
+
+    @property
+    def level(self):
+        return self.engine.level
+
+    @property
+    def obstacles(self):
+        return self.engine.obstacles
 
     def handle_keys(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                self.suspend()
+                # 成就计数在对局中随时变化，退出前写入（后台写入在退出时会先完成）
+                if self.save_progress is not None:
+                    self.save_progress()
+                capture.close()
                 pygame.quit()
                 sys.exit()
             elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_UP:
-                    if self.snake.direction != (0, 1):
-                        self.snake.direction = (0, -1)
-                elif event.key == pygame.K_DOWN:
-                    if self.snake.direction != (0, -1):
-                        self.snake.direction = (0, 1)
-                elif event.key == pygame.K_LEFT:
-                    if self.snake.direction != (1, 0):
-                        self.snake.direction = (-1, 0)
-                elif event.key == pygame.K_RIGHT:
-                    if self.snake.direction != (-1, 0):
-                        self.snake.direction = (1, 0)
+                if event.key in KEY_DIRECTIONS:
+                    self.input_queue.push(KEY_DIRECTIONS[event.key], self.snake.direction)
                 elif event.key == pygame.K_SPACE:  # 添加空格键暂停/继续功能
                     self.paused = not self.paused
+                    self.input_queue.clear()
+                    self.full_redraw = True
                 elif event.key == pygame.K_ESCAPE:  # 添加ESC键退出功能
                     return "exit_to_menu"
+                elif event.key == pygame.K_F3:  # F3显示/隐藏性能统计
+                    profiler.toggle_overlay()
+                elif event.key == pygame.K_F2:  # F2切换自动驾驶
+                    self.toggle_autopilot()
         return None
 
-    def draw_grid(self):
-        for y in range(0, WINDOW_HEIGHT, GRID_SIZE):
-            for x in range(0, WINDOW_WIDTH, GRID_SIZE):
-                r = pygame.Rect(x, y, GRID_SIZE, GRID_SIZE)
-                pygame.draw.rect(self.screen, COLORS['LIGHT_GRAY'], r, 1)
+    # 关闭窗口时把未结束的对局存档，下次开始游戏时从存档继续
+    def suspend(self, path=snapshot.SAVE_PATH):
+        if self.engine.game_over:
+            return
+        try:
+            snapshot.save(path, self.engine, paused=True)
+        except Exception as e:
+            print(f"保存存档失败: {e}")
+
+    def toggle_autopilot(self):
+        if self.controller is self.keyboard:
+            self.controller = BotController()
+        else:
+            self.controller = self.keyboard
+        self.input_queue.clear()
+
+    def draw_grid(self, surface):
+        size = self.cell_size
+        width, height = surface.get_size()
+        for y in range(0, height, size):
+            for x in range(0, width, size):
+                r = pygame.Rect(x, y, size, size)
+                pygame.draw.rect(surface, COLORS['LIGHT_GRAY'], r, 1)
+
+    # 渲染一个背景块：底色、网格和块内的障碍物
+    def render_chunk(self, cx, cy):
+        x0, y0 = cx * CHUNK_CELLS, cy * CHUNK_CELLS
+        columns = min(CHUNK_CELLS, self.engine.width - x0)
+        rows = min(CHUNK_CELLS, self.engine.height - y0)
+        chunk = pygame.Surface((columns * self.cell_size, rows * self.cell_size)).convert()
+        chunk.fill(COLORS['DARK_BLUE'])
+        self.draw_grid(chunk)
+        # 障碍物比块内格子少时遍历障碍物，否则逐格查障碍物位图
+        obstacles = self.obstacles
+        bounds = (x0, y0, x0 + columns, y0 + rows)
+        if len(obstacles) <= columns * rows:
+            cells = [obs for obs in obstacles
+                     if x0 <= obs[0] < x0 + columns and y0 <= obs[1] < y0 + rows]
+            self.sprites.draw_cells(chunk, cells, COLORS['WHITE'], (x0, y0))
+        elif self.sprites.use_numpy:
+            self.sprites.draw_bitmap(chunk, obstacles.blocked, self.engine.width, bounds,
+                                     COLORS['WHITE'], (x0, y0))
+        else:
+            cells = [(x, y) for y in range(y0, y0 + rows) for x in range(x0, x0 + columns)
+                     if (x, y) in obstacles]
+            self.sprites.draw_cells(chunk, cells, COLORS['WHITE'], (x0, y0))
+        return chunk
+
+    def draw_local_cell(self, surface, local, color):
+        size = self.cell_size
+        surface.blit(self.sprites.tiles.get(color), (local[0] * size, local[1] * size))
+
+    # 障碍物生成时直接画进已缓存的背景块，未缓存的块在渲染时会包含它
+    def add_obstacle_to_background(self, pos):
+        cached = self.chunks.cached(pos)
+        if cached is not None:
+            self.draw_local_cell(cached[0], cached[1], COLORS['WHITE'])
+
+    # 从背景块中恢复一个格子
+    def blit_background(self, screen, pos, rect=None):
+        chunk = self.chunks.get(pos[0] // CHUNK_CELLS, pos[1] // CHUNK_CELLS)
+        size = self.cell_size
+        local = ((pos[0] % CHUNK_CELLS) * size, (pos[1] % CHUNK_CELLS) * size, size, size)
+        screen.blit(chunk, rect or self.cell_rect(pos), local)
+
+    def draw_cell(self, surface, pos, color):
+        surface.blit(self.sprites.tiles.get(color), self.cell_rect(pos))
+
+    # 棋盘坐标 -> 屏幕矩形
+    def cell_rect(self, pos):
+        size = self.cell_size
+        return pygame.Rect((pos[0] - self.camera.x) * size, (pos[1] - self.camera.y) * size,
+                           size, size)
                 
-    def update(self):
+    # dt为距上一帧的秒数：按固定步长累积并推进模拟；不传dt时直接推进一个tick
+    def update(self, dt=None):
         key_action = self.handle_keys()
+        profiler.mark("events")
         if key_action == "exit_to_menu":
             return "exit_to_menu"  # 返回到菜单
             
         if self.paused:  # 如果游戏暂停，不更新游戏状态
             return False
-            
-        if not self.snake.update():
-            gameover_sound.play()  # 播放游戏结束音效
-            self.snake.reset()
-            self.level = 1
-            self.obstacles = []
-            return True  # 游戏结束
-    
-            # 检查食物碰撞
-        if self.snake.get_head_position() == self.food.position:
-            self.snake.length += 1
-            self.snake.score += 10
-            eat_sound.play()  # 播放吃食物音效
-            if self.food.type == FoodType.SPEED_UP:
-                self.snake.speed += 2
-            elif self.food.type == FoodType.SPEED_DOWN:
-                self.snake.speed = max(5, self.snake.speed - 2)
-            elif self.food.type == FoodType.WALL_PASS:
-                self.snake.wall_pass = True
-            self.food.randomize_position(self.special_food_chance)
-            self.snake.growth_points += 1
-
-            # 升级检查
-            if self.snake.growth_points >= 5:
-                self.level += 1
-                self.snake.growth_points = 0
-                # 根据难度添加新的障碍物
-                if self.level % self.obstacle_frequency == 0:
-                    self.obstacles.append((random.randint(0, GRID_WIDTH-1),
-                                         random.randint(0, GRID_HEIGHT-1)))
-        
+
+        if dt is None:
+            game_over = self.tick()
+            profiler.mark("update")
+            return game_over
+
+        self.accumulator += dt
+        tick_time = 1.0 / self.snake.speed
+        steps = 0
+        while self.accumulator >= tick_time:
+            if steps == MAX_STEPS_PER_FRAME:
+                # 落后太多时丢弃积压的时间，避免越追越慢
+                self.accumulator = tick_time * 0.999
+                break
+            self.accumulator -= tick_time
+            steps += 1
+            if self.tick():
+                profiler.mark("update")
+                return True
+            tick_time = 1.0 / self.snake.speed  # 吃到加速/减速食物后步长会变
+        self.alpha = min(self.accumulator / tick_time, 1.0)
+        profiler.mark("update")
+        return False
+
+    # 推进一个模拟tick
+    def tick(self):
+        return self.step(self.controller.next_action(self.engine))
+
+    # 以指定转向推进一个tick，返回游戏是否结束
+    def step(self, direction):
+        # 记录本tick会变化的格子：旧尾巴、新蛇头、新旧食物位置
+        old_tail = self.snake.positions[-1]
+        old_food = self.food.position
+        events = self.engine.step(direction)
+        if events and self.achievements is not None:
+            self.achievements.handle(events, self.engine)
+        self.dirty_cells.add(old_tail)
+        self.dirty_cells.add(self.snake.get_head_position())
+        if self.food.position != old_food:
+            self.dirty_cells.add(old_food)
+            if self.food.position is not None:
+                self.dirty_cells.add(self.food.position)
+        for event in events:
+            if event.type == EventType.FOOD_EATEN:
+                assets.play("eat")  # 播放吃食物音效
+            elif event.type == EventType.OBSTACLE_ADDED:
+                self.add_obstacle_to_background(event.data)
+                self.dirty_cells.add(event.data)
+            elif event.type == EventType.GAME_OVER:
+                assets.play("gameover")  # 播放游戏结束音效
+                if self.record_replays:
+                    self.save_replay()
+                return True  # 游戏结束
+
         return False  # 游戏继续
 
+    # 本局结果，供历史记录使用
+    def run_summary(self):
+        return {
+            "score": self.snake.score,
+            "level": self.level,
+            "speed": self.engine.difficulty_speed,
+            "duration": time.monotonic() - self.start_time,
+            "ticks": self.engine.ticks,
+            "seed": self.engine.seed,
+            "foods_eaten": {food_type.name: count
+                            for food_type, count in self.engine.foods_eaten.items()},
+        }
+
+    # 录像在后台线程写入，不阻塞游戏结束这一帧
+    def save_replay(self):
+        replay_writer.submit(self.recorder.finish(self.engine))
+
+    # 绘制一帧，返回需要提交给display.update的脏矩形列表
     def draw(self, screen):
-        screen.fill(COLORS['DARK_BLUE'])
-        self.draw_grid()
+        # 摄像机移动后整个视口都变了
+        if self.camera.follow(self.snake.get_head_position()):
+            self.full_redraw = True
+        if self.full_redraw:
+            return self.draw_full(screen)
+        # 恢复上一帧性能统计覆盖的区域
+        if self.overlay_rect is not None:
+            self.dirty_cells.update(self.cells_in_rect(self.overlay_rect))
+            self.overlay_rect = None
+        if self.paused and not self.dirty_cells:
+            return []
+
+        dirty_rects = []
+        hud_values = (self.snake.score, self.level)
+        hud_dirty = hud_values != self.hud_values
+        # 上一帧和这一帧插值覆盖的格子都要先恢复
+        self.dirty_cells.update(self.interp_cells)
+        self.interp_cells = self.interpolation_cells()
+        self.dirty_cells.update(self.interp_cells)
+        # 视口外的格子不需要绘制
+        self.dirty_cells = {pos for pos in self.dirty_cells if self.camera.contains(pos)}
+        for pos in self.dirty_cells:
+            rect = self.cell_rect(pos)
+            if rect.colliderect(self.hud_rect):
+                hud_dirty = True
+        # HUD下方的格子也要重画，以擦掉旧文字
+        if hud_dirty:
+            self.dirty_cells.update(self.cells_in_rect(self.hud_rect))
+
+        snake_cells = []
+        for pos in self.dirty_cells:
+            rect = self.cell_rect(pos)
+            self.blit_background(screen, pos, rect)
+            if pos in self.snake.positions:
+                snake_cells.append(pos)
+            elif pos == self.food.position:
+                self.draw_cell(screen, pos, FOOD_COLORS[self.food.type])
+            dirty_rects.append(rect)
+        self.sprites.draw_cells(screen, snake_cells, self.snake_color, (self.camera.x, self.camera.y))
+        self.dirty_cells.clear()
+        self.draw_interpolation(screen)
+
+        if hud_dirty:
+            old_hud_rect = self.hud_rect
+            self.draw_hud(screen)
+            dirty_rects.append(old_hud_rect.union(self.hud_rect))
+        return dirty_rects
 
-        # 绘制障碍物
-        for obs in self.obstacles:
-            pygame.draw.rect(screen, COLORS['WHITE'],
-                           (obs[0]*GRID_SIZE, obs[1]*GRID_SIZE,
-                            GRID_SIZE, GRID_SIZE))
+    def draw_full(self, screen):
+        # 只绘制视口内的背景块
+        bounds = self.camera.visible_bounds()
+        if bounds[2] - bounds[0] < self.camera.view_width or \
+           bounds[3] - bounds[1] < self.camera.view_height:
+            screen.fill(COLORS['BLACK'])  # 棋盘比窗口小时，棋盘外填充黑色
+        for cx, cy in self.chunks.visible_chunks(bounds):
+            screen.blit(self.chunks.get(cx, cy),
+                        self.cell_rect((cx * CHUNK_CELLS, cy * CHUNK_CELLS)))
 
-        # 绘制蛇
-        for p in self.snake.positions:
-            pygame.draw.rect(screen, self.snake.color,
-                           (p[0]*GRID_SIZE, p[1]*GRID_SIZE,
-                            GRID_SIZE, GRID_SIZE))
+        # 绘制蛇：蛇很长时直接把占用位图画进视口，否则批量提交可见的蛇身贴图
+        origin = (self.camera.x, self.camera.y)
+        if self.sprites.prefers_bitmap(len(self.snake.body)):
+            self.sprites.draw_bitmap(screen, self.snake.body.occupied, self.engine.width, bounds,
+                                     self.snake_color, origin)
+        else:
+            self.sprites.draw_cells(screen, self.visible_snake_cells(bounds), self.snake_color, origin)
 
         # 绘制食物
-        pygame.draw.rect(screen, self.food.color,
-                       (self.food.position[0]*GRID_SIZE,
-                        self.food.position[1]*GRID_SIZE,
-                        GRID_SIZE, GRID_SIZE))
+        if self.food.position is not None and self.camera.contains(self.food.position):
+            self.draw_cell(screen, self.food.position, FOOD_COLORS[self.food.type])
 
-        # 显示分数和等级
-        try:
-            font = pygame.font.Font("C:\\Windows\\Fonts\\simhei.ttf", 36)  # 使用中文字体
-        except:
-            font = pygame.font.Font(None, 36)  # 如果找不到中文字体，使用默认字体
-            
-        score_text = font.render(f'分数: {self.snake.score}', True, COLORS['WHITE'])
-        level_text = font.render(f'等级: {self.level}', True, COLORS['WHITE'])
-        screen.blit(score_text, (10, 10))
-        screen.blit(level_text, (10, 50))
+        self.interp_cells = self.interpolation_cells()
+        self.draw_interpolation(screen)
+        self.draw_hud(screen)
         
         # 如果游戏暂停，显示暂停文本
         if self.paused:
-            try:
-                pause_font = pygame.font.Font("C:\\Windows\\Fonts\\simhei.ttf", 72)  # 使用中文字体
-            except:
-                pause_font = pygame.font.Font(None, 72)  # 如果找不到中文字体，使用默认字体
-            pause_text = pause_font.render("暂停", True, COLORS['WHITE'])
+            pause_text = render_text("暂停", 72, COLORS['WHITE'])
             pause_rect = pause_text.get_rect(center=(WINDOW_WIDTH//2, WINDOW_HEIGHT//2))
             screen.blit(pause_text, pause_rect)
 
+        self.dirty_cells.clear()
+        self.overlay_rect = None
+        self.full_redraw = False
+        return [screen.get_rect()]
+
+    # 视口内的蛇身格子：蛇比视口短时遍历蛇身，否则遍历视口查占用位图
+    def visible_snake_cells(self, bounds):
+        x0, y0, x1, y1 = bounds
+        body = self.snake.body
+        if len(body) <= (x1 - x0) * (y1 - y0):
+            return [p for p in self.snake.positions if x0 <= p[0] < x1 and y0 <= p[1] < y1]
+        return [(x, y) for y in range(y0, y1) for x in range(x0, x1)
+                if body.is_occupied(body.pack(x, y))]
+
+    def draw_profiler_overlay(self, screen):
+        self.overlay_rect = profiler.draw_overlay(screen)
+        return self.overlay_rect
+
+    # 显示分数和等级
+    def draw_hud(self, screen):
+        score_text = render_text(f'分数: {self.snake.score}', 36, COLORS['WHITE'])
+        level_text = render_text(f'等级: {self.level}', 36, COLORS['WHITE'])
+        screen.blit(score_text, (10, 10))
+        screen.blit(level_text, (10, 50))
+        self.hud_values = (self.snake.score, self.level)
+        self.hud_rect = score_text.get_rect(topleft=(10, 10)).union(
+            level_text.get_rect(topleft=(10, 50)))
+
+    # 插值：蛇头向下一个格子伸出alpha比例，尾巴向前收缩alpha比例
+    def interpolation_cells(self):
+        if not self.interpolate:
+            return []
+        cells = []
+        next_cell = self.next_head_cell()
+        if next_cell is not None:
+            cells.append(next_cell)
+        if self.tail_shrinking():
+            cells.append(self.snake.positions[-1])
+        return cells
+
+    def next_head_cell(self):
+        x, y = self.snake.get_head_position()
+        dx, dy = self.snake.direction
+        x, y = x + dx, y + dy
+        if 0 <= x < self.engine.width and 0 <= y < self.engine.height:
+            return (x, y)
+        if self.snake.wall_pass:
+            return (x % self.engine.width, y % self.engine.height)
+        return None
+
+    def tail_shrinking(self):
+        count = len(self.snake.positions)
+        return count >= 2 and count >= self.snake.length
+
+    # 格子中沿direction方向最先进入的fraction部分
+    def edge_rect(self, pos, direction, fraction):
+        rect = self.cell_rect(pos)
+        size = int(self.cell_size * fraction)
+        if direction[0] > 0:
+            rect.width = size
+        elif direction[0] < 0:
+            rect.left = rect.right - size
+            rect.width = size
+        elif direction[1] > 0:
+            rect.height = size
+        else:
+            rect.top = rect.bottom - size
+            rect.height = size
+        return rect
+
+    def draw_interpolation(self, screen):
+        if not self.interpolate:
+            return
+        next_cell = self.next_head_cell()
+        if next_cell is not None and self.alpha > 0:
+            pygame.draw.rect(screen, self.snake_color,
+                             self.edge_rect(next_cell, self.snake.direction, self.alpha))
+        if self.tail_shrinking():
+            tail = self.snake.positions[-1]
+            before = self.snake.positions[-2]
+            dx, dy = before[0] - tail[0], before[1] - tail[1]
+            # 穿墙时相邻两节坐标差会跨越整个棋盘
+            if abs(dx) > 1:
+                dx = -dx // abs(dx)
+            if abs(dy) > 1:
+                dy = -dy // abs(dy)
+            if not self.camera.contains(tail):
+                return
+            self.blit_background(screen, tail)
+            pygame.draw.rect(screen, self.snake_color,
+                             self.edge_rect(tail, (-dx, -dy), 1 - self.alpha))
+
+    # 屏幕矩形覆盖的棋盘格子
+    def cells_in_rect(self, rect):
+        size = self.cell_size
+        x0, y0, x1, y1 = self.camera.visible_bounds()
+        return [(x, y)
+                for y in range(max(y0, self.camera.y + rect.top // size),
+                               min(y1, self.camera.y + (rect.bottom - 1) // size + 1))
+                for x in range(max(x0, self.camera.x + rect.left // size),
+                               min(x1, self.camera.x + (rect.right - 1) // size + 1))]
+
     def run(self):
+        dt = 0.0
         while True:
-            game_over = self.update()
+            profiler.begin_frame()
+            game_over = self.update(dt)
             if game_over:
                 return
                 
-            self.draw(self.screen)
-            pygame.display.update()
-            self.clock.tick(self.snake.speed)
+            rects = self.draw(self.screen)
+            capture.frame(self.screen)
+            if profiler.overlay:
+                rects.append(self.draw_profiler_overlay(self.screen))
+            profiler.mark("draw")
+            pygame.display.update(rects)
+            profiler.mark("display")
+            dt = self.clock.tick(RENDER_FPS) / 1000.0
+            profiler.mark("sleep")
+            profiler.end_frame()
 
 if __name__ == '__main__':
-    game = Game()
+    game = Game(**board_config())
     game.run()
     
@@ -1,8 +1,13 @@
 import pygame
 import sys
-import json
-import os
 from enum import Enum
+from fonts import render_text
+from persistence import JsonStore
+from profiler import profiler
+from achievements import ACHIEVEMENTS, AchievementTracker
+
+MENU_IDLE_TIMEOUT = 500  # 没有输入时菜单最多阻塞等待的毫秒数
+PLAYER_DATA_PATH = "player_data.json"
 
 # 菜单状态枚举
 class MenuState(Enum):
@@ -20,22 +25,25 @@ class Button:
         self.color = color
         self.hover_color = hover_color
         self.is_hovered = False
-        try:
-            self.font = pygame.font.Font("C:\\Windows\\Fonts\\simhei.ttf", 36)  # 使用中文字体
-        except:
-            self.font = pygame.font.Font(None, 36)  # 如果找不到中文字体，使用默认字体
+        self.dirty = False  # 悬停状态改变后需要重绘
+        self.font_size = 36
         
-    def draw(self, screen):
-        color = self.hover_color if self.is_hovered else self.color
+    def draw(self, screen, hovered=None):
+        if hovered is None:
+            hovered = self.is_hovered
+        color = self.hover_color if hovered else self.color
         pygame.draw.rect(screen, color, self.rect, border_radius=10)
         pygame.draw.rect(screen, (255, 255, 255), self.rect, 2, border_radius=10)
         
-        text_surface = self.font.render(self.text, True, (255, 255, 255))
+        text_surface = render_text(self.text, self.font_size, (255, 255, 255))
         text_rect = text_surface.get_rect(center=self.rect.center)
         screen.blit(text_surface, text_rect)
         
     def check_hover(self, mouse_pos):
-        self.is_hovered = self.rect.collidepoint(mouse_pos)
+        hovered = bool(self.rect.collidepoint(mouse_pos))
+        if hovered != self.is_hovered:
+            self.is_hovered = hovered
+            self.dirty = True
         return self.is_hovered
         
     def is_clicked(self, mouse_pos, mouse_click):
@@ -43,19 +51,20 @@ class Button:
 
 # 菜单类
 class Menu:
-    def __init__(self, screen_width, screen_height):
+    def __init__(self, screen_width, screen_height, data_path=PLAYER_DATA_PATH):
         self.screen_width = screen_width
         self.screen_height = screen_height
         self.state = MenuState.MAIN
         self.background = (50, 50, 50)
         self.selected_speed = 5  # 默认速度
-        try:
-            self.title_font = pygame.font.Font("C:\\Windows\\Fonts\\simhei.ttf", 72)  # 使用中文字体
-            self.subtitle_font = pygame.font.Font("C:\\Windows\\Fonts\\simhei.ttf", 36)  # 使用中文字体
-        except:
-            self.title_font = pygame.font.Font(None, 72)  # 如果找不到中文字体，使用默认字体
-            self.subtitle_font = pygame.font.Font(None, 36)  # 如果找不到中文字体，使用默认字体
+        # 每个状态的整屏画面（按钮为未悬停外观）预先合成并缓存，
+        # 平时只重绘悬停状态改变的按钮；画面依赖的数据变化时重新合成
+        self.screens = {}  # 状态 -> (screen_key, Surface)
+        self.shown_key = None  # 屏幕上当前显示的画面
+        self.full_redraw = True
+        self.overlay_rect = None  # 上一帧性能统计覆盖的区域
         self.setup_buttons()
+        self.data_path = data_path  # 玩家数据文件，基准测试等场景可指向临时文件
         self.load_player_data()
         
     def setup_buttons(self):
@@ -103,6 +112,7 @@ class Menu:
                 "name": skin_name,
                 "unlocked": i < 2  # 默认解锁前两个皮肤
             })
+        self.skins_by_name = {skin["name"]: skin for skin in self.skin_buttons}
             
         # 返回按钮 (用于非主菜单状态)
         self.back_button = Button(50, self.screen_height - 80, 150, 50, "返回", (100, 100, 100), (150, 150, 150))
@@ -114,27 +124,41 @@ class Menu:
             "highest_level": 1,
             "current_skin": "绿色",
             "unlocked_skins": ["绿色", "蓝色"],
-            "achievements": []
+            "achievements": [],  # 已解锁成就的id
+            "stats": {}  # 成就计数器，见achievements.py
         }
         
-        # 尝试加载已存在的数据
+        # 尝试加载已存在的数据，写入由后台线程完成
+        self.store = JsonStore(self.data_path)
         try:
-            if os.path.exists("player_data.json"):
-                with open("player_data.json", "r", encoding="utf-8") as f:
-                    self.player_data = json.load(f)
-                    
-                # 更新皮肤解锁状态
-                for skin_button in self.skin_buttons:
-                    skin_button["unlocked"] = skin_button["name"] in self.player_data["unlocked_skins"]
+            self.player_data = self.store.load(self.player_data)
+                
+            # 更新皮肤解锁状态
+            for skin_button in self.skin_buttons:
+                skin_button["unlocked"] = skin_button["name"] in self.player_data["unlocked_skins"]
         except Exception as e:
             print(f"加载玩家数据失败: {e}")
+
+        # 成就按游戏事件增量判定，解锁结果只在解锁时写入一次
+        self.player_data.setdefault("achievements", [])
+        stats = self.player_data.setdefault("stats", {})
+        self.achievements = AchievementTracker(ACHIEVEMENTS, self.player_data["achievements"],
+                                               stats, on_unlock=self.unlock)
+        # 旧存档只有最高分和最高等级
+        self.achievements.set_max("best_score", self.player_data["highest_score"])
+        self.achievements.set_max("best_level", self.player_data["highest_level"])
+
+    def unlock(self, rule):
+        self.player_data["achievements"].append(rule.id)
+        if rule.skin is not None and rule.skin not in self.player_data["unlocked_skins"]:
+            self.player_data["unlocked_skins"].append(rule.skin)
+            skin = self.skins_by_name.get(rule.skin)
+            if skin is not None:
+                skin["unlocked"] = True
+        self.save_player_data()
     
     def save_player_data(self):
-        try:
-            with open("player_data.json", "w", encoding="utf-8") as f:
-                json.dump(self.player_data, f, ensure_ascii=False, indent=4)
-        except Exception as e:
-            print(f"保存玩家数据失败: {e}")
+        self.store.save(self.player_data)
     
     def update_player_data(self, score, level):
         if score > self.player_data["highest_score"]:
@@ -142,87 +166,141 @@ class Menu:
         
         if level > self.player_data["highest_level"]:
             self.player_data["highest_level"] = level
-            
-            # 解锁新皮肤
-            if level >= 5 and "黄色" not in self.player_data["unlocked_skins"]:
-                self.player_data["unlocked_skins"].append("黄色")
-                for skin in self.skin_buttons:
-                    if skin["name"] == "黄色":
-                        skin["unlocked"] = True
-                        
-            if level >= 10 and "紫色" not in self.player_data["unlocked_skins"]:
-                self.player_data["unlocked_skins"].append("紫色")
-                for skin in self.skin_buttons:
-                    if skin["name"] == "紫色":
-                        skin["unlocked"] = True
-        
+
+        # 对局中的事件已经更新过成就，这里补上没有经过事件的结果
+        self.achievements.set_max("best_score", score)
+        self.achievements.set_max("best_level", level)
         self.save_player_data()
     
     def get_selected_skin_color(self):
-        for skin in self.skin_buttons:
-            if skin["name"] == self.player_data["current_skin"]:
-                return skin["color"]
+        skin = self.skins_by_name.get(self.player_data["current_skin"])
+        if skin is not None:
+            return skin["color"]
         return (0, 255, 0)  # 默认绿色
     
+    # 画面依赖的全部数据，任何一项变化都需要重新合成
+    def screen_key(self):
+        data = self.player_data
+        return (self.state, data["highest_score"], data["highest_level"], data["current_skin"],
+                tuple(skin["unlocked"] for skin in self.skin_buttons), self.selected_speed,
+                len(data["achievements"]))
+
+    # 当前状态下外观随悬停变化的按钮
+    def hover_buttons(self):
+        if self.state == MenuState.MAIN:
+            return self.main_buttons
+        if self.state == MenuState.SKINS:
+            return [skin["button"] for skin in self.skin_buttons if skin["unlocked"]] + [self.back_button]
+        if self.state == MenuState.DIFFICULTY:
+            return [diff["button"] for diff in self.difficulty_buttons] + [self.back_button]
+        return [self.back_button]
+
+    def draw_button(self, screen, button, hovered):
+        button.draw(screen, hovered)
+        if self.state == MenuState.DIFFICULTY:
+            for diff in self.difficulty_buttons:
+                if diff["button"] is button and diff["value"] == self.selected_speed:
+                    pygame.draw.rect(screen, (255, 255, 255), button.rect, 3, border_radius=10)
+
+    # 绘制一帧，返回需要提交给display.update的脏矩形列表
     def draw(self, screen):
+        key = self.screen_key()
+        cached = self.screens.get(self.state)
+        if cached is None or cached[0] != key:
+            cached = self.screens[self.state] = (key, self.render_screen())
+        background = cached[1]
+
+        if self.full_redraw or key != self.shown_key:
+            self.full_redraw = False
+            self.shown_key = key
+            self.overlay_rect = None
+            screen.blit(background, (0, 0))
+            for button in self.hover_buttons():
+                button.dirty = False
+                if button.is_hovered:
+                    self.draw_button(screen, button, True)
+            return [screen.get_rect()]
+
+        rects = []
+        # 恢复上一帧性能统计覆盖的区域
+        if self.overlay_rect is not None:
+            screen.blit(background, self.overlay_rect, self.overlay_rect)
+            rects.append(self.overlay_rect)
+            for button in self.hover_buttons():
+                if button.is_hovered and button.rect.colliderect(self.overlay_rect):
+                    button.dirty = True
+            self.overlay_rect = None
+        for button in self.hover_buttons():
+            if button.dirty:
+                button.dirty = False
+                screen.blit(background, button.rect, button.rect)
+                if button.is_hovered:
+                    self.draw_button(screen, button, True)
+                rects.append(button.rect)
+        return rects
+
+    def draw_profiler_overlay(self, screen):
+        self.overlay_rect = profiler.draw_overlay(screen)
+        return self.overlay_rect
+
+    # 合成当前状态的整屏画面
+    def render_screen(self):
+        screen = pygame.Surface((self.screen_width, self.screen_height)).convert()
         screen.fill(self.background)
         
         if self.state == MenuState.MAIN:
             # 绘制标题
-            title = self.title_font.render("贪食蛇游戏", True, (255, 255, 255))
+            title = render_text("贪食蛇游戏", 72, (255, 255, 255))
             screen.blit(title, (self.screen_width//2 - title.get_width()//2, 100))
             
             # 绘制最高分和等级
-            score_text = self.subtitle_font.render(f"最高分: {self.player_data['highest_score']}", True, (255, 255, 255))
-            level_text = self.subtitle_font.render(f"最高等级: {self.player_data['highest_level']}", True, (255, 255, 255))
+            score_text = render_text(f"最高分: {self.player_data['highest_score']}", 36, (255, 255, 255))
+            level_text = render_text(f"最高等级: {self.player_data['highest_level']}", 36, (255, 255, 255))
             screen.blit(score_text, (self.screen_width//2 - score_text.get_width()//2, 180))
             screen.blit(level_text, (self.screen_width//2 - level_text.get_width()//2, 220))
             
             # 绘制按钮
             for button in self.main_buttons:
-                button.draw(screen)
+                self.draw_button(screen, button, False)
                 
             # 绘制开发者信息
-            try:
-                dev_font = pygame.font.Font("C:\\Windows\\Fonts\\simhei.ttf", 20)  # 使用较小的字体
-            except:
-                dev_font = pygame.font.Font(None, 20)  # 如果找不到中文字体，使用默认字体
-            dev_info = dev_font.render("开发者: 王康业 | 版本: 1.0.0", True, (180, 180, 180))
+            dev_info = render_text("开发者: 王康业 | 版本: 1.0.0", 20, (180, 180, 180))  # 使用较小的字体
             screen.blit(dev_info, (self.screen_width//2 - dev_info.get_width()//2, self.screen_height - 30))
                 
         elif self.state == MenuState.SKINS:
             # 绘制标题
-            title = self.title_font.render("皮肤选择", True, (255, 255, 255))
+            title = render_text("皮肤选择", 72, (255, 255, 255))
             screen.blit(title, (self.screen_width//2 - title.get_width()//2, 100))
             
             # 添加皮肤解锁说明
-            unlock_info = self.subtitle_font.render("黄色皮肤：达到5级解锁   紫色皮肤：达到10级解锁", True, (255, 215, 0))
+            unlock_info = render_text("   ".join(f"{rule.skin}皮肤：{rule.desc}解锁"
+                                               for rule in ACHIEVEMENTS if rule.skin), 36, (255, 215, 0))
             screen.blit(unlock_info, (self.screen_width//2 - unlock_info.get_width()//2, 160))
             
             # 绘制皮肤按钮
             for skin in self.skin_buttons:
                 if skin["unlocked"]:
-                    skin["button"].draw(screen)
+                    self.draw_button(screen, skin["button"], False)
                 else:
                     # 绘制锁定的皮肤
                     pygame.draw.rect(screen, (100, 100, 100), skin["button"].rect, border_radius=10)
                     pygame.draw.rect(screen, (255, 255, 255), skin["button"].rect, 2, border_radius=10)
                     
                     # 绘制锁图标
-                    lock_text = self.subtitle_font.render("🔒", True, (255, 255, 255))
+                    lock_text = render_text("🔒", 36, (255, 255, 255))
                     screen.blit(lock_text, (skin["button"].rect.centerx - lock_text.get_width()//2, 
                                            skin["button"].rect.centery - lock_text.get_height()//2))
             
             # 显示当前选择的皮肤
-            current_text = self.subtitle_font.render(f"当前皮肤: {self.player_data['current_skin']}", True, (255, 255, 255))
+            current_text = render_text(f"当前皮肤: {self.player_data['current_skin']}", 36, (255, 255, 255))
             screen.blit(current_text, (self.screen_width//2 - current_text.get_width()//2, self.screen_height - 150))
             
             # 绘制返回按钮
-            self.back_button.draw(screen)
+            self.draw_button(screen, self.back_button, False)
             
         elif self.state == MenuState.DIFFICULTY:
             # 绘制标题
-            title = self.title_font.render("难度选择", True, (255, 255, 255))
+            title = render_text("难度选择", 72, (255, 255, 255))
             screen.blit(title, (self.screen_width//2 - title.get_width()//2, 100))
             
             # 绘制难度说明
@@ -232,67 +310,72 @@ class Menu:
                 "困难：速度较快，考验反应能力"
             ]
             for i, desc in enumerate(descriptions):
-                desc_text = self.subtitle_font.render(desc, True, (200, 200, 200))
+                desc_text = render_text(desc, 36, (200, 200, 200))
                 screen.blit(desc_text, (self.screen_width//2 - desc_text.get_width()//2, 180 + i*40))
             
             # 绘制难度按钮
             for diff in self.difficulty_buttons:
-                diff["button"].draw(screen)
-                if diff["value"] == self.selected_speed:
-                    pygame.draw.rect(screen, (255, 255, 255), diff["button"].rect, 3, border_radius=10)
+                self.draw_button(screen, diff["button"], False)
             
             # 显示当前选择的难度
             current_diff = "简单" if self.selected_speed == 5 else "中等" if self.selected_speed == 8 else "困难"
-            current_text = self.subtitle_font.render(f"当前难度: {current_diff}", True, (255, 255, 255))
+            current_text = render_text(f"当前难度: {current_diff}", 36, (255, 255, 255))
             screen.blit(current_text, (self.screen_width//2 - current_text.get_width()//2, self.screen_height - 150))
             
             # 绘制返回按钮
-            self.back_button.draw(screen)
+            self.draw_button(screen, self.back_button, False)
             
         elif self.state == MenuState.ACHIEVEMENTS:
             # 绘制标题
-            title = self.title_font.render("成就", True, (255, 255, 255))
+            title = render_text("成就", 72, (255, 255, 255))
             screen.blit(title, (self.screen_width//2 - title.get_width()//2, 100))
             
-            # 显示成就列表
-            achievements = [
-                {"name": "初出茅庐", "desc": "达到5级", "unlocked": self.player_data["highest_level"] >= 5},
-                {"name": "蛇王", "desc": "达到10级", "unlocked": self.player_data["highest_level"] >= 10},
-                {"name": "高分达人", "desc": "获得500分", "unlocked": self.player_data["highest_score"] >= 500},
-                {"name": "贪食之王", "desc": "获得1000分", "unlocked": self.player_data["highest_score"] >= 1000}
-            ]
-            
+            # 显示成就列表，解锁状态来自成就判定的结果
             y_pos = 200
-            for achievement in achievements:
-                color = (255, 255, 255) if achievement["unlocked"] else (150, 150, 150)
-                name_text = self.subtitle_font.render(achievement["name"], True, color)
-                desc_text = self.subtitle_font.render(achievement["desc"], True, color)
+            spacing = min(80, (self.screen_height - 300) // max(1, len(ACHIEVEMENTS)))
+            for rule in ACHIEVEMENTS:
+                unlocked = self.achievements.is_unlocked(rule)
+                color = (255, 255, 255) if unlocked else (150, 150, 150)
+                name_text = render_text(rule.name, 36, color)
+                desc_text = render_text(rule.desc, 36, color)
                 
                 # 调整文本位置和间距
-                screen.blit(name_text, (self.screen_width//2 - 200, y_pos))
-                screen.blit(desc_text, (self.screen_width//2 + 20, y_pos))
+                screen.blit(name_text, (self.screen_width//2 - 320, y_pos))
+                screen.blit(desc_text, (self.screen_width//2 - 100, y_pos))
                 
                 # 显示解锁状态
-                status = "✓" if achievement["unlocked"] else "✗"
-                status_text = self.subtitle_font.render(status, True, color)
-                screen.blit(status_text, (self.screen_width//2 + 200, y_pos))
+                status = "✓" if unlocked else "✗"
+                status_text = render_text(status, 36, color)
+                screen.blit(status_text, (self.screen_width//2 + 300, y_pos))
                 
-                y_pos += 80  # 增加垂直间距
+                y_pos += spacing
             
             # 绘制返回按钮
-            self.back_button.draw(screen)
+            self.draw_button(screen, self.back_button, False)
+        return screen
     
-    def handle_events(self):
+    # 没有待处理的输入且无需重绘时阻塞等待，最多timeout毫秒，空闲时几乎不占CPU
+    def handle_events(self, timeout=MENU_IDLE_TIMEOUT):
+        events = pygame.event.get()
+        if not events and timeout and not self.full_redraw:
+            # 阻塞等待的时间计入sleep，不算作事件处理
+            profiler.mark("events")
+            event = pygame.event.wait(timeout)
+            profiler.mark("sleep")
+            if event.type != pygame.NOEVENT:
+                events = [event] + pygame.event.get()
         mouse_pos = pygame.mouse.get_pos()
         mouse_clicked = False
         
-        for event in pygame.event.get():
+        for event in events:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:  # 左键点击
                     mouse_clicked = True
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:  # F3显示/隐藏性能统计
+                profiler.toggle_overlay()
         
         if self.state == MenuState.MAIN:
             # 处理主菜单按钮
@@ -342,5 +425,8 @@ class Menu:
             self.back_button.check_hover(mouse_pos)
             if self.back_button.is_clicked(mouse_pos, mouse_clicked):
                 self.state = MenuState.MAIN
-                
+
+        # 状态切换后，新画面中按钮的悬停状态以当前鼠标位置为准
+        for button in self.hover_buttons():
+            button.check_hover(mouse_pos)
         return None
@@ -0,0 +1,148 @@
+from array import array
+from collections import deque
+
+# 障碍物层：占用位图（每格1位）+ 按生成顺序排列的坐标列表
+# 碰撞检测是O(1)；新障碍物只放在不会把棋盘分割成多块的位置
+class ObstacleLayer:
+    def __init__(self, width, height, free=None):
+        self.width = width
+        self.height = height
+        self.blocked = bytearray((width * height + 7) // 8)
+        self.cells = array('i')  # 生成顺序，用于绘制和遍历
+        self.free = free  # 可选的空闲格子索引，随障碍物增减同步更新
+        self.shared = False  # fork后与其他层共享blocked/cells，修改前先复制
+
+    # 复制一份独立的障碍物层，共享位图和列表，任何一方修改时才复制（障碍物很少变化）
+    def fork(self, free=None):
+        new = object.__new__(ObstacleLayer)
+        new.__dict__ = self.__dict__.copy()
+        new.free = free
+        self.shared = new.shared = True
+        return new
+
+    def unshare(self):
+        self.blocked = bytearray(self.blocked)
+        self.cells = self.cells[:]
+        self.shared = False
+
+    def is_blocked(self, cell):
+        return self.blocked[cell >> 3] & (1 << (cell & 7)) != 0
+
+    def __contains__(self, position):
+        return self.is_blocked(position[1] * self.width + position[0])
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __iter__(self):
+        width = self.width
+        for cell in self.cells:
+            yield cell % width, cell // width
+
+    def add(self, cell):
+        if self.shared:
+            self.unshare()
+        self.blocked[cell >> 3] |= 1 << (cell & 7)
+        self.cells.append(cell)
+        if self.free is not None:
+            self.free.discard(cell)
+        return cell % self.width, cell // self.width
+
+    def clear(self):
+        if self.shared:
+            self.unshare()
+        for cell in self.cells:
+            self.blocked[cell >> 3] = 0
+            if self.free is not None:
+                self.free.add(cell)
+        del self.cells[:]
+
+    # 格子上下左右四个方向中没有障碍物的邻居
+    def open_neighbors(self, cell):
+        x, y = cell % self.width, cell // self.width
+        result = []
+        if y > 0 and not self.is_blocked(cell - self.width):
+            result.append(cell - self.width)
+        if x < self.width - 1 and not self.is_blocked(cell + 1):
+            result.append(cell + 1)
+        if y < self.height - 1 and not self.is_blocked(cell + self.width):
+            result.append(cell + self.width)
+        if x > 0 and not self.is_blocked(cell - 1):
+            result.append(cell - 1)
+        return result
+
+    def is_open(self, x, y):
+        return (0 <= x < self.width and 0 <= y < self.height
+                and not self.is_blocked(y * self.width + x))
+
+    # 把cell变成障碍物后，其余非障碍格子是否仍然全部连通
+    def keeps_connected(self, cell):
+        neighbors = self.open_neighbors(cell)
+        if len(neighbors) <= 1:
+            return True
+        # 局部检查：沿周围8格走一圈，相邻的两个正方向邻居经由角上的空格相连
+        # 所有开放邻居在这一圈里属于同一段时，去掉cell不会影响连通性
+        x, y = cell % self.width, cell // self.width
+        ring = [self.is_open(x + dx, y + dy) for dx, dy in
+                ((0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1))]
+        joins = sum(1 for i in (0, 2, 4, 6) if ring[i] and ring[i + 1] and ring[(i + 2) % 8])
+        if len(neighbors) - joins <= 1:
+            return True
+        return self.connected_without(cell, neighbors)
+
+    # 从每个邻居同时做广度优先搜索，逐格交替扩展，搜索相遇时用并查集合并
+    # 所有搜索合并为一组则连通；某一组先搜完说明它被封闭了，代价只与较小的那块区域有关
+    def connected_without(self, cell, starts):
+        parent = list(range(len(starts)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        owner = {start: i for i, start in enumerate(starts)}
+        owner[cell] = -1
+        queues = [deque([start]) for start in starts]
+        groups = len(starts)
+        while True:
+            for i, queue in enumerate(queues):
+                if not queue:
+                    continue
+                for neighbor in self.open_neighbors(queue.popleft()):
+                    other = owner.get(neighbor)
+                    if other is None:
+                        owner[neighbor] = i
+                        queue.append(neighbor)
+                    elif other >= 0:
+                        a, b = find(other), find(i)
+                        if a != b:
+                            parent[a] = b
+                            groups -= 1
+                            if groups == 1:
+                                return True
+            live = {find(i) for i, queue in enumerate(queues) if queue}
+            if len(live) < groups:
+                return False
+
+    # 从空闲格子中随机选一个不会封闭区域的位置放置障碍物，avoid中的格子除外
+    # 尝试attempts次都不合适时放弃，返回None
+    def place_random(self, rng, avoid=(), attempts=32):
+        for _ in range(attempts):
+            cell = self.free.sample(rng)
+            if cell is None:
+                return None
+            if cell in avoid or not self.keeps_connected(cell):
+                continue
+            return self.add(cell)
+        return None
+
+    # 生成count个障碍物的布局，返回实际放置的位置
+    def generate(self, rng, count, avoid=()):
+        placed = []
+        for _ in range(count):
+            position = self.place_random(rng, avoid)
+            if position is None:
+                break
+            placed.append(position)
+        return placed
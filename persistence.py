@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import atexit
+import threading
+
+# 后台写入的JSON存储：
+# - save()只在调用线程序列化一份快照，写盘由后台线程完成，不阻塞渲染
+# - 每份快照先追加到日志文件（一行一份），崩溃时最多丢失最后一次更新
+# - 短时间内的多次更新合并为一次完整写入：临时文件 + fsync + 原子重命名，之后清空日志
+class JsonStore:
+    def __init__(self, path, coalesce_delay=0.5):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.coalesce_delay = coalesce_delay
+        self.condition = threading.Condition()
+        self.pending = None  # 尚未写入日志的最新快照（已序列化）
+        self.dirty = False  # 日志中有尚未合并进主文件的快照
+        self.latest = None
+        self.closed = False
+        self.flush_requested = False
+        self.writes = 0
+        self.thread = threading.Thread(target=self.run, name="json-store", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    # 读取数据：主文件损坏时保留备份，再用日志中最新的完整快照覆盖
+    def load(self, default):
+        data = None
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"读取{self.path}失败: {e}")
+                try:
+                    os.replace(self.path, self.path + ".corrupt")
+                except OSError:
+                    pass
+        recovered = self.read_journal()
+        if recovered is not None:
+            data = recovered
+            self.save(data)  # 把日志中恢复的数据合并回主文件
+        return data if data is not None else default
+
+    def read_journal(self):
+        if not os.path.exists(self.journal_path):
+            return None
+        data = None
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        data = json.loads(line)
+                    except ValueError:
+                        break  # 最后一行可能只写了一半
+        except OSError as e:
+            print(f"读取{self.journal_path}失败: {e}")
+        return data
+
+    def save(self, data):
+        snapshot = json.dumps(data, ensure_ascii=False)
+        with self.condition:
+            self.pending = snapshot
+            self.latest = snapshot
+            self.condition.notify()
+
+    # 阻塞直到当前所有更新都写入主文件
+    def flush(self):
+        with self.condition:
+            self.flush_requested = True
+            self.condition.notify()
+            while not self.closed and (self.pending is not None or self.dirty):
+                self.condition.wait(0.1)
+
+    def close(self):
+        if self.closed:
+            return
+        self.flush()
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join(timeout=5)
+
+    def run(self):
+        deadline = None
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed and not self.flush_requested:
+                    timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                    if timeout == 0.0:
+                        break
+                    self.condition.wait(timeout)
+                snapshot = self.pending
+                self.pending = None
+                closing = self.closed
+                flush = self.flush_requested
+                self.flush_requested = False
+
+            if snapshot is not None:
+                self.append_journal(snapshot)
+                with self.condition:
+                    self.dirty = True
+                if deadline is None:
+                    deadline = time.monotonic() + self.coalesce_delay
+
+            with self.condition:
+                dirty = self.dirty
+                latest = self.latest
+            if dirty and (flush or closing or time.monotonic() >= deadline):
+                self.write_atomic(latest)
+                deadline = None
+                with self.condition:
+                    # 写入期间又有新快照时保持dirty，等待下一轮合并
+                    self.dirty = self.pending is not None
+                    self.condition.notify_all()
+            if closing:
+                return
+
+    def append_journal(self, snapshot):
+        try:
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(snapshot + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            print(f"写入日志失败: {e}")
+
+    def write_atomic(self, snapshot):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(json.loads(snapshot), f, ensure_ascii=False, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            # 主文件已包含最新数据，日志可以清空
+            with open(self.journal_path, "w", encoding="utf-8"):
+                pass
+            self.writes += 1
+        except OSError as e:
+            print(f"保存{self.path}失败: {e}")
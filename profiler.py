@@ -0,0 +1,156 @@
+import os
+import time
+from collections import deque
+
+# 逐帧分阶段计时：events / update / draw / display / sleep
+# 关闭时mark()只做一次属性判断，对帧时间几乎没有影响
+PHASES = ("events", "update", "draw", "display", "sleep")
+QUANTILES = (50, 95, 99)
+
+class FrameProfiler:
+    def __init__(self, enabled=False, window=600, export_path=None, export_interval=5.0):
+        self.enabled = enabled
+        self.overlay = False
+        self.window = window
+        self.samples = {phase: deque(maxlen=window) for phase in PHASES + ("frame",)}
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.frame_start = 0.0
+        self.last = 0.0
+        self.frames = 0
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self.next_export = time.perf_counter() + export_interval
+        self.overlay_lines = []
+        self.input_latency = None  # 可选：返回{速度: 延迟统计}的函数，见InputQueue.latency_report
+        self.next_overlay_refresh = 0.0
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.frame_start = self.last = time.perf_counter()
+
+    # 把上一次mark到现在的时间计入phase
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.current[phase] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        for phase in PHASES:
+            self.samples[phase].append(self.current[phase])
+            self.current[phase] = 0.0
+        self.samples["frame"].append(now - self.frame_start)
+        self.frames += 1
+        if self.export_path and now >= self.next_export:
+            self.next_export = now + self.export_interval
+            self.export()
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        if self.overlay:
+            self.enabled = True
+        return self.overlay
+
+    # 返回各阶段的分位数（秒）
+    def percentiles(self, phase):
+        ordered = sorted(self.samples[phase])
+        if not ordered:
+            return dict.fromkeys(QUANTILES, 0.0)
+        last = len(ordered) - 1
+        return {q: ordered[min(last, len(ordered) * q // 100)] for q in QUANTILES}
+
+    def summary(self):
+        return {phase: self.percentiles(phase) for phase in PHASES + ("frame",)}
+
+    # 按键到生效延迟的分位数（秒），按速度分组：{速度: {分位: 秒}}
+    def latency_summary(self):
+        if self.input_latency is None:
+            return {}
+        return {speed: {q: stats[f"p{q}_ms"] / 1000 for q in QUANTILES}
+                for speed, stats in self.input_latency().items() if stats["count"]}
+
+    def export(self, path=None):
+        path = path or self.export_path
+        try:
+            if path.endswith(".prom"):
+                self.export_prometheus(path)
+            else:
+                self.export_csv(path)
+        except OSError as e:
+            print(f"导出性能数据失败: {e}")
+
+    # CSV：每次导出追加一行每个阶段的分位数（毫秒）
+    def export_csv(self, path):
+        new_file = not os.path.exists(path)
+        timestamp = time.time()
+        with open(path, "a", encoding="utf-8") as f:
+            if new_file:
+                f.write("timestamp,frames,phase,p50_ms,p95_ms,p99_ms\n")
+            for phase, values in self.summary().items():
+                f.write(f"{timestamp:.3f},{self.frames},{phase},"
+                        + ",".join(f"{values[q] * 1000:.3f}" for q in QUANTILES) + "\n")
+            for speed, values in self.latency_summary().items():
+                f.write(f"{timestamp:.3f},{self.frames},input_{speed},"
+                        + ",".join(f"{values[q] * 1000:.3f}" for q in QUANTILES) + "\n")
+
+    # Prometheus文本格式，供node_exporter的textfile收集器读取；先写临时文件再替换
+    def export_prometheus(self, path):
+        lines = [
+            "# HELP snake_frame_phase_seconds Per-phase frame time quantiles.",
+            "# TYPE snake_frame_phase_seconds summary",
+        ]
+        for phase, values in self.summary().items():
+            for q in QUANTILES:
+                lines.append(f'snake_frame_phase_seconds{{phase="{phase}",quantile="{q / 100}"}} '
+                             f'{values[q]:.6f}')
+        lines.append(f"snake_frames_total {self.frames}")
+        latency = self.latency_summary()
+        if latency:
+            lines.append("# HELP snake_input_latency_seconds Key press to applied turn latency quantiles.")
+            lines.append("# TYPE snake_input_latency_seconds summary")
+            for speed, values in latency.items():
+                for q in QUANTILES:
+                    lines.append(f'snake_input_latency_seconds{{speed="{speed}",quantile="{q / 100}"}} '
+                                 f'{values[q]:.6f}')
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+    # 在屏幕右上角绘制统计信息，返回覆盖的矩形；文字每秒刷新4次
+    def draw_overlay(self, screen):
+        import pygame
+        from fonts import render_text
+
+        now = time.perf_counter()
+        if now >= self.next_overlay_refresh:
+            self.next_overlay_refresh = now + 0.25
+            self.overlay_lines = [f"{'phase':<8}{'p50':>7}{'p95':>7}{'p99':>7} ms"]
+            for phase, values in self.summary().items():
+                self.overlay_lines.append(f"{phase:<8}" + "".join(
+                    f"{values[q] * 1000:7.2f}" for q in QUANTILES))
+            # 按键延迟按速度分行显示
+            for speed, values in self.latency_summary().items():
+                self.overlay_lines.append(f"{'input' + str(speed):<8}" + "".join(
+                    f"{values[q] * 1000:7.2f}" for q in QUANTILES))
+        surfaces = [render_text(line, 20, (255, 255, 0), path=None) for line in self.overlay_lines]
+        width = max(surface.get_width() for surface in surfaces) + 12
+        height = sum(surface.get_height() for surface in surfaces) + 12
+        rect = pygame.Rect(screen.get_width() - width - 10, 10, width, height)
+        pygame.draw.rect(screen, (0, 0, 0), rect)
+        y = rect.top + 6
+        for surface in surfaces:
+            screen.blit(surface, (rect.left + 6, y))
+            y += surface.get_height()
+        return rect
+
+# 通过环境变量开启：SNAKE_PROFILE=1，SNAKE_PROFILE_EXPORT=文件路径（.prom为Prometheus格式，否则CSV）
+profiler = FrameProfiler(enabled=bool(os.environ.get("SNAKE_PROFILE")),
+                         export_path=os.environ.get("SNAKE_PROFILE_EXPORT"))
+if profiler.export_path:
+    profiler.enabled = True
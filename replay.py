@@ -0,0 +1,271 @@
+import os
+import struct
+import sys
+import time
+import queue
+import atexit
+import argparse
+import threading
+from engine import Engine, UP, DOWN, LEFT, RIGHT
+
+# 录像文件格式（小端）：
+#   文件头: 魔数 b'SNKR', 版本, 种子(u64), 初始速度(u8), 棋盘宽(u16), 棋盘高(u16)
+#   转向记录: 记录数(varint)，每条为 距上次转向的tick数(varint) + 方向编码(u8)
+#   文件尾: 最终分数(u32), 最终等级(u16), 总tick数(u32)
+MAGIC = b'SNKR'
+VERSION = 2  # 版本2：障碍物参与碰撞、生成时保证连通，旧录像无法复现
+HEADER = struct.Struct('<4sBQBHH')
+FOOTER = struct.Struct('<IHI')
+
+DIRECTION_CODES = {UP: 0, DOWN: 1, LEFT: 2, RIGHT: 3}
+CODE_DIRECTIONS = {code: direction for direction, code in DIRECTION_CODES.items()}
+
+REPLAY_DIR = "replays"
+# 录像目录最多保留的文件数，超出时删除最旧的；SNAKE_REPLAY_KEEP=0表示不限制
+def replay_keep_from_env(default=100):
+    try:
+        return max(0, int(os.environ.get("SNAKE_REPLAY_KEEP", str(default))))
+    except ValueError as e:
+        print(f"录像保留数量无效: {e}")
+        return default
+
+REPLAY_KEEP = replay_keep_from_env()
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+# 一局游戏的录像：种子、初始参数、每次实际生效的转向以及最终结果
+class Replay:
+    def __init__(self, seed, speed, width, height, turns=None,
+                 score=0, level=1, ticks=0):
+        self.seed = seed
+        self.speed = speed
+        self.width = width
+        self.height = height
+        self.turns = turns if turns is not None else []  # [(tick, 方向)]
+        self.score = score
+        self.level = level
+        self.ticks = ticks
+
+    def to_bytes(self):
+        out = bytearray(HEADER.pack(MAGIC, VERSION, self.seed, self.speed,
+                                    self.width, self.height))
+        write_varint(out, len(self.turns))
+        last_tick = 0
+        for tick, direction in self.turns:
+            write_varint(out, tick - last_tick)
+            out.append(DIRECTION_CODES[direction])
+            last_tick = tick
+        out += FOOTER.pack(self.score, self.level, self.ticks)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, seed, speed, width, height = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("不是有效的录像文件")
+        if version != VERSION:
+            raise ValueError(f"不支持的录像版本: {version}")
+        count, offset = read_varint(data, HEADER.size)
+        turns = []
+        tick = 0
+        for _ in range(count):
+            delta, offset = read_varint(data, offset)
+            tick += delta
+            turns.append((tick, CODE_DIRECTIONS[data[offset]]))
+            offset += 1
+        score, level, ticks = FOOTER.unpack_from(data, offset)
+        return cls(seed, speed, width, height, turns, score, level, ticks)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    # 按tick依次产出要传给Engine.step的动作
+    def actions(self):
+        turns = iter(self.turns)
+        next_turn = next(turns, None)
+        tick = 0
+        while True:
+            if next_turn is not None and next_turn[0] == tick:
+                yield next_turn[1]
+                next_turn = next(turns, None)
+            else:
+                yield None
+            tick += 1
+
+# 挂在Engine.recorder上，记录每次实际生效的转向
+class ReplayRecorder:
+    def __init__(self, engine):
+        self.reset(engine)
+
+    # 引擎开始新的一局时重新记录
+    def reset(self, engine):
+        self.replay = Replay(engine.seed, engine.snake.speed, engine.width, engine.height)
+
+    def record(self, tick, direction):
+        self.replay.turns.append((tick, direction))
+
+    def finish(self, engine):
+        self.replay.score = engine.snake.score
+        self.replay.level = engine.level
+        self.replay.ticks = engine.ticks
+        return self.replay
+
+    def save(self, directory=REPLAY_DIR):
+        os.makedirs(directory, exist_ok=True)
+        path = replay_path(directory, self.replay)
+        self.replay.save(path)
+        return path
+
+def replay_path(directory, replay):
+    name = time.strftime("%Y%m%d-%H%M%S") + f"-{replay.seed}.snkr"
+    return os.path.join(directory, name)
+
+# 后台保存录像：游戏线程只把结束的录像放进队列，编码、写盘和清理旧录像由后台线程完成
+# 线程在第一次保存时才启动
+class ReplayWriter:
+    def __init__(self, directory=REPLAY_DIR, keep=REPLAY_KEEP):
+        self.directory = directory
+        self.keep = keep
+        self.queue = queue.Queue()
+        self.thread = None
+        self.closed = False
+
+    # replay交给后台后不应再修改（ReplayRecorder.reset会换成新的Replay对象）
+    def submit(self, replay):
+        if self.closed:
+            return None
+        path = replay_path(self.directory, replay)  # 文件名按结束时间生成
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="replay-writer", daemon=True)
+            self.thread.start()
+            atexit.register(self.close)
+        self.queue.put((path, replay))
+        return path
+
+    # 等待已提交的录像全部写入
+    def flush(self):
+        self.queue.join()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(timeout=5)
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            path, replay = item
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                replay.save(path)
+                self.prune()
+            except Exception as e:
+                print(f"保存录像失败: {e}")
+            self.queue.task_done()
+
+    # 只保留最近的keep个录像文件
+    def prune(self):
+        if self.keep <= 0:
+            return
+        paths = [entry.path for entry in os.scandir(self.directory)
+                 if entry.is_file() and entry.name.endswith(".snkr")]
+        if len(paths) <= self.keep:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:len(paths) - self.keep]:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"删除旧录像失败: {e}")
+
+replay_writer = ReplayWriter()
+
+# 无界面全速重新模拟，返回结束时的引擎
+def simulate(replay, max_ticks=None):
+    engine = Engine(speed=replay.speed, seed=replay.seed,
+                    width=replay.width, height=replay.height)
+    limit = max_ticks if max_ticks is not None else replay.ticks
+    actions = replay.actions()
+    while not engine.game_over and engine.ticks < limit:
+        engine.step(next(actions))
+    return engine
+
+# 校验录像：重新模拟的结果必须与记录的分数、等级和tick数一致
+def verify(replay):
+    engine = simulate(replay)
+    ok = (engine.game_over and engine.snake.score == replay.score and
+          engine.level == replay.level and engine.ticks == replay.ticks)
+    return ok, engine
+
+# 用游戏窗口回放，rate为相对原始速度的倍数
+def render(replay, rate=1.0):
+    import pygame
+    from main import Game, RENDER_FPS
+
+    game = Game(speed=replay.speed, seed=replay.seed,
+                board_width=replay.width, board_height=replay.height)
+    game.record_replays = False
+    actions = replay.actions()
+    accumulator = 0.0
+    dt = 0.0
+    while not game.engine.game_over:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or \
+               (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                return game.engine
+        accumulator += dt * rate
+        while accumulator >= 1.0 / game.snake.speed and not game.engine.game_over:
+            accumulator -= 1.0 / game.snake.speed
+            game.step(next(actions))
+        pygame.display.update(game.draw(game.screen))
+        dt = game.clock.tick(RENDER_FPS) / 1000.0
+    return game.engine
+
+def main():
+    parser = argparse.ArgumentParser(description="回放并校验贪食蛇录像")
+    parser.add_argument("path", help="录像文件路径")
+    parser.add_argument("--render", action="store_true", help="在窗口中回放")
+    parser.add_argument("--rate", type=float, default=1.0, help="回放速度倍数")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.path)
+    if args.render:
+        render(replay, args.rate)
+        return 0
+    start = time.perf_counter()
+    ok, engine = verify(replay)
+    elapsed = time.perf_counter() - start
+    print(f"种子 {replay.seed}: {engine.ticks} ticks, 用时 {elapsed * 1000:.1f} ms, "
+          f"分数 {engine.snake.score}/{replay.score}, 等级 {engine.level}/{replay.level}")
+    print("校验通过" if ok else "校验失败")
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,581 @@
+import sys
+import time
+import random
+import struct
+import asyncio
+import argparse
+from engine import (Snake, Food, FoodType, GRID_WIDTH, GRID_HEIGHT, DIRECTIONS,
+                    difficulty_settings)
+from free_cells import FreeCellIndex
+from obstacles import ObstacleLayer
+from input_queue import InputQueue
+from replay import write_varint, read_varint, DIRECTION_CODES, CODE_DIRECTIONS
+
+# 联机对战服务器：asyncio单线程承载多个相互独立的房间，每个房间多条蛇共用一个棋盘
+# 服务器是权威方，客户端只发送转向；每个tick只广播发生变化的格子
+#
+# 帧格式：u32长度 + 负载，负载第一个字节为类型
+#   客户端 -> 服务器:
+#     J 加入: 速度(u8) + 房间名(utf-8)
+#     T 转向: 方向编码(u8，同录像格式)
+#     R 请求校验快照（在下一个tick的增量之后回复）
+#   服务器 -> 客户端:
+#     W 欢迎: 玩家编号(u8), 棋盘宽(u16), 棋盘高(u16), 速度(u8)
+#     S 完整快照 / D 增量 / V 校验快照: tick(u32), 格子数(u32), 按格子索引排序的间隔(varint)..., 格子值(u8)...
+#     P 分数: 玩家数(u8), 每个玩家 编号(u8) + 分数(u32) + 是否存活(u8)
+#     E 错误: 错误信息(utf-8)
+FRAME = struct.Struct('<I')
+CELLS_HEADER = struct.Struct('<II')
+WELCOME = struct.Struct('<BHHB')
+PLAYER_SCORE = struct.Struct('<BIB')
+
+# 格子值
+EMPTY = 0
+OBSTACLE = 1
+FOOD_BASE = 1  # 食物为 FOOD_BASE + FoodType.value
+BODY_BASE = 16  # 玩家的蛇身为 BODY_BASE + 编号
+HEAD_BASE = 64  # 玩家的蛇头为 HEAD_BASE + 编号
+
+MAX_PLAYERS = 8
+RESPAWN_TICKS = 10
+MAX_MOVES_PER_TICK = 2
+SEND_BUFFER_FRAMES = 32  # 每个客户端最多排队的帧数，超过时丢弃增量并改发完整快照
+WRITE_BUFFER_HIGH = 64 * 1024
+
+def frame(payload):
+    return FRAME.pack(len(payload)) + payload
+
+async def read_frame(reader):
+    header = await reader.readexactly(FRAME.size)
+    return await reader.readexactly(FRAME.unpack(header)[0])
+
+# 把排好序的(格子, 值)编码为S/D/V负载：格子索引用varint间隔，值单独连续存放
+def encode_cells(kind, tick, cells):
+    out = bytearray(kind)
+    out += CELLS_HEADER.pack(tick, len(cells))
+    last = 0
+    for cell, _ in cells:
+        write_varint(out, cell - last)
+        last = cell
+    out += bytes(value for _, value in cells)
+    return bytes(out)
+
+def decode_cells(payload):
+    tick, count = CELLS_HEADER.unpack_from(payload, 1)
+    offset = 1 + CELLS_HEADER.size
+    cells = []
+    cell = 0
+    for _ in range(count):
+        gap, offset = read_varint(payload, offset)
+        cell += gap
+        cells.append(cell)
+    return tick, list(zip(cells, payload[offset:offset + count]))
+
+# 房间里的一名玩家
+class Player:
+    def __init__(self, slot, writer):
+        self.slot = slot
+        self.writer = writer
+        self.snake = None
+        self.inputs = InputQueue()
+        self.credit = 0.0  # 按蛇自身速度累积的移动次数
+        self.respawn_at = 0
+        self.outbox = asyncio.Queue(maxsize=SEND_BUFFER_FRAMES)
+        self.needs_snapshot = True
+        self.verify_requested = False  # 在下一次广播的增量之后回复校验快照
+        self.dropped = 0
+
+    # 放入发送队列；队列满说明客户端跟不上，丢掉积压的增量，下个tick改发完整快照
+    def send(self, payload):
+        try:
+            self.outbox.put_nowait(frame(payload))
+        except asyncio.QueueFull:
+            while not self.outbox.empty():
+                self.outbox.get_nowait()
+            self.dropped += 1
+            self.needs_snapshot = True
+
+    async def write_loop(self):
+        try:
+            while True:
+                data = await self.outbox.get()
+                self.writer.write(data)
+                await self.writer.drain()
+        except (ConnectionError, OSError):
+            pass
+
+# 一个房间：共享的棋盘、障碍物和食物，规则与Engine相同，另外蛇头撞到别的蛇也会死亡
+class Room:
+    def __init__(self, name, speed=5, width=GRID_WIDTH, height=GRID_HEIGHT, seed=None):
+        self.name = name
+        self.speed = speed
+        self.width = width
+        self.height = height
+        self.rng = random.Random(seed)
+        self.free = FreeCellIndex(width * height)
+        self.obstacles = ObstacleLayer(width, height, free=self.free)
+        self.foods = []
+        self.players = {}
+        self.tick_count = 0
+        self.level = 1
+        self.growth_points = 0
+        self.obstacle_frequency, self.special_food_chance = difficulty_settings(speed)
+        self.changed = set()
+        self.scores_changed = True
+        self.late_ticks = 0
+        self.task = None
+
+    def add_player(self, writer):
+        slot = next(i for i in range(MAX_PLAYERS) if i not in self.players)
+        player = Player(slot, writer)
+        self.players[slot] = player
+        self.spawn(player)
+        # 每名玩家对应一份食物
+        while len(self.foods) < len(self.players):
+            self.add_food()
+        return player
+
+    def remove_player(self, player):
+        self.players.pop(player.slot, None)
+        if player.snake is not None:
+            self.kill(player)
+        while len(self.foods) > max(1, len(self.players)):
+            food = self.foods.pop()
+            if food.position is not None:
+                self.release(food.position)
+        self.scores_changed = True
+
+    def add_food(self):
+        food = Food(self.rng, self.width, self.height, free=self.free)
+        # 构造时按默认概率放置过一次，按房间难度重新放置
+        if food.position is not None:
+            self.free.add(self.pack(food.position))
+        food.randomize_position(self.special_food_chance)
+        self.foods.append(food)
+        if food.position is not None:
+            self.changed.add(self.pack(food.position))
+
+    def pack(self, position):
+        return position[1] * self.width + position[0]
+
+    def release(self, position):
+        cell = self.pack(position)
+        self.free.add(cell)
+        self.changed.add(cell)
+
+    # 在随机空格子出生，朝向一个前方为空的方向
+    def spawn(self, player):
+        cell = self.free.sample(self.rng)
+        if cell is None:
+            player.respawn_at = self.tick_count + RESPAWN_TICKS
+            return
+        snake = Snake(self.rng, self.width, self.height, obstacles=self.obstacles)
+        snake.body.clear()
+        snake.body.free = self.free
+        snake.body.push_head(cell)
+        snake.speed = self.speed
+        x, y = cell % self.width, cell // self.width
+        open_directions = [d for d in DIRECTIONS
+                           if 0 <= x + d[0] < self.width and 0 <= y + d[1] < self.height
+                           and (y + d[1]) * self.width + x + d[0] in self.free]
+        snake.direction = self.rng.choice(open_directions or DIRECTIONS)
+        player.snake = snake
+        player.credit = 0.0
+        player.inputs.clear()
+        self.changed.add(cell)
+        self.scores_changed = True
+
+    def kill(self, player):
+        body = player.snake.body
+        cells = list(body.iter_cells())
+        body.clear()
+        self.changed.update(cells)
+        player.snake = None
+        player.respawn_at = self.tick_count + RESPAWN_TICKS
+        # 死亡的蛇头可能与别的蛇重叠，这些格子仍被占用
+        for cell in cells:
+            if self.occupant(cell) is not None:
+                self.free.discard(cell)
+        self.scores_changed = True
+
+    def occupant(self, cell):
+        for player in self.players.values():
+            if player.snake is not None and player.snake.body.is_occupied(cell):
+                return player
+        return None
+
+    def tick(self):
+        self.tick_count += 1
+        for player in list(self.players.values()):
+            snake = player.snake
+            if snake is None:
+                if self.tick_count >= player.respawn_at:
+                    self.spawn(player)
+                continue
+            # 速度由吃到的加速/减速食物决定，相对房间速度累积移动次数
+            player.credit = min(player.credit + snake.speed / self.speed, MAX_MOVES_PER_TICK)
+        # 分轮移动：每轮每条蛇最多走一步，一轮结束就判定蛇之间的碰撞，
+        # 加速的蛇在一个tick里走两步时，中间那一步也不会穿过别的蛇
+        while True:
+            moved = []
+            for player in list(self.players.values()):
+                snake = player.snake
+                if snake is None or player.credit < 1:
+                    continue
+                player.credit -= 1
+                snake.turn(player.inputs.pop(snake.direction, snake.speed))
+                old_tail = snake.body.tail()
+                old_head = snake.body.head()
+                if not snake.update():
+                    self.kill(player)
+                    continue
+                self.changed.update((old_tail, old_head, snake.body.head()))
+                moved.append(player)
+                self.check_food(player)
+            if not moved:
+                break
+            self.check_collisions(moved)
+
+    # 本轮移动过的蛇头撞到其他蛇（包括迎面相撞）
+    def check_collisions(self, moved):
+        heads = {}
+        for player in moved:
+            if player.snake is not None:
+                heads.setdefault(player.snake.body.head(), []).append(player)
+        for cell, players in heads.items():
+            dead = list(players) if len(players) > 1 else []
+            for other in self.players.values():
+                if other.snake is not None and other not in players and \
+                        other.snake.body.is_occupied(cell):
+                    dead = list(players)
+            for player in dead:
+                if player.snake is not None:
+                    self.kill(player)
+        # 同一轮里先移动的蛇让出的尾巴可能已被后移动的蛇占据，重新标记占用；
+        # 每轮都修复，蛇头离开后这个格子也不会留在空闲索引里
+        for player in moved:
+            if player.snake is not None:
+                self.free.discard(player.snake.body.head())
+
+    def check_food(self, player):
+        snake = player.snake
+        head = snake.get_head_position()
+        for food in self.foods:
+            if food.position != head:
+                continue
+            food_type = food.type
+            snake.length += 1
+            snake.score += 10
+            if food_type == FoodType.SPEED_UP:
+                snake.speed += 2
+            elif food_type == FoodType.SPEED_DOWN:
+                snake.speed = max(5, snake.speed - 2)
+            elif food_type == FoodType.WALL_PASS:
+                snake.wall_pass = True
+            if food.randomize_position(self.special_food_chance):
+                self.changed.add(self.pack(food.position))
+            self.scores_changed = True
+            # 房间每吃到5个食物升一级，按难度生成障碍物
+            self.growth_points += 1
+            if self.growth_points >= 5:
+                self.level += 1
+                self.growth_points = 0
+                if self.level % self.obstacle_frequency == 0:
+                    self.add_obstacle()
+            return
+
+    def add_obstacle(self):
+        avoid = []
+        for player in self.players.values():
+            snake = player.snake
+            if snake is not None:
+                x, y = snake.get_head_position()
+                avoid.append(((y + snake.direction[1]) % self.height) * self.width
+                             + (x + snake.direction[0]) % self.width)
+        obstacle = self.obstacles.place_random(self.rng, avoid=avoid)
+        if obstacle is not None:
+            self.changed.add(self.pack(obstacle))
+
+    def cell_value(self, cell):
+        if self.obstacles.is_blocked(cell):
+            return OBSTACLE
+        for player in self.players.values():
+            snake = player.snake
+            if snake is not None and snake.body.is_occupied(cell):
+                return (HEAD_BASE if snake.body.head() == cell else BODY_BASE) + player.slot
+        for food in self.foods:
+            if food.position is not None and self.pack(food.position) == cell:
+                return FOOD_BASE + food.type.value
+        return EMPTY
+
+    # 所有非空格子
+    def snapshot_cells(self):
+        cells = set(self.obstacles.cells)
+        for player in self.players.values():
+            if player.snake is not None:
+                cells.update(player.snake.body.iter_cells())
+        for food in self.foods:
+            if food.position is not None:
+                cells.add(self.pack(food.position))
+        return [(cell, self.cell_value(cell)) for cell in sorted(cells)]
+
+    def scores_payload(self):
+        out = bytearray(b'P')
+        out.append(len(self.players))
+        for slot, player in sorted(self.players.items()):
+            score = player.snake.score if player.snake is not None else 0
+            out += PLAYER_SCORE.pack(slot, score, player.snake is not None)
+        return bytes(out)
+
+    # 校验快照在本tick的增量之后发出，此时客户端应与服务器的棋盘完全一致
+    def broadcast(self):
+        delta = None
+        snapshot = None
+        verify = None
+        if self.changed:
+            delta = encode_cells(b'D', self.tick_count,
+                                 [(cell, self.cell_value(cell)) for cell in sorted(self.changed)])
+            self.changed.clear()
+        scores = self.scores_payload() if self.scores_changed else None
+        self.scores_changed = False
+        for player in self.players.values():
+            if player.needs_snapshot:
+                if snapshot is None:
+                    snapshot = encode_cells(b'S', self.tick_count, self.snapshot_cells())
+                player.needs_snapshot = False
+                player.send(snapshot)
+                player.send(self.scores_payload())
+            else:
+                if delta is not None:
+                    player.send(delta)
+                if scores is not None:
+                    player.send(scores)
+            if player.verify_requested:
+                if verify is None:
+                    verify = encode_cells(b'V', self.tick_count, self.snapshot_cells())
+                player.verify_requested = False
+                player.send(verify)
+
+    # 按房间速度固定步长推进；落后太多时丢弃积压的tick
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.speed
+        next_tick = loop.time()
+        while self.players:
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -5 * interval:
+                next_tick = loop.time()
+                self.late_ticks += 1
+            self.tick()
+            self.broadcast()
+
+class Server:
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.width = width
+        self.height = height
+        self.rooms = {}
+        self.connections = 0
+        self.ticks = 0  # 已关闭房间累计的tick数和落后丢弃的次数
+        self.late_ticks = 0
+
+    def join(self, name, speed, writer):
+        room = self.rooms.get(name)
+        if room is None:
+            room = self.rooms[name] = Room(name, speed, self.width, self.height)
+        if len(room.players) >= MAX_PLAYERS:
+            return room, None
+        player = room.add_player(writer)
+        if room.task is None or room.task.done():
+            room.task = asyncio.create_task(room.run())
+        return room, player
+
+    async def handle(self, reader, writer):
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER_HIGH)
+        self.connections += 1
+        room = player = None
+        writer_task = None
+        try:
+            payload = await read_frame(reader)
+            if len(payload) < 2 or payload[:1] != b'J':
+                return
+            name = payload[2:].decode("utf-8")
+            room, player = self.join(name, max(1, payload[1]), writer)
+            if player is None:
+                writer.write(frame("E房间已满".encode("utf-8")))
+                await writer.drain()
+                return
+            writer_task = asyncio.create_task(player.write_loop())
+            player.send(b'W' + WELCOME.pack(player.slot, room.width, room.height, room.speed))
+            while True:
+                payload = await read_frame(reader)
+                kind = payload[:1]
+                if kind == b'T' and len(payload) >= 2 and player.snake is not None:
+                    direction = CODE_DIRECTIONS.get(payload[1])
+                    if direction is not None:
+                        player.inputs.push(direction, player.snake.direction)
+                elif kind == b'R':
+                    # 两个tick之间的加入/离开还没有广播，不能直接用当前棋盘回复
+                    player.verify_requested = True
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+        finally:
+            self.connections -= 1
+            if player is not None:
+                room.remove_player(player)
+                if not room.players and self.rooms.get(room.name) is room:
+                    del self.rooms[room.name]
+                    self.ticks += room.tick_count
+                    self.late_ticks += room.late_ticks
+            if writer_task is not None:
+                writer_task.cancel()
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        return await asyncio.start_server(self.handle, host, port)
+
+# 回环测试客户端：用增量还原棋盘，定期请求校验快照并与本地棋盘比较
+class Client:
+    def __init__(self, room="lobby", speed=10, seed=None, turn_chance=0.1):
+        self.room = room
+        self.speed = speed
+        self.rng = random.Random(seed)
+        self.turn_chance = turn_chance
+        self.board = None
+        self.slot = None
+        self.tick = 0
+        self.frames = 0
+        self.bytes = 0
+        self.snapshots = 0
+        self.verified = 0
+        self.mismatches = 0
+        self.scores = {}
+
+    async def run(self, host, port, duration, verify_interval=1.0):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(frame(b'J' + bytes([self.speed]) + self.room.encode("utf-8")))
+        loop = asyncio.get_running_loop()
+        end = loop.time() + duration
+        next_verify = loop.time() + verify_interval
+        try:
+            while loop.time() < end:
+                try:
+                    payload = await asyncio.wait_for(read_frame(reader), end - loop.time())
+                except asyncio.TimeoutError:
+                    break
+                self.handle(payload)
+                if self.board is not None and self.rng.random() < self.turn_chance:
+                    direction = self.rng.choice(DIRECTIONS)
+                    writer.write(frame(b'T' + bytes([DIRECTION_CODES[direction]])))
+                if loop.time() >= next_verify:
+                    next_verify += verify_interval
+                    writer.write(frame(b'R'))
+        finally:
+            writer.close()
+        return self
+
+    def handle(self, payload):
+        self.frames += 1
+        self.bytes += len(payload) + FRAME.size
+        kind = payload[:1]
+        if kind == b'W':
+            self.slot, width, height, _ = WELCOME.unpack_from(payload, 1)
+            self.board = bytearray(width * height)
+        elif kind == b'S':
+            self.tick, cells = decode_cells(payload)
+            self.board[:] = bytes(len(self.board))
+            for cell, value in cells:
+                self.board[cell] = value
+            self.snapshots += 1
+        elif kind == b'D':
+            self.tick, cells = decode_cells(payload)
+            for cell, value in cells:
+                self.board[cell] = value
+        elif kind == b'V':
+            _, cells = decode_cells(payload)
+            expected = bytearray(len(self.board))
+            for cell, value in cells:
+                expected[cell] = value
+            self.verified += 1
+            self.mismatches += expected != self.board
+        elif kind == b'P':
+            count = payload[1]
+            for i in range(count):
+                slot, score, alive = PLAYER_SCORE.unpack_from(payload, 2 + i * PLAYER_SCORE.size)
+                self.scores[slot] = score
+        elif kind == b'E':
+            raise ConnectionError(payload[1:].decode("utf-8"))
+
+# 负载生成：rooms个房间，每个房间players个客户端，运行duration秒后汇总
+async def load_test(host, port, rooms, players, duration, speed):
+    clients = [Client(room=f"room-{r}", speed=speed, seed=r * MAX_PLAYERS + p)
+               for r in range(rooms) for p in range(players)]
+    start = time.perf_counter()
+    results = await asyncio.gather(*(client.run(host, port, duration) for client in clients),
+                                   return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    ok = [c for c in results if isinstance(c, Client)]
+    errors = [e for e in results if not isinstance(e, Client)]
+    total_bytes = sum(c.bytes for c in ok)
+    print(f"{rooms}个房间 x {players}名玩家, {elapsed:.1f}s: 客户端 {len(ok)} 成功 / {len(errors)} 失败")
+    print(f"  接收 {sum(c.frames for c in ok)} 帧, {total_bytes / 1024:.0f} KiB "
+          f"({total_bytes / max(1, len(ok)) / elapsed:.0f} B/s 每客户端), "
+          f"完整快照 {sum(c.snapshots for c in ok)}")
+    print(f"  校验 {sum(c.verified for c in ok)} 次, 不一致 {sum(c.mismatches for c in ok)} 次")
+    for error in errors[:3]:
+        print(f"  错误: {error!r}")
+    return not errors and not any(c.mismatches for c in ok)
+
+async def serve_forever(host, port):
+    server = Server()
+    listener = await server.serve(host, port)
+    print(f"服务器已启动: {host}:{port}")
+    async with listener:
+        await listener.serve_forever()
+
+async def load_local(args):
+    server = Server()
+    listener = await server.serve(args.host, args.port)
+    port = listener.sockets[0].getsockname()[1]
+    loop = asyncio.get_running_loop()
+    cpu_start = time.process_time()
+    wall_start = loop.time()
+    try:
+        ok = await load_test(args.host, port, args.rooms, args.players, args.duration, args.speed)
+    finally:
+        listener.close()
+    cpu = time.process_time() - cpu_start
+    print(f"  房间共推进 {server.ticks} 个tick, 落后丢弃 {server.late_ticks} 次")
+    print(f"  进程CPU占用 {cpu / (loop.time() - wall_start):.0%}（服务器与客户端在同一进程）")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="贪食蛇联机服务器")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="启动服务器")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    load = sub.add_parser("load", help="负载测试；不指定--port时在本进程内启动服务器")
+    load.add_argument("--host", default="127.0.0.1")
+    load.add_argument("--port", type=int, default=None)
+    load.add_argument("--rooms", type=int, default=100)
+    load.add_argument("--players", type=int, default=2)
+    load.add_argument("--duration", type=float, default=10.0)
+    load.add_argument("--speed", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        asyncio.run(serve_forever(args.host, args.port))
+        return 0
+    if args.port is None:
+        args.port = 0
+        ok = asyncio.run(load_local(args))
+    else:
+        ok = asyncio.run(load_test(args.host, args.port, args.rooms, args.players,
+                                   args.duration, args.speed))
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
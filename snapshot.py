@@ -0,0 +1,211 @@
+import os
+import sys
+import random
+import struct
+from array import array
+from engine import Engine, FoodType, DeathCause
+from replay import DIRECTION_CODES, CODE_DIRECTIONS
+
+# 引擎状态快照（小端），用于关闭窗口时挂起/恢复，以及前瞻搜索时快速复制局面
+#   文件头: 见HEADER各字段
+#   随机数状态: 624个u32（梅森旋转状态字）
+#   蛇身: body_count个i32格子索引，从头到尾
+#   障碍物: obstacle_count个i32格子索引，按生成顺序
+# 序列化只做整块的struct/array拷贝，反序列化的循环只与蛇长和障碍物数量有关
+MAGIC = b'SNKS'
+VERSION = 1
+HEADER = struct.Struct(
+    '<4sBB'    # 魔数, 版本, 标志位
+    'HHQ'      # 棋盘宽, 棋盘高, 种子
+    'BHB'      # 难度速度, 当前速度, 方向编码
+    'IIHHI'    # 目标长度, 分数, 成长点数, 等级, tick数
+    'BiiB'     # 死因, 食物x, 食物y（无食物时为-1）, 食物类型
+    'Bdd'      # 障碍物频率, 特殊食物概率, 随机数gauss_next
+    'I4I'      # 随机数状态下标, 各类食物吃掉的数量
+    'II'       # 蛇身节数, 障碍物数
+)
+RNG_WORDS = 624
+
+FLAG_PAUSED = 1
+FLAG_WALL_PASS = 2
+FLAG_GAME_OVER = 4
+FLAG_GAUSS = 8
+
+SAVE_PATH = "savegame.snks"
+
+def to_le(values):
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def from_le(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+def dumps(engine, paused=False):
+    snake = engine.snake
+    body = snake.body.cell_array()
+    obstacles = engine.obstacles.cells
+    _, rng_state, gauss = engine.rng.getstate()
+    flags = ((FLAG_PAUSED if paused else 0) | (FLAG_WALL_PASS if snake.wall_pass else 0)
+             | (FLAG_GAME_OVER if engine.game_over else 0) | (FLAG_GAUSS if gauss is not None else 0))
+    food = engine.food.position or (-1, -1)
+    header = HEADER.pack(
+        MAGIC, VERSION, flags,
+        engine.width, engine.height, engine.seed,
+        engine.difficulty_speed, snake.speed, DIRECTION_CODES[snake.direction],
+        snake.length, snake.score, snake.growth_points, engine.level, engine.ticks,
+        engine.death_cause.value if engine.death_cause else 0, food[0], food[1],
+        engine.food.type.value,
+        engine.obstacle_frequency, engine.special_food_chance, gauss or 0.0,
+        rng_state[RNG_WORDS], *(engine.foods_eaten[food_type] for food_type in FoodType),
+        len(body), len(obstacles),
+    )
+    return b''.join((header, to_le(array('I', rng_state[:RNG_WORDS])),
+                     to_le(body), to_le(obstacles)))
+
+# 格子索引都在棋盘范围内
+def check_cells(cells, size, what):
+    if cells and (min(cells) < 0 or max(cells) >= size):
+        raise ValueError(f"存档中的{what}超出棋盘范围")
+
+# 返回 (引擎, 是否暂停)；数据不完整、越界或格子重叠时抛出ValueError
+# 新引擎的空闲格子索引共享模板数组，蛇身缓冲区按蛇长分配，耗时只与蛇长和障碍物数量有关
+def loads(data):
+    if len(data) < HEADER.size:
+        raise ValueError("存档数据不完整")
+    fields = HEADER.unpack_from(data, 0)
+    (magic, version, flags, width, height, seed, difficulty_speed, speed, direction,
+     length, score, growth_points, level, ticks, death_cause, food_x, food_y, food_type,
+     obstacle_frequency, special_food_chance, gauss, rng_index) = fields[:22]
+    foods_eaten = fields[22:26]
+    body_count, obstacle_count = fields[26:]
+    if magic != MAGIC:
+        raise ValueError("不是有效的存档文件")
+    if version != VERSION:
+        raise ValueError(f"不支持的存档版本: {version}")
+    if len(data) != HEADER.size + (RNG_WORDS + body_count + obstacle_count) * 4:
+        raise ValueError("存档数据长度与蛇身、障碍物数量不符")
+    size = width * height
+    if not 0 < body_count <= size or direction not in CODE_DIRECTIONS:
+        raise ValueError("存档数据无效")
+
+    offset = HEADER.size
+    rng_words = from_le('I', data[offset:offset + RNG_WORDS * 4])
+    offset += RNG_WORDS * 4
+    body = from_le('i', data[offset:offset + body_count * 4])
+    offset += body_count * 4
+    obstacles = from_le('i', data[offset:offset + obstacle_count * 4])
+    check_cells(body, size, "蛇身")
+    check_cells(obstacles, size, "障碍物")
+    if food_x >= 0 and not (food_x < width and 0 <= food_y < height):
+        raise ValueError("存档中的食物超出棋盘范围")
+    # 蛇身各节、障碍物和食物必须各占一个不同的格子，否则空闲格子索引会被破坏
+    taken = set(body)
+    taken.update(obstacles)
+    expected = body_count + obstacle_count
+    if food_x >= 0:
+        taken.add(food_y * width + food_x)
+        expected += 1
+    if len(taken) != expected:
+        raise ValueError("存档中的蛇身、障碍物和食物有重叠的格子")
+
+    engine = Engine(speed=difficulty_speed, seed=seed, width=width, height=height)
+    engine.rng.setstate((3, tuple(rng_words) + (rng_index,),
+                         gauss if flags & FLAG_GAUSS else None))
+    # 撤掉构造时放下的初始蛇头和食物，再按存档占用格子
+    # 空闲格子索引的内部顺序与存档前不同，因此恢复后的食物位置
+    # 与不中断的对局不逐tick相同（需要完全一致时用clone）
+    free = engine.free
+    engine.snake.body.clear()
+    x, y = engine.food.position
+    free.add(y * width + x)
+
+    layer = engine.obstacles
+    layer.cells = obstacles
+    for cell in obstacles:
+        layer.blocked[cell >> 3] |= 1 << (cell & 7)
+        free.discard(cell)
+
+    snake = engine.snake
+    snake_body = snake.body
+    snake_body.cells = body
+    snake_body.capacity = body_count
+    snake_body.head_slot = 0
+    snake_body.size = body_count
+    occupied = snake_body.occupied
+    for cell in body:
+        occupied[cell >> 3] |= 1 << (cell & 7)
+        free.discard(cell)
+    snake.length = length
+    snake.score = score
+    snake.speed = speed
+    snake.direction = CODE_DIRECTIONS[direction]
+    snake.wall_pass = bool(flags & FLAG_WALL_PASS)
+    snake.growth_points = growth_points
+
+    food = engine.food
+    if food_x < 0:
+        food.position = None
+    else:
+        food.position = (food_x, food_y)
+        free.discard(food_y * width + food_x)
+    food.type = FoodType(food_type)
+
+    engine.level = level
+    engine.ticks = ticks
+    engine.game_over = bool(flags & FLAG_GAME_OVER)
+    engine.death_cause = DeathCause(death_cause) if death_cause else None
+    engine.obstacle_frequency = obstacle_frequency
+    engine.special_food_chance = special_food_chance
+    engine.foods_eaten = dict(zip(FoodType, foods_eaten))
+    return engine, bool(flags & FLAG_PAUSED)
+
+def save(path, engine, paused=False):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(dumps(engine, paused))
+    os.replace(tmp_path, path)
+
+def load(path):
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+def shallow(obj):
+    new = object.__new__(type(obj))
+    new.__dict__ = obj.__dict__.copy()
+    return new
+
+# 内存中复制引擎（不经过序列化），用于前瞻搜索；不复制录像记录器
+# 空闲格子索引和障碍物层写时复制，蛇身缓冲区只复制蛇长大小，只有蛇身占用位图（每格1位）整块拷贝
+def clone(engine):
+    new = shallow(engine)
+    new.recorder = None
+    new.rng = random.Random()
+    new.rng.setstate(engine.rng.getstate())
+    new.foods_eaten = dict(engine.foods_eaten)
+
+    free = new.free = engine.free.fork()
+
+    layer = new.obstacles = engine.obstacles.fork(free)
+
+    snake = new.snake = shallow(engine.snake)
+    snake.rng = new.rng
+    snake.obstacles = layer
+    body = snake.body = shallow(engine.snake.body)
+    body.cells = engine.snake.body.cell_array()
+    body.capacity = body.size
+    body.head_slot = 0
+    body.occupied = bytearray(engine.snake.body.occupied)
+    body.free = free
+    snake.positions = shallow(engine.snake.positions)
+    snake.positions.body = body
+
+    food = new.food = shallow(engine.food)
+    food.rng = new.rng
+    food.free = free
+    return new
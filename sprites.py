@@ -0,0 +1,77 @@
+import pygame
+
+# NumPy是可选依赖，只有大量格子时的位图绘制路径需要
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 可见格子数达到这个数量时改用位图路径，绘制耗时只与视口大小有关
+BITMAP_MIN_CELLS = 1024
+
+# 每种颜色一块预渲染的格子贴图
+class TileSet:
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.tiles = {}
+
+    def get(self, color):
+        tile = self.tiles.get(color)
+        if tile is None:
+            tile = pygame.Surface((self.cell_size, self.cell_size)).convert()
+            tile.fill(color)
+            self.tiles[color] = tile
+        return tile
+
+    def preload(self, colors):
+        for color in colors:
+            self.get(color)
+
+# 批量绘制格子：少量格子用一次Surface.blits提交所有贴图，
+# 大量格子时把占用位图经surfarray写入格子分辨率的缓冲区，再整体放大后一次blit
+class SpriteRenderer:
+    def __init__(self, cell_size, use_numpy=None):
+        self.tiles = TileSet(cell_size)
+        self.use_numpy = np is not None and (use_numpy is None or use_numpy)
+        self.mask = None    # 格子分辨率的缓冲区，每格一个像素
+        self.scaled = None  # 放大到像素分辨率的缓冲区，透明色以外的像素为格子
+
+    @property
+    def cell_size(self):
+        return self.tiles.cell_size
+
+    def prefers_bitmap(self, count):
+        return self.use_numpy and count >= BITMAP_MIN_CELLS
+
+    # cells为棋盘坐标，origin为surface左上角对应的棋盘坐标
+    def draw_cells(self, surface, cells, color, origin=(0, 0)):
+        tile = self.tiles.get(color)
+        size = self.cell_size
+        ox, oy = origin
+        surface.blits([(tile, ((x - ox) * size, (y - oy) * size)) for x, y in cells], False)
+
+    # bitmap为按行打包的每格1位位图（棋盘宽width），只绘制bounds范围 [x0, x1) x [y0, y1) 内的格子
+    def draw_bitmap(self, surface, bitmap, width, bounds, color, origin=(0, 0)):
+        x0, y0, x1, y1 = bounds
+        columns, rows = x1 - x0, y1 - y0
+        if columns <= 0 or rows <= 0:
+            return
+        # 只解包bounds所在的行
+        start = y0 * width
+        first = start >> 3
+        last = (y1 * width + 7) >> 3
+        bits = np.unpackbits(np.frombuffer(bitmap, np.uint8, last - first, first), bitorder='little')
+        offset = start - (first << 3)
+        grid = bits[offset:offset + rows * width].reshape(rows, width)[:, x0:x1]
+
+        size = self.cell_size
+        if self.mask is None or self.mask.get_size() != (columns, rows):
+            self.mask = pygame.Surface((columns, rows), 0, 32)
+            self.scaled = pygame.Surface((columns * size, rows * size), 0, self.mask)
+        key = tuple(255 - c for c in color[:3])  # 与格子颜色一定不同的透明色
+        pixels = pygame.surfarray.pixels2d(self.mask)
+        pixels[...] = np.where(grid.T, self.mask.map_rgb(color), self.mask.map_rgb(key))
+        del pixels  # 释放对Surface的锁定
+        pygame.transform.scale(self.mask, self.scaled.get_size(), self.scaled)
+        self.scaled.set_colorkey(key)
+        surface.blit(self.scaled, ((x0 - origin[0]) * size, (y0 - origin[1]) * size))
@@ -0,0 +1,71 @@
+import pytest
+from body import SnakeBody, PositionsView, INITIAL_CAPACITY
+from free_cells import FreeCellIndex
+
+def occupied_cells(body):
+    return {cell for cell in range(body.width * body.height) if body.is_occupied(cell)}
+
+def test_push_pop_and_order():
+    body = SnakeBody(10, 8)
+    for cell in (5, 6, 7):
+        body.push_head(cell)
+    assert len(body) == 3
+    assert body.head() == 7 and body.tail() == 5
+    assert list(body.iter_cells()) == [7, 6, 5]
+    assert [body.cell_at(i) for i in range(3)] == [7, 6, 5]
+    assert body.cell_at(-1) == 5
+    with pytest.raises(IndexError):
+        body.cell_at(3)
+    assert body.pop_tail() == 5
+    assert list(body.iter_cells()) == [7, 6]
+    assert occupied_cells(body) == {6, 7}
+
+def test_ring_wraps_and_grows():
+    body = SnakeBody(20, 20)
+    expected = []
+    # 先在容量内来回移动，让缓冲区绕回，再增长到超过初始容量
+    for cell in range(INITIAL_CAPACITY):
+        body.push_head(cell)
+        expected.insert(0, cell)
+    for cell in range(INITIAL_CAPACITY, INITIAL_CAPACITY + 5):
+        body.pop_tail()
+        expected.pop()
+        body.push_head(cell)
+        expected.insert(0, cell)
+    for cell in range(100, 150):
+        body.push_head(cell)
+        expected.insert(0, cell)
+        assert list(body.iter_cells()) == expected
+        assert list(body.cell_array()) == expected
+    assert body.capacity >= len(body) > INITIAL_CAPACITY
+    assert occupied_cells(body) == set(expected)
+
+def test_grow_stops_at_board_size():
+    body = SnakeBody(3, 3)
+    for cell in range(9):
+        body.push_head(cell)
+    assert body.capacity == 9
+    with pytest.raises(OverflowError):
+        body.push_head(0)
+
+def test_clear_and_free_index():
+    free = FreeCellIndex(64)
+    body = SnakeBody(8, 8, free=free)
+    for cell in (10, 11, 12, 20):
+        body.push_head(cell)
+    assert len(free) == 60 and 11 not in free
+    body.pop_tail()
+    assert 10 in free
+    body.clear()
+    assert len(body) == 0 and len(free) == 64
+    assert occupied_cells(body) == set()
+
+def test_positions_view():
+    body = SnakeBody(10, 10)
+    for cell in (0, 1, 11):
+        body.push_head(cell)
+    view = PositionsView(body)
+    assert list(view) == [(1, 1), (1, 0), (0, 0)]
+    assert view[0] == (1, 1) and view[-1] == (0, 0)
+    assert view[1:] == [(1, 0), (0, 0)]
+    assert (1, 0) in view and (5, 5) not in view
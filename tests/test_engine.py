@@ -0,0 +1,130 @@
+import random
+import snapshot
+from engine import Engine, EventType, FoodType, DeathCause, UP, DOWN, LEFT, RIGHT, DIRECTIONS
+from controllers import BotController
+
+def place_food(engine, position, food_type=FoodType.NORMAL):
+    food = engine.food
+    if food.position is not None:
+        x, y = food.position
+        engine.free.add(y * engine.width + x)
+    x, y = position
+    engine.free.discard(y * engine.width + x)
+    food.position = position
+    food.type = food_type
+
+def event_types(events):
+    return [event.type for event in events]
+
+def test_initial_state():
+    engine = Engine(speed=5, seed=1, width=10, height=8)
+    assert engine.snake.get_head_position() == (5, 4)
+    assert len(engine.snake.body) == 1 and engine.snake.length == 1
+    assert engine.food.position != (5, 4)
+    assert len(engine.free) == 10 * 8 - 2
+
+def test_wall_kills_without_wall_pass():
+    engine = Engine(seed=1, width=10, height=8)
+    engine.snake.direction = LEFT
+    place_food(engine, (9, 7))
+    events = []
+    while not engine.game_over:
+        events = engine.step()
+    assert engine.death_cause == DeathCause.WALL
+    assert event_types(events) == [EventType.GAME_OVER]
+    assert engine.ticks == 6
+
+def test_reverse_turn_is_ignored():
+    engine = Engine(seed=1, width=10, height=8)
+    engine.snake.direction = RIGHT
+    place_food(engine, (0, 0))
+    engine.step(LEFT)
+    assert engine.snake.direction == RIGHT
+    assert engine.snake.get_head_position() == (6, 4)
+    engine.step(UP)
+    assert engine.snake.get_head_position() == (6, 3)
+
+def test_eating_grows_and_scores():
+    engine = Engine(seed=1, width=10, height=8)
+    engine.snake.direction = RIGHT
+    place_food(engine, (6, 4))
+    events = engine.step()
+    assert event_types(events) == [EventType.FOOD_EATEN]
+    assert engine.snake.score == 10 and engine.snake.length == 2
+    assert engine.foods_eaten[FoodType.NORMAL] == 1
+    assert engine.food.position not in engine.snake.positions
+    engine.step()
+    assert len(engine.snake.body) == 2
+
+def test_special_foods():
+    engine = Engine(speed=5, seed=1, width=10, height=8)
+    engine.snake.direction = RIGHT
+    place_food(engine, (6, 4), FoodType.SPEED_UP)
+    engine.step()
+    assert engine.snake.speed == 7
+    place_food(engine, (7, 4), FoodType.SPEED_DOWN)
+    engine.step()
+    assert engine.snake.speed == 5
+    place_food(engine, (8, 4), FoodType.WALL_PASS)
+    engine.step()
+    assert engine.snake.wall_pass
+    engine.step()
+    engine.step()
+    # 穿墙后从左侧出现
+    assert not engine.game_over
+    assert engine.snake.get_head_position() == (0, 4)
+
+def test_self_collision_and_tail_following():
+    engine = Engine(seed=1, width=10, height=8)
+    engine.snake.direction = RIGHT
+    place_food(engine, (0, 0))
+    engine.snake.length = 4
+    for action in (RIGHT, DOWN, LEFT):
+        engine.step(action)
+    # 长度为4时绕一圈正好追着尾巴走
+    engine.step(UP)
+    assert not engine.game_over
+    engine.snake.length = 6
+    engine.step(RIGHT)
+    engine.step(DOWN)
+    engine.step(LEFT)
+    assert engine.game_over and engine.death_cause == DeathCause.SELF
+
+def test_level_up_and_obstacles():
+    engine = Engine(speed=10, seed=4, width=12, height=12)
+    obstacle_frequency = engine.obstacle_frequency
+    bot = BotController()
+    levels = []
+    obstacles = []
+    while not engine.game_over and engine.level <= obstacle_frequency:
+        events = engine.step(bot.next_action(engine))
+        levels += [event.data for event in events if event.type == EventType.LEVEL_UP]
+        obstacles += [event.data for event in events if event.type == EventType.OBSTACLE_ADDED]
+    assert levels == list(range(2, engine.level + 1))
+    assert sum(engine.foods_eaten.values()) >= (engine.level - 1) * 5
+    assert len(obstacles) == len(engine.obstacles) == 1
+
+def play(engine, ticks=500):
+    bot = BotController()
+    while not engine.game_over and engine.ticks < ticks:
+        engine.step(bot.next_action(engine))
+
+def play_actions(engine, actions):
+    for action in actions:
+        if engine.game_over:
+            break
+        engine.step(action)
+
+def test_reset_matches_fresh_engine():
+    rng = random.Random(5)
+    actions = [rng.choice(DIRECTIONS + [None] * 4) for _ in range(300)]
+    engine = Engine(speed=5, seed=1, width=15, height=12)
+    play(engine)
+    for speed, seed in ((5, 7), (10, 8), (7, 9)):
+        engine.reset(speed=speed, seed=seed)
+        fresh = Engine(speed=speed, seed=seed, width=15, height=12)
+        assert snapshot.dumps(engine) == snapshot.dumps(fresh)
+        play_actions(engine, actions)
+        play_actions(fresh, actions)
+        assert snapshot.dumps(engine) == snapshot.dumps(fresh)
+        assert engine.foods_eaten == fresh.foods_eaten
@@ -0,0 +1,73 @@
+import random
+from free_cells import FreeCellIndex, FORK_CHANGES_LIMIT
+
+# 用集合作为参照模型，对比随机操作序列下的行为
+def check(index, model):
+    assert len(index) == len(model)
+    for cell in range(index.size):
+        assert (cell in index) == (cell in model)
+    assert {index.cell_at(slot) for slot in range(len(index))} == model
+    for cell in model:
+        assert index.cell_at(index.slot_of(cell)) == cell
+
+def mutate(rng, index, model, steps):
+    for _ in range(steps):
+        cell = rng.randrange(index.size)
+        if rng.random() < 0.5:
+            index.discard(cell)
+            model.discard(cell)
+        else:
+            index.add(cell)
+            model.add(cell)
+
+def test_matches_set_model_across_unshare():
+    rng = random.Random(0)
+    index = FreeCellIndex(400)
+    model = set(range(400))
+    check(index, model)
+    assert index.changed_slots is not None  # 新建时共享模板
+    mutate(rng, index, model, 200)
+    assert index.changed_slots is None  # 改动超过阈值后复制出自己的数组
+    check(index, model)
+
+def test_fork_is_independent():
+    rng = random.Random(1)
+    index = FreeCellIndex(300)
+    model = set(range(300))
+    mutate(rng, index, model, 10)
+    children = []
+    for _ in range(4):
+        child = index.fork()
+        child_model = set(model)
+        mutate(rng, child, child_model, rng.choice((5, 50, 500)))
+        children.append((child, child_model))
+        mutate(rng, index, model, 7)
+    check(index, model)
+    for child, child_model in children:
+        check(child, child_model)
+
+def test_fork_of_large_overlay_unshares_first():
+    size = (FORK_CHANGES_LIMIT + 1) * 32
+    index = FreeCellIndex(size)
+    for cell in range(0, 2 * FORK_CHANGES_LIMIT + 2, 2):
+        index.discard(cell)
+    assert index.changed_slots is not None and len(index.changed_slots) > FORK_CHANGES_LIMIT
+    child = index.fork()
+    assert index.changed_slots == {} and child.changed_slots == {}
+    child.add(0)
+    assert 0 in child and 0 not in index
+
+def test_reset_and_sample():
+    rng = random.Random(2)
+    index = FreeCellIndex(50)
+    for cell in range(50):
+        if cell != 17:
+            index.discard(cell)
+    assert len(index) == 1
+    assert index.sample(rng) == 17
+    index.discard(17)
+    assert index.sample(rng) is None
+    index.reset()
+    check(index, set(range(50)))
+    # 均匀抽样：每个格子都能抽到
+    assert {index.sample(rng) for _ in range(2000)} == set(range(50))
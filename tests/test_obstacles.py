@@ -0,0 +1,60 @@
+import random
+from collections import deque
+from free_cells import FreeCellIndex
+from obstacles import ObstacleLayer
+
+# 非障碍格子是否全部连通（四方向）
+def connected(layer):
+    open_cells = [cell for cell in range(layer.width * layer.height) if not layer.is_blocked(cell)]
+    if not open_cells:
+        return True
+    seen = {open_cells[0]}
+    queue = deque([open_cells[0]])
+    while queue:
+        for neighbor in layer.open_neighbors(queue.popleft()):
+            if neighbor not in seen:
+                seen.add(neighbor)
+                queue.append(neighbor)
+    return len(seen) == len(open_cells)
+
+def test_random_obstacles_keep_board_connected():
+    for seed in range(5):
+        rng = random.Random(seed)
+        free = FreeCellIndex(12 * 9)
+        layer = ObstacleLayer(12, 9, free=free)
+        placed = layer.generate(rng, 60)
+        assert len(placed) > 20
+        assert connected(layer)
+        assert len(free) == 12 * 9 - len(layer)
+        for x, y in placed:
+            assert (x, y) in layer and y * 12 + x not in free
+
+def test_keeps_connected_detects_cuts():
+    layer = ObstacleLayer(5, 5, free=FreeCellIndex(25))
+    # 竖着的一列只留中间一格，堵上它会把棋盘分成两半
+    for y in (0, 1, 3, 4):
+        layer.add(y * 5 + 2)
+    assert not layer.keeps_connected(2 * 5 + 2)
+    assert layer.keeps_connected(0)
+
+def test_avoid_and_clear():
+    rng = random.Random(3)
+    free = FreeCellIndex(16)
+    layer = ObstacleLayer(4, 4, free=free)
+    avoid = set(range(16)) - {5}
+    assert layer.place_random(rng, avoid=avoid, attempts=200) == (1, 1)
+    layer.clear()
+    assert len(layer) == 0 and len(free) == 16 and not layer.is_blocked(5)
+
+def test_fork_copy_on_write():
+    free = FreeCellIndex(100)
+    layer = ObstacleLayer(10, 10, free=free)
+    layer.add(11)
+    child_free = free.fork()
+    child = layer.fork(child_free)
+    child.add(22)
+    assert child.is_blocked(22) and not layer.is_blocked(22)
+    assert 22 in free and 22 not in child_free
+    layer.add(33)
+    assert not child.is_blocked(33)
+    assert list(layer.cells) == [11, 33] and list(child.cells) == [11, 22]
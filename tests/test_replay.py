@@ -0,0 +1,54 @@
+import os
+import time
+from engine import Engine, UP, DOWN, LEFT, RIGHT
+from controllers import BotController, RandomController, play
+from replay import Replay, ReplayRecorder, ReplayWriter, simulate, verify
+
+def recorded_game(seed, controller, width=10, height=8, speed=5):
+    engine = Engine(speed=speed, seed=seed, width=width, height=height)
+    recorder = ReplayRecorder(engine)
+    engine.recorder = recorder
+    play(engine, controller, max_ticks=50000)
+    return engine, recorder.finish(engine)
+
+def test_bytes_round_trip():
+    replay = Replay(123, 7, 30, 20, [(0, UP), (5, LEFT), (300, DOWN), (301, RIGHT)],
+                    score=40, level=2, ticks=400)
+    loaded = Replay.from_bytes(replay.to_bytes())
+    assert vars(loaded) == vars(replay)
+
+def test_recorded_games_verify():
+    for seed in range(3):
+        for controller in (BotController(), RandomController(seed=seed)):
+            engine, replay = recorded_game(seed, controller)
+            assert engine.game_over
+            ok, result = verify(Replay.from_bytes(replay.to_bytes()))
+            assert ok
+            assert list(result.snake.body.iter_cells()) == list(engine.snake.body.iter_cells())
+
+def test_tampered_replay_fails_verify():
+    _, replay = recorded_game(1, BotController())
+    replay.score += 10
+    assert not verify(replay)[0]
+    replay.score -= 10
+    replay.turns = replay.turns[1:]
+    assert not verify(replay)[0]
+
+def test_simulate_stops_at_max_ticks():
+    _, replay = recorded_game(2, BotController())
+    engine = simulate(replay, max_ticks=10)
+    assert engine.ticks == 10
+
+def test_writer_keeps_newest(tmp_path):
+    writer = ReplayWriter(str(tmp_path), keep=3)
+    for seed in range(5):
+        _, replay = recorded_game(seed, RandomController(seed=seed))
+        path = writer.submit(replay)
+        writer.flush()
+        # 让各文件的修改时间有先后，且都早于下一个写入的文件
+        stamp = time.time() - 100 + seed
+        os.utime(path, (stamp, stamp))
+    writer.close()
+    names = sorted(os.listdir(tmp_path))
+    assert len(names) == 3
+    assert [int(name.rsplit("-", 1)[1].split(".")[0]) for name in names] == [2, 3, 4]
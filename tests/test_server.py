@@ -0,0 +1,93 @@
+import random
+from engine import UP, DOWN, LEFT, RIGHT, DIRECTIONS
+from server import Room
+
+def make_room(players=2, width=10, height=10, seed=0):
+    room = Room("test", speed=5, width=width, height=height, seed=seed)
+    for _ in range(players):
+        room.add_player(None)
+    return room
+
+# 去掉食物，避免吃到食物改变蛇长和速度
+def remove_foods(room):
+    for food in room.foods:
+        if food.position is not None:
+            room.release(food.position)
+    room.foods = []
+
+# cells从头到尾
+def place(room, player, cells, direction, speed):
+    snake = player.snake
+    snake.body.clear()
+    for x, y in reversed(cells):
+        snake.body.push_head(y * room.width + x)
+    for other in room.players.values():
+        if other is not player and other.snake is not None:
+            for cell in other.snake.body.iter_cells():
+                room.free.discard(cell)
+    snake.length = len(cells)
+    snake.direction = direction
+    snake.speed = speed
+    player.credit = 0.0
+
+# 空闲索引恰好是没有被蛇、障碍物和食物占据的格子
+def assert_free_index(room):
+    taken = set(room.obstacles.cells)
+    for player in room.players.values():
+        if player.snake is not None:
+            taken.update(player.snake.body.iter_cells())
+    for food in room.foods:
+        if food.position is not None:
+            taken.add(room.pack(food.position))
+    for cell in range(room.width * room.height):
+        assert (cell in room.free) == (cell not in taken), cell
+    assert len(room.free) == room.width * room.height - len(taken)
+
+def test_fast_snake_cannot_pass_through_body():
+    room = make_room()
+    remove_foods(room)
+    fast, slow = room.players[0], room.players[1]
+    place(room, fast, [(2, 5)], RIGHT, speed=10)
+    place(room, slow, [(3, 4), (3, 5), (3, 6)], UP, speed=5)
+    room.tick()
+    # 第一步进入(3, 5)时那里仍是慢蛇的身体
+    assert fast.snake is None
+    assert slow.snake is not None
+    assert_free_index(room)
+
+def test_fast_snake_may_follow_vacated_tail():
+    room = make_room()
+    remove_foods(room)
+    fast, slow = room.players[0], room.players[1]
+    place(room, fast, [(2, 5)], RIGHT, speed=10)
+    place(room, slow, [(3, 3), (3, 4), (3, 5)], UP, speed=5)
+    room.tick()
+    # 慢蛇在同一轮让出尾巴，快蛇经过(3, 5)后停在(4, 5)
+    assert fast.snake is not None and fast.snake.get_head_position() == (4, 5)
+    assert slow.snake is not None
+    assert_free_index(room)
+
+def test_head_on_collision_kills_both():
+    room = make_room()
+    remove_foods(room)
+    left, right = room.players[0], room.players[1]
+    place(room, left, [(2, 5)], RIGHT, speed=5)
+    place(room, right, [(4, 5)], LEFT, speed=5)
+    room.tick()
+    assert left.snake is None and right.snake is None
+    assert_free_index(room)
+
+def test_free_index_stays_consistent_with_mixed_speeds():
+    rng = random.Random(1)
+    room = make_room(players=6, width=12, height=12, seed=1)
+    for tick in range(2000):
+        for player in room.players.values():
+            snake = player.snake
+            if snake is None:
+                continue
+            if tick % 50 == 0:
+                snake.speed = rng.choice((5, 7, 10))
+            if rng.random() < 0.3:
+                player.inputs.push(rng.choice(DIRECTIONS), snake.direction)
+        room.tick()
+        assert_free_index(room)
@@ -0,0 +1,95 @@
+import struct
+import pytest
+import snapshot
+from engine import Engine
+from controllers import BotController, play
+
+BODY_OFFSET = snapshot.HEADER.size + snapshot.RNG_WORDS * 4
+
+def played_engine(ticks=400, seed=3):
+    engine = Engine(speed=5, seed=seed, width=20, height=15)
+    play(engine, BotController(), max_ticks=ticks)
+    # 再放一个障碍物，保证存档里有障碍物段
+    engine.obstacles.place_random(engine.rng, avoid=(engine.next_head_cell(),))
+    return engine
+
+def assert_free_index(engine):
+    taken = set(engine.snake.body.iter_cells()) | set(engine.obstacles.cells)
+    if engine.food.position is not None:
+        x, y = engine.food.position
+        taken.add(y * engine.width + x)
+    for cell in range(engine.width * engine.height):
+        assert (cell in engine.free) == (cell not in taken), cell
+    assert len(engine.free) == engine.width * engine.height - len(taken)
+
+def with_body_cell(data, index, cell):
+    data = bytearray(data)
+    struct.pack_into('<i', data, BODY_OFFSET + index * 4, cell)
+    return bytes(data)
+
+def test_round_trip():
+    engine = played_engine()
+    assert len(engine.snake.body) > 2 and len(engine.obstacles) > 0
+    data = snapshot.dumps(engine, paused=True)
+    loaded, paused = snapshot.loads(data)
+    assert paused
+    assert snapshot.dumps(loaded, paused=True) == data
+    assert list(loaded.snake.body.iter_cells()) == list(engine.snake.body.iter_cells())
+    assert_free_index(loaded)
+    # 恢复后可以继续游戏，蛇身缓冲区按需扩容
+    play(loaded, BotController(), max_ticks=loaded.ticks + 200)
+    assert_free_index(loaded)
+
+def test_clone_matches_original():
+    engine = played_engine()
+    copy = snapshot.clone(engine)
+    bot_a, bot_b = BotController(), BotController()
+    for _ in range(300):
+        if engine.game_over:
+            break
+        engine.step(bot_a.next_action(engine))
+        copy.step(bot_b.next_action(copy))
+        assert list(copy.snake.body.iter_cells()) == list(engine.snake.body.iter_cells())
+        assert copy.food.position == engine.food.position
+    assert copy.snake.score == engine.snake.score
+    assert_free_index(engine)
+    assert_free_index(copy)
+
+def test_clone_does_not_touch_original():
+    engine = played_engine()
+    before = snapshot.dumps(engine)
+    copy = snapshot.clone(engine)
+    play(copy, BotController(), max_ticks=copy.ticks + 200)
+    assert snapshot.dumps(engine) == before
+    assert_free_index(engine)
+
+def test_rejects_bad_header():
+    data = snapshot.dumps(played_engine())
+    with pytest.raises(ValueError):
+        snapshot.loads(data[:10])
+    with pytest.raises(ValueError):
+        snapshot.loads(b'XXXX' + data[4:])
+    with pytest.raises(ValueError):
+        snapshot.loads(data[:4] + bytes([snapshot.VERSION + 1]) + data[5:])
+    with pytest.raises(ValueError):
+        snapshot.loads(data[:-4])
+
+def test_rejects_out_of_range_cells():
+    engine = played_engine()
+    data = snapshot.dumps(engine)
+    with pytest.raises(ValueError):
+        snapshot.loads(with_body_cell(data, 1, engine.width * engine.height))
+    with pytest.raises(ValueError):
+        snapshot.loads(with_body_cell(data, 1, -1))
+
+def test_rejects_overlapping_cells():
+    engine = played_engine()
+    data = snapshot.dumps(engine)
+    body = list(engine.snake.body.iter_cells())
+    x, y = engine.food.position
+    with pytest.raises(ValueError):
+        snapshot.loads(with_body_cell(data, 1, body[0]))
+    with pytest.raises(ValueError):
+        snapshot.loads(with_body_cell(data, 1, engine.obstacles.cells[0]))
+    with pytest.raises(ValueError):
+        snapshot.loads(with_body_cell(data, 1, y * engine.width + x))
@@ -0,0 +1,87 @@
+import pytest
+from engine import Engine, EventType, DIRECTIONS
+from controllers import BotController, RandomController
+
+np = pytest.importorskip("numpy")
+from vec_env import VecEngine, EMPTY, BODY, HEAD, OBSTACLE, FOOD_BASE
+
+# 把Engine的局面写进向量化环境的第i局，两边的随机数不同，每步之前重新同步
+def load_env(vec, i, engine):
+    snake = engine.snake
+    body = list(snake.body.iter_cells())
+    vec.cells[i] = EMPTY
+    for cell in engine.obstacles.cells:
+        vec.cells[i, cell] = OBSTACLE
+    vec.cells[i, body[1:]] = BODY
+    vec.cells[i, body[0]] = HEAD
+    vec.body[i, :len(body)] = body
+    vec.head_slot[i] = 0
+    vec.body_len[i] = len(body)
+    vec.head[i] = body[0]
+    vec.direction[i] = DIRECTIONS.index(snake.direction)
+    vec.length[i] = snake.length
+    vec.score[i] = snake.score
+    vec.speed[i] = snake.speed
+    vec.wall_pass[i] = snake.wall_pass
+    vec.level[i] = engine.level
+    vec.growth_points[i] = snake.growth_points
+    vec.ticks[i] = engine.ticks
+    x, y = engine.food.position
+    vec.food[i] = y * engine.width + x
+    vec.food_type[i] = engine.food.type.value
+    vec.cells[i, y * engine.width + x] = FOOD_BASE + engine.food.type.value
+
+def env_body(vec, i):
+    slots = (vec.head_slot[i] + np.arange(vec.body_len[i])) % vec.size
+    return vec.body[i, slots].tolist()
+
+def check_step(vec, engine, action):
+    load_env(vec, 0, engine)
+    vec_action = DIRECTIONS.index(action) if action is not None else -1
+    _, rewards, dones = vec.step(np.array([vec_action]))
+    events = engine.step(action)
+    assert bool(dones[0]) == engine.game_over
+    if engine.game_over:
+        assert vec.death_cause[0] == engine.death_cause.value
+        assert vec.final_score[0] == engine.snake.score
+        assert vec.final_level[0] == engine.level
+        assert vec.final_ticks[0] == engine.ticks
+        assert rewards[0] == -1.0
+        return
+    snake = engine.snake
+    assert env_body(vec, 0) == list(snake.body.iter_cells())
+    assert DIRECTIONS[vec.direction[0]] == snake.direction
+    assert (vec.length[0], vec.score[0], vec.speed[0], vec.level[0], vec.growth_points[0]) == \
+        (snake.length, snake.score, snake.speed, engine.level, snake.growth_points)
+    assert bool(vec.wall_pass[0]) == snake.wall_pass
+    eaten = any(event.type == EventType.FOOD_EATEN for event in events)
+    assert rewards[0] == (1.0 if eaten else 0.0)
+    # 棋盘编码与Engine的蛇身一致（食物和障碍物的新位置来自各自的随机数）
+    cells = vec.cells[0]
+    assert set(np.flatnonzero((cells == BODY) | (cells == HEAD)).tolist()) == \
+        set(snake.body.iter_cells())
+    assert cells[snake.body.head()] == HEAD
+
+@pytest.mark.parametrize("make_controller", [BotController, lambda: RandomController(seed=3)])
+def test_rules_match_engine(make_controller):
+    vec = VecEngine(1, speed=10, seed=0, width=12, height=10)
+    for seed in range(6):
+        engine = Engine(speed=10, seed=seed, width=12, height=10)
+        controller = make_controller()
+        while not engine.game_over and engine.ticks < 3000:
+            check_step(vec, engine, controller.next_action(engine))
+
+def test_done_envs_reset():
+    vec = VecEngine(8, speed=5, seed=1, width=8, height=6)
+    rng = np.random.default_rng(2)
+    finished = 0
+    for _ in range(500):
+        board, _, dones = vec.step(rng.integers(-1, 4, vec.num_envs))
+        finished += int(dones.sum())
+        for i in np.flatnonzero(dones):
+            assert vec.body_len[i] == 1 and vec.score[i] == 0 and vec.ticks[i] == 0
+        # 每局恰好一个蛇头、一份食物，蛇身格子数与记录的长度一致
+        assert ((board == HEAD).sum(axis=(1, 2)) == 1).all()
+        assert ((board > FOOD_BASE).sum(axis=(1, 2)) == 1).all()
+        assert ((board == BODY).sum(axis=(1, 2)) + 1 == vec.body_len).all()
+    assert finished == vec.episodes > 0
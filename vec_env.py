@@ -0,0 +1,264 @@
+import sys
+import time
+import argparse
+from engine import (GRID_WIDTH, GRID_HEIGHT, DIRECTIONS, FoodType, DeathCause,
+                    difficulty_settings)
+
+# NumPy是可选依赖，只有向量化环境需要
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 向量化环境：N局游戏的状态全部保存在NumPy数组中，一次step用数组运算推进所有对局
+# 规则与Engine.step一致（穿墙、自撞、障碍物、三种特殊食物、升级生成障碍物），
+# 随机数来自NumPy，因此同一种子下的对局与Engine不逐tick相同
+#
+# 棋盘编码（uint8）：
+EMPTY = 0
+BODY = 1
+HEAD = 2
+OBSTACLE = 3
+FOOD_BASE = 3  # 食物格子的值为 FOOD_BASE + FoodType.value
+
+# 动作为DIRECTIONS中的下标，-1表示保持当前方向
+NO_ACTION = -1
+
+class VecEngine:
+    def __init__(self, num_envs, speed=5, seed=None, width=GRID_WIDTH, height=GRID_HEIGHT):
+        if np is None:
+            raise RuntimeError("向量化环境需要安装NumPy: pip install numpy")
+        self.num_envs = num_envs
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.rng = np.random.default_rng(seed)
+        self.initial_speed = speed
+        self.obstacle_frequency, self.special_food_chance = difficulty_settings(speed)
+
+        self.dx = np.array([d[0] for d in DIRECTIONS], np.int64)
+        self.dy = np.array([d[1] for d in DIRECTIONS], np.int64)
+        self.reverse = np.array([DIRECTIONS.index((-d[0], -d[1])) for d in DIRECTIONS], np.int64)
+        self.special_types = np.array([FoodType.SPEED_UP.value, FoodType.SPEED_DOWN.value,
+                                       FoodType.WALL_PASS.value], np.uint8)
+        self.all_envs = np.arange(num_envs)
+
+        n = num_envs
+        # 观察值：board及其展平视图cells共享同一块内存
+        self.board = np.zeros((n, height, width), np.uint8)
+        self.cells = self.board.reshape(n, self.size)
+        # 蛇身环形缓冲区：每局一行，存放展平后的格子索引
+        self.body = np.zeros((n, self.size), np.int64)
+        self.head_slot = np.zeros(n, np.int64)
+        self.body_len = np.zeros(n, np.int64)
+        self.head = np.zeros(n, np.int64)
+        self.direction = np.zeros(n, np.int64)
+        self.length = np.zeros(n, np.int64)
+        self.food = np.zeros(n, np.int64)
+        self.food_type = np.zeros(n, np.uint8)
+        self.score = np.zeros(n, np.int64)
+        self.speed = np.zeros(n, np.int64)
+        self.wall_pass = np.zeros(n, bool)
+        self.level = np.zeros(n, np.int64)
+        self.growth_points = np.zeros(n, np.int64)
+        self.ticks = np.zeros(n, np.int64)
+        # 最近一次结束的对局结果，只对本次step中dones为True的对局有意义
+        self.death_cause = np.zeros(n, np.uint8)  # DeathCause.value，0表示未结束
+        self.final_score = np.zeros(n, np.int64)
+        self.final_level = np.zeros(n, np.int64)
+        self.final_ticks = np.zeros(n, np.int64)
+        self.episodes = 0
+        self.reset()
+
+    def reset(self):
+        self.reset_envs(self.all_envs)
+        return self.board
+
+    def reset_envs(self, envs):
+        if len(envs) == 0:
+            return
+        center = (self.height // 2) * self.width + self.width // 2
+        self.cells[envs] = EMPTY
+        self.cells[envs, center] = HEAD
+        self.body[envs, 0] = center
+        self.head_slot[envs] = 0
+        self.body_len[envs] = 1
+        self.head[envs] = center
+        self.direction[envs] = self.rng.integers(0, len(DIRECTIONS), len(envs))
+        self.length[envs] = 1
+        self.score[envs] = 0
+        self.speed[envs] = self.initial_speed
+        self.wall_pass[envs] = False
+        self.level[envs] = 1
+        self.growth_points[envs] = 0
+        self.ticks[envs] = 0
+        self.spawn_food(envs)
+
+    # actions为长度N的整数数组；返回 (棋盘观察值, 奖励, 是否结束)
+    # 结束的对局会自动重置，结束时的结果保存在final_*和death_cause中
+    def step(self, actions=None):
+        envs = self.all_envs
+        if actions is None:
+            actions = np.full(self.num_envs, NO_ACTION, np.int64)
+        actions = np.asarray(actions, np.int64)
+        # 不允许直接掉头
+        turn = (actions >= 0) & (actions != self.reverse[self.direction])
+        self.direction = np.where(turn, actions, self.direction)
+        self.ticks += 1
+
+        x = self.head % self.width + self.dx[self.direction]
+        y = self.head // self.width + self.dy[self.direction]
+        outside = (x < 0) | (x >= self.width) | (y < 0) | (y >= self.height)
+        new = (y % self.height) * self.width + x % self.width
+        target = self.cells[envs, new]
+        growing = self.body_len < self.length
+        tail_slot = (self.head_slot + self.body_len - 1) % self.size
+        tail = self.body[envs, tail_slot]
+
+        # 越界（无穿墙）、障碍物、自撞；追着尾巴走不算撞到自己
+        self.death_cause[:] = 0
+        wall = outside & ~self.wall_pass
+        obstacle = ~wall & (target == OBSTACLE)
+        hit_self = ~wall & ((target == BODY) | (target == HEAD)) & (growing | (new != tail))
+        self.death_cause[hit_self] = DeathCause.SELF.value
+        self.death_cause[obstacle] = DeathCause.OBSTACLE.value
+        self.death_cause[wall] = DeathCause.WALL.value
+        dead = wall | obstacle | hit_self
+        alive = ~dead
+
+        # 移动：旧蛇头变为蛇身，不增长时让出尾巴，再放入新蛇头
+        moving = envs[alive]
+        self.cells[moving, self.head[moving]] = BODY
+        shrinking = envs[alive & ~growing]
+        self.cells[shrinking, tail[shrinking]] = EMPTY
+        self.body_len[shrinking] -= 1
+        moved = new[moving]
+        slots = (self.head_slot[moving] - 1) % self.size
+        self.head_slot[moving] = slots
+        self.body[moving, slots] = moved
+        self.body_len[moving] += 1
+        self.head[moving] = moved
+        self.cells[moving, moved] = HEAD
+
+        rewards = np.zeros(self.num_envs, np.float32)
+        eaten = alive & (target > FOOD_BASE)
+        if eaten.any():
+            rewards[eaten] = 1.0
+            self.eat(envs[eaten], target[eaten] - FOOD_BASE)
+        board_full = self.death_cause == DeathCause.BOARD_FULL.value
+        rewards[dead] = -1.0
+
+        dones = dead | board_full
+        finished = envs[dones]
+        if len(finished):
+            self.final_score[finished] = self.score[finished]
+            self.final_level[finished] = self.level[finished]
+            self.final_ticks[finished] = self.ticks[finished]
+            self.episodes += len(finished)
+            self.reset_envs(finished)
+        return self.board, rewards, dones
+
+    def eat(self, envs, food_types):
+        self.length[envs] += 1
+        self.score[envs] += 10
+        self.speed[envs] += np.where(food_types == FoodType.SPEED_UP.value, 2, 0)
+        slower = envs[food_types == FoodType.SPEED_DOWN.value]
+        self.speed[slower] = np.maximum(5, self.speed[slower] - 2)
+        self.wall_pass[envs[food_types == FoodType.WALL_PASS.value]] = True
+        self.growth_points[envs] += 1
+
+        # 棋盘填满，本局结束
+        placed = self.spawn_food(envs)
+        self.death_cause[envs[~placed]] = DeathCause.BOARD_FULL.value
+        envs = envs[placed]
+
+        # 升级检查，并根据难度添加新的障碍物
+        leveled = envs[self.growth_points[envs] >= 5]
+        self.level[leveled] += 1
+        self.growth_points[leveled] = 0
+        spawning = leveled[self.level[leveled] % self.obstacle_frequency == 0]
+        if len(spawning):
+            self.spawn_obstacles(spawning)
+
+    # 在空格子中均匀放置食物，返回各局是否放置成功
+    def spawn_food(self, envs):
+        cells = self.sample_free(envs)
+        placed = cells >= 0
+        envs, cells = envs[placed], cells[placed]
+        special = self.rng.random(len(envs)) < self.special_food_chance
+        types = np.where(special, self.rng.choice(self.special_types, len(envs)),
+                         np.uint8(FoodType.NORMAL.value)).astype(np.uint8)
+        self.food[envs] = cells
+        self.food_type[envs] = types
+        self.cells[envs, cells] = FOOD_BASE + types
+        return placed
+
+    # 随机抽取空格子：先做几轮拒绝采样，剩下的（棋盘很满时）在全部空格中抽取；没有空格时为-1
+    def sample_free(self, envs, attempts=4):
+        result = np.full(len(envs), -1, np.int64)
+        pending = np.arange(len(envs))
+        for _ in range(attempts):
+            candidates = self.rng.integers(0, self.size, len(pending))
+            ok = self.cells[envs[pending], candidates] == EMPTY
+            result[pending[ok]] = candidates[ok]
+            pending = pending[~ok]
+            if len(pending) == 0:
+                return result
+        result[pending] = self.sample_mask(self.cells[envs[pending]] == EMPTY)
+        return result
+
+    # 每行在mask为True的位置中均匀抽取一个下标，全为False时为-1
+    def sample_mask(self, mask):
+        keys = self.rng.random(mask.shape)
+        keys[~mask] = -1.0
+        picks = keys.argmax(axis=1)
+        picks[keys[np.arange(len(picks)), picks] < 0] = -1
+        return picks
+
+    # 障碍物只放在空格子上，不放在蛇头正前方，并且周围8格的局部检查
+    # 保证放下后其余格子仍然连通（与ObstacleLayer的快速路径相同的充分条件）
+    def spawn_obstacles(self, envs):
+        grid = self.board[envs] != OBSTACLE
+        padded = np.zeros((len(envs), self.height + 2, self.width + 2), bool)
+        padded[:, 1:-1, 1:-1] = grid
+        h, w = self.height, self.width
+
+        def ring(dx, dy):
+            return padded[:, 1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+
+        ring_cells = [ring(dx, dy) for dx, dy in
+                      ((0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1))]
+        open_count = ring_cells[0].astype(np.int8) + ring_cells[2] + ring_cells[4] + ring_cells[6]
+        joins = sum((ring_cells[i] & ring_cells[i + 1] & ring_cells[(i + 2) % 8]).astype(np.int8)
+                    for i in (0, 2, 4, 6))
+        safe = (open_count - joins <= 1).reshape(len(envs), self.size)
+        mask = safe & (self.cells[envs] == EMPTY)
+        x = self.head[envs] % w + self.dx[self.direction[envs]]
+        y = self.head[envs] // w + self.dy[self.direction[envs]]
+        mask[np.arange(len(envs)), (y % h) * w + x % w] = False
+        cells = self.sample_mask(mask)
+        placed = cells >= 0
+        self.cells[envs[placed], cells[placed]] = OBSTACLE
+
+# 随机策略下的吞吐量测试
+def main():
+    parser = argparse.ArgumentParser(description="向量化贪食蛇环境吞吐量测试")
+    parser.add_argument("--envs", type=int, default=4096)
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--speed", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    env = VecEngine(args.envs, speed=args.speed, seed=args.seed)
+    actions = env.rng.integers(-1, len(DIRECTIONS), (args.steps, args.envs))
+    start = time.perf_counter()
+    for i in range(args.steps):
+        env.step(actions[i])
+    elapsed = time.perf_counter() - start
+    total = args.envs * args.steps
+    print(f"{args.envs}个环境 x {args.steps}步: {elapsed:.2f}s, "
+          f"{total / elapsed / 1e6:.2f}M步/秒, 结束 {env.episodes} 局")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+from collections import OrderedDict
+
+# 摄像机：以格子为单位的视口左上角坐标
+# 蛇头进入视口边缘的margin范围时，把视口重新对准蛇头（并限制在棋盘内）
+class Camera:
+    def __init__(self, world_width, world_height, view_width, view_height, margin=None):
+        self.world_width = world_width
+        self.world_height = world_height
+        self.view_width = view_width
+        self.view_height = view_height
+        self.margin = margin if margin is not None else min(view_width, view_height) // 5
+        self.x = 0
+        self.y = 0
+
+    def follow(self, pos):
+        x = self.x
+        y = self.y
+        if pos[0] < self.x + self.margin or pos[0] >= self.x + self.view_width - self.margin:
+            x = pos[0] - self.view_width // 2
+        if pos[1] < self.y + self.margin or pos[1] >= self.y + self.view_height - self.margin:
+            y = pos[1] - self.view_height // 2
+        x = max(0, min(x, self.world_width - self.view_width))
+        y = max(0, min(y, self.world_height - self.view_height))
+        moved = (x, y) != (self.x, self.y)
+        self.x = x
+        self.y = y
+        return moved
+
+    def contains(self, pos):
+        return (self.x <= pos[0] < self.x + self.view_width and
+                self.y <= pos[1] < self.y + self.view_height)
+
+    # 视口内的棋盘格子范围 [x0, x1) x [y0, y1)
+    def visible_bounds(self):
+        return (self.x, self.y,
+                min(self.world_width, self.x + self.view_width),
+                min(self.world_height, self.y + self.view_height))
+
+# 背景分块缓存：每块chunk_cells x chunk_cells个格子，只渲染看得到的块，LRU淘汰
+# 内存只与屏幕大小有关，与棋盘大小无关
+class ChunkCache:
+    def __init__(self, render, chunk_cells=32, max_chunks=64):
+        self.render = render  # render(cx, cy) -> Surface
+        self.chunk_cells = chunk_cells
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()
+
+    def get(self, cx, cy):
+        key = (cx, cy)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.render(cx, cy)
+            self.chunks[key] = chunk
+            if len(self.chunks) > self.max_chunks:
+                self.chunks.popitem(last=False)
+        else:
+            self.chunks.move_to_end(key)
+        return chunk
+
+    def chunk_of(self, pos):
+        return pos[0] // self.chunk_cells, pos[1] // self.chunk_cells
+
+    # 格子所在的块已缓存时返回(块, 块内坐标)，否则返回None
+    def cached(self, pos):
+        chunk = self.chunks.get(self.chunk_of(pos))
+        if chunk is None:
+            return None
+        return chunk, (pos[0] % self.chunk_cells, pos[1] % self.chunk_cells)
+
+    # 丢弃格子所在的块，下次用到时重新渲染
+    def discard(self, pos):
+        self.chunks.pop(self.chunk_of(pos), None)
+
+    def visible_chunks(self, bounds):
+        x0, y0, x1, y1 = bounds
+        size = self.chunk_cells
+        for cy in range(y0 // size, (y1 - 1) // size + 1):
+            for cx in range(x0 // size, (x1 - 1) // size + 1):
+                yield cx, cy
+
+    def clear(self):
+        self.chunks.clear()